@@ -1,61 +1,36 @@
-import yfinance as yf
-import backtrader as bt
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QComboBox, QLineEdit, QLabel, QDateEdit, QMessageBox
-from PyQt5.QtCore import QDate, QThread, pyqtSignal, Qt
+from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QComboBox, QLineEdit, QLabel, QDateEdit, QMessageBox, QCheckBox
+from PyQt5.QtCore import QDate, QThread, QTimer, pyqtSignal, Qt
 from PyQt5.QtGui import QIcon
 import sys
 import numpy as np
 from PyQt5.QtWidgets import QDialog, QScrollArea,   QTextEdit, QPushButton
 import json
-from PyQt5.QtWidgets import QFileDialog
-from reportlab.pdfgen import canvas
-from matplotlib.backends.backend_pdf import PdfPages
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, landscape
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak  # PageBreak import here
-from reportlab.lib.styles import getSampleStyleSheet
+from PyQt5.QtWidgets import QFileDialog, QTableWidget, QTableWidgetItem, QHeaderView, QProgressDialog, QProgressBar, QHBoxLayout
+from PyQt5.QtWidgets import QFormLayout, QStackedWidget
 import os
+from tradewhiz_execution import ExecutionModel
+from tradewhiz_core import INTERVALS, download_data, load_bars, warm_imports, optimize_sma_grid, parse_period_range, parse_weights, portfolio_backtest, calculate_sharpe_ratio, calculate_max_drawdown
+from tradewhiz_metrics import performance_summary, periods_per_year
+from tradewhiz_ledger import export_trades, summary_rows as trade_summary_rows, trade_summary
+from tradewhiz_montecarlo import METHODS as MONTE_CARLO_METHODS, describe as describe_monte_carlo, monte_carlo
+from tradewhiz_plot import LineSet, plot_decimated, plot_fan
+from tradewhiz_prefetch import STATUS_COLUMNS as PREFETCH_COLUMNS, Prefetcher, describe as describe_prefetch
+from tradewhiz_screener import read_universe, screen_universe
+from tradewhiz_sources import make_source
+from tradewhiz_walkforward import OBJECTIVES, walk_forward
+from tradewhiz_store import ResultStore
+from tradewhiz_pool import BacktestJob, BacktestPool, JobCancelled
+from tradewhiz_stream import StreamingSMATrader, csv_bar_source, dataframe_bar_source, socket_bar_source
+from tradewhiz_strategies import STRATEGIES, SMACrossover
+from tradewhiz_whatif import WhatIfSession
+import time
  
-# Corrected SMAStrategy class
-class SMAStrategy(bt.Strategy):
-    def __init__(self):
-        self.short_sma = bt.indicators.SimpleMovingAverage(self.data.close, period=50)
-        self.long_sma = bt.indicators.SimpleMovingAverage(self.data.close, period=200)
-        self.equity_curve = []  # Store portfolio values
-
-    def next(self):
-        # Track portfolio value
-        self.equity_curve.append(self.broker.getvalue())
-
-        # Buy when short SMA crosses above long SMA
-        if self.short_sma > self.long_sma:
-            if not self.position:
-                self.buy()
-        # Sell when short SMA crosses below long SMA
-        elif self.short_sma < self.long_sma:
-            if self.position:
-                self.sell()
-
-
-# Function to calculate Sharpe Ratio
-def calculate_sharpe_ratio(returns, risk_free_rate=0):
-    if len(returns) == 0:
-        return np.nan
-    mean_return = np.mean(returns)
-    std_return = np.std(returns)
-    return (mean_return - risk_free_rate) / std_return if std_return != 0 else np.nan
-
-# Function to calculate Max Drawdown
-def calculate_max_drawdown(equity_curve):
-    drawdowns = []
-    peak = equity_curve[0]
-    for value in equity_curve:
-        peak = max(peak, value)
-        drawdowns.append((peak - value) / peak)
-    return max(drawdowns) if drawdowns else 0
+# Display names of the bar intervals
+INTERVAL_NAMES = {"1m": "1 Minute", "5m": "5 Minute", "15m": "15 Minute", "30m": "30 Minute", "1h": "Hourly", "1d": "Daily"}
 
 # PyQt5 GUI class
  
@@ -104,16 +79,28 @@ class BacktestWindow(QWidget):
         self.end_date_edit.setDate(QDate.currentDate())
         self.layout.addWidget(self.end_date_edit)
 
-        # SMA Parameters
-        self.short_sma_label = QLabel("Short SMA Period:")
-        self.layout.addWidget(self.short_sma_label)
-        self.short_sma_input = QLineEdit("50")
-        self.layout.addWidget(self.short_sma_input)
-
-        self.long_sma_label = QLabel("Long SMA Period:")
-        self.layout.addWidget(self.long_sma_label)
-        self.long_sma_input = QLineEdit("200")
-        self.layout.addWidget(self.long_sma_input)
+        # Strategy; the parameter inputs of each strategy are built from its declaration
+        self.strategy_label = QLabel("Strategy:")
+        self.layout.addWidget(self.strategy_label)
+        self.strategy_combobox = QComboBox()
+        self.strategy_stack = QStackedWidget()
+        self.strategy_inputs = {}  # Strategy name -> {parameter name: QLineEdit}
+        for name, strategy in STRATEGIES.items():
+            self.strategy_combobox.addItem(strategy.label, name)
+            form = QWidget()
+            form_layout = QFormLayout(form)
+            form_layout.setContentsMargins(0, 0, 0, 0)
+            self.strategy_inputs[name] = {}
+            for param in strategy.params:
+                self.strategy_inputs[name][param.name] = QLineEdit(f"{param.default:g}")
+                form_layout.addRow(f"{param.label}:", self.strategy_inputs[name][param.name])
+            self.strategy_stack.addWidget(form)
+        self.strategy_combobox.currentIndexChanged.connect(self.strategy_stack.setCurrentIndex)
+        self.layout.addWidget(self.strategy_combobox)
+        self.layout.addWidget(self.strategy_stack)
+        # The SMA crossover periods are also used by the optimizer, walk-forward and stream windows
+        self.short_sma_input = self.strategy_inputs["sma_cross"]["short"]
+        self.long_sma_input = self.strategy_inputs["sma_cross"]["long"]
 
         # Starting Cash Position
         self.starting_cash_label = QLabel("Starting Cash ($):")
@@ -121,12 +108,115 @@ class BacktestWindow(QWidget):
         self.starting_cash_input = QLineEdit("100000")
         self.layout.addWidget(self.starting_cash_input)
 
+        # Backtest Engine
+        self.engine_label = QLabel("Engine:")
+        self.layout.addWidget(self.engine_label)
+        self.engine_combobox = QComboBox()
+        self.engine_combobox.addItem("Backtrader (Cerebro)", "cerebro")
+        self.engine_combobox.addItem("Fast (NumPy)", "fast")
+        self.layout.addWidget(self.engine_combobox)
+
+        # Bar Interval; intraday bars can be downloaded directly or built from a shorter interval's cache
+        self.interval_label = QLabel("Bar Interval:")
+        self.layout.addWidget(self.interval_label)
+        self.interval_combobox = QComboBox()
+        self.base_interval_combobox = QComboBox()
+        self.base_interval_combobox.addItem("Download directly", None)
+        for interval, name in INTERVAL_NAMES.items():
+            self.interval_combobox.addItem(name, interval)
+            if interval != "1d":
+                self.base_interval_combobox.addItem(f"Resample cached {name} bars", interval)
+        self.interval_combobox.setCurrentIndex(self.interval_combobox.findData("1d"))
+        self.layout.addWidget(self.interval_combobox)
+        self.layout.addWidget(self.base_interval_combobox)
+
+        # Execution model: position sizing, commission, slippage and fill price
+        self.execution_label = QLabel("Execution (sizing, commission, slippage, fill):")
+        self.layout.addWidget(self.execution_label)
+        self.sizing_combobox = QComboBox()
+        self.sizing_combobox.addItem("Fixed shares per trade", "fixed")
+        self.sizing_combobox.addItem("Percent of equity", "percent")
+        self.sizing_combobox.addItem("Volatility target (annualized)", "volatility")
+        self.sizing_value_input = QLineEdit("10")
+        self.sizing_value_input.setToolTip("Shares per trade, percent of equity (e.g. 95) or volatility target (e.g. 0.15)")
+        sizing_row = QHBoxLayout()
+        sizing_row.addWidget(self.sizing_combobox)
+        sizing_row.addWidget(self.sizing_value_input)
+        self.layout.addLayout(sizing_row)
+        self.commission_input = QLineEdit("0.001")
+        self.commission_input.setToolTip("Commission rate, or rates by order value, e.g. 0:0.001, 10000:0.0008, 100000:0.0005")
+        self.layout.addWidget(self.commission_input)
+        self.slippage_combobox = QComboBox()
+        self.slippage_combobox.addItem("No slippage", "none")
+        self.slippage_combobox.addItem("Fixed slippage (fraction of price)", "fixed")
+        self.slippage_combobox.addItem("Volume slippage (factor x volume share, Fast engine)", "volume")
+        self.slippage_value_input = QLineEdit("0")
+        self.fill_combobox = QComboBox()
+        self.fill_combobox.addItem("Fill at next open", "next_open")
+        self.fill_combobox.addItem("Fill at signal close", "close")
+        slippage_row = QHBoxLayout()
+        slippage_row.addWidget(self.slippage_combobox)
+        slippage_row.addWidget(self.slippage_value_input)
+        slippage_row.addWidget(self.fill_combobox)
+        self.layout.addLayout(slippage_row)
+
+        # Offline Mode
+        self.offline_checkbox = QCheckBox("Offline Mode (use cached price data only)")
+        self.layout.addWidget(self.offline_checkbox)
+
+        # cProfile capture for the performance panel
+        self.cprofile_checkbox = QCheckBox("Profile Runs (cProfile, slower)")
+        self.layout.addWidget(self.cprofile_checkbox)
+
+        # What-if mode: runs in this process, reusing the unchanged stages of earlier runs
+        self.auto_rerun_checkbox = QCheckBox("Auto Re-run on Changes (what-if, only recomputes the changed stages)")
+        self.layout.addWidget(self.auto_rerun_checkbox)
+
         # Backtest Button
         self.run_button = QPushButton("Run TradeWhiz")
         self.run_button.setStyleSheet("background-color: #0d47a1; color: white; font-weight: bold;")
         self.run_button.clicked.connect(self.run_backtest)
         self.layout.addWidget(self.run_button)
 
+        # Run queue: every click queues a backtest job on the worker pool, with its progress and status
+        self.queue_table = QTableWidget(0, 3)
+        self.queue_table.setHorizontalHeaderLabels(["Run", "Status", "Progress"])
+        self.queue_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.queue_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.queue_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.queue_table.setMaximumHeight(150)
+        self.layout.addWidget(self.queue_table)
+        self.queue_rows = {}  # job_id -> (table row, progress bar)
+
+        queue_buttons = QHBoxLayout()
+        self.cancel_selected_button = QPushButton("Cancel Selected")
+        self.cancel_selected_button.clicked.connect(self.cancel_selected)
+        self.cancel_selected_button.setToolTip("Queued runs are removed; running Cerebro runs stop, running fast runs finish their current stage")
+        queue_buttons.addWidget(self.cancel_selected_button)
+        self.cancel_all_button = QPushButton("Cancel All")
+        self.cancel_all_button.clicked.connect(self.cancel_all)
+        queue_buttons.addWidget(self.cancel_all_button)
+        self.clear_queue_button = QPushButton("Clear Finished")
+        self.clear_queue_button.clicked.connect(self.clear_finished)
+        queue_buttons.addWidget(self.clear_queue_button)
+        self.layout.addLayout(queue_buttons)
+
+        # Worker processes start with the first job and are kept for the following ones
+        self.pool = BacktestPool()
+        self.current_run = None
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(100)
+        self.poll_timer.timeout.connect(self.poll_pool)
+
+        # What-if runs: one at a time on a thread; an edit while one runs cancels it and runs the latest inputs next
+        self.what_if = WhatIfSession()
+        self.what_if_thread = None
+        self.what_if_pending = None
+        self.what_if_timer = QTimer(self)
+        self.what_if_timer.setSingleShot(True)
+        self.what_if_timer.setInterval(300)  # Wait for a pause in typing
+        self.what_if_timer.timeout.connect(self.run_what_if)
+
         # Save Report Button
         self.save_report_button = QPushButton("Save Report")
         self.save_report_button.setStyleSheet("background-color: #2e7d32; color: white; font-weight: bold;")
@@ -134,6 +224,60 @@ class BacktestWindow(QWidget):
         self.layout.addWidget(self.save_report_button)
         self.save_report_button.setEnabled(False)  # Initially disabled
 
+        # Batch Report Button
+        self.batch_report_button = QPushButton("Save Reports for All Runs")
+        self.batch_report_button.setStyleSheet("background-color: #2e7d32; color: white; font-weight: bold;")
+        self.batch_report_button.clicked.connect(self.save_batch_reports)
+        self.layout.addWidget(self.batch_report_button)
+        self.batch_report_button.setEnabled(False)  # Initially disabled
+
+        # Finished runs of this session, kept for the PDF reports
+        self.last_report = None
+        self.finished_runs = []
+        self.what_if_report = None
+
+        # Optimize Button
+        self.optimize_button = QPushButton("Optimize SMA Periods")
+        self.optimize_button.setStyleSheet("background-color: #6a1b9a; color: white; font-weight: bold;")
+        self.optimize_button.clicked.connect(self.show_optimizer)
+        self.layout.addWidget(self.optimize_button)
+
+        # Walk-Forward Button
+        self.walk_forward_button = QPushButton("Walk-Forward Validation")
+        self.walk_forward_button.setStyleSheet("background-color: #4a148c; color: white; font-weight: bold;")
+        self.walk_forward_button.clicked.connect(self.show_walk_forward)
+        self.layout.addWidget(self.walk_forward_button)
+
+        # Portfolio Button
+        self.portfolio_button = QPushButton("Portfolio Backtest")
+        self.portfolio_button.setStyleSheet("background-color: #00695c; color: white; font-weight: bold;")
+        self.portfolio_button.clicked.connect(self.show_portfolio)
+        self.layout.addWidget(self.portfolio_button)
+
+        # Prefetch Button
+        self.prefetch_button = QPushButton("Prefetch Universe")
+        self.prefetch_button.setStyleSheet("background-color: #1b5e20; color: white; font-weight: bold;")
+        self.prefetch_button.clicked.connect(self.show_prefetch)
+        self.layout.addWidget(self.prefetch_button)
+
+        # Screener Button
+        self.screener_button = QPushButton("Screen Universe")
+        self.screener_button.setStyleSheet("background-color: #33691e; color: white; font-weight: bold;")
+        self.screener_button.clicked.connect(self.show_screener)
+        self.layout.addWidget(self.screener_button)
+
+        # Stream Button
+        self.stream_button = QPushButton("Live / Replay Stream")
+        self.stream_button.setStyleSheet("background-color: #e65100; color: white; font-weight: bold;")
+        self.stream_button.clicked.connect(self.show_stream)
+        self.layout.addWidget(self.stream_button)
+
+        # Past Runs Button
+        self.history_button = QPushButton("Past Runs")
+        self.history_button.setStyleSheet("background-color: #37474f; color: white; font-weight: bold;")
+        self.history_button.clicked.connect(self.show_history)
+        self.layout.addWidget(self.history_button)
+
         # Help Button
         self.help_button = QPushButton("?")
         self.help_button.setStyleSheet("font-weight: bold; background-color: lightgray;")
@@ -153,15 +297,75 @@ class BacktestWindow(QWidget):
         self.sharpe_label = QLabel("Sharpe Ratio: N/A")
         self.layout.addWidget(self.sharpe_label)
 
+        self.sortino_label = QLabel("Sortino Ratio: N/A")
+        self.layout.addWidget(self.sortino_label)
+
+        self.calmar_label = QLabel("Calmar Ratio: N/A")
+        self.layout.addWidget(self.calmar_label)
+
+        # Trade ledger of the last run
+        trades_layout = QHBoxLayout()
+        self.trades_label = QLabel("Trades: N/A")
+        trades_layout.addWidget(self.trades_label)
+        self.trades_button = QPushButton("Show Trades")
+        self.trades_button.clicked.connect(self.show_trades)
+        trades_layout.addWidget(self.trades_button)
+        self.trades_button.setEnabled(False)  # Enabled after a run with recorded trades
+        self.layout.addLayout(trades_layout)
+
+        # Performance panel: stage timings and counters of the last run
+        self.performance_label = QLabel("Performance: N/A")
+        self.performance_label.setWordWrap(True)
+        self.layout.addWidget(self.performance_label)
+
+        self.profile_button = QPushButton("Show Profile")
+        self.profile_button.clicked.connect(self.show_profile)
+        self.layout.addWidget(self.profile_button)
+        self.profile_button.setEnabled(False)  # Enabled after a profiled run
+
+        # Monte Carlo robustness of the last run: resampled return paths, simulated in the background
+        monte_carlo_layout = QHBoxLayout()
+        monte_carlo_layout.addWidget(QLabel("Monte Carlo:"))
+        self.monte_carlo_method_combobox = QComboBox()
+        for method, label in MONTE_CARLO_METHODS.items():
+            self.monte_carlo_method_combobox.addItem(label, method)
+        monte_carlo_layout.addWidget(self.monte_carlo_method_combobox)
+        monte_carlo_layout.addWidget(QLabel("Paths:"))
+        self.monte_carlo_paths_input = QLineEdit("10000")
+        monte_carlo_layout.addWidget(self.monte_carlo_paths_input)
+        monte_carlo_layout.addWidget(QLabel("Block Size (bars):"))
+        self.monte_carlo_block_input = QLineEdit("20")
+        monte_carlo_layout.addWidget(self.monte_carlo_block_input)
+        self.monte_carlo_button = QPushButton("Run Monte Carlo")
+        self.monte_carlo_button.clicked.connect(self.run_monte_carlo)
+        monte_carlo_layout.addWidget(self.monte_carlo_button)
+        self.monte_carlo_button.setEnabled(False)  # Enabled after a successful run
+        self.layout.addLayout(monte_carlo_layout)
+
+        self.monte_carlo_label = QLabel("Monte Carlo: N/A")
+        self.monte_carlo_label.setWordWrap(True)
+        self.layout.addWidget(self.monte_carlo_label)
+
         # Graph for Equity Curve
-        self.figure = plt.Figure()
+        self.figure = Figure()
         self.equity_canvas = FigureCanvas(self.figure)
+        self.layout.addWidget(NavigationToolbar(self.equity_canvas, self))
         self.layout.addWidget(self.equity_canvas)
 
         # Graph for Stock Price and SMAs
-        self.figure_price = plt.Figure()
+        self.figure_price = Figure()
         self.price_canvas = FigureCanvas(self.figure_price)
+        self.layout.addWidget(NavigationToolbar(self.price_canvas, self))
         self.layout.addWidget(self.price_canvas)
+        # Lines of both charts, updated in place by the following runs
+        self.equity_lines = None
+        self.price_lines = None
+
+        # Fan chart of the Monte Carlo paths
+        self.figure_fan = Figure()
+        self.fan_canvas = FigureCanvas(self.figure_fan)
+        self.layout.addWidget(NavigationToolbar(self.fan_canvas, self))
+        self.layout.addWidget(self.fan_canvas)
 
         # About Button
         self.about_button = QPushButton("About")
@@ -175,22 +379,60 @@ class BacktestWindow(QWidget):
         self.stock_combobox.currentIndexChanged.connect(self.save_settings)
 
         self.manual_ticker_input.textChanged.connect(self.save_settings)
-        self.short_sma_input.textChanged.connect(self.save_settings)
-        self.long_sma_input.textChanged.connect(self.save_settings)
+        self.strategy_combobox.currentIndexChanged.connect(self.save_settings)
+        for inputs in self.strategy_inputs.values():
+            for line_edit in inputs.values():
+                line_edit.textChanged.connect(self.save_settings)
         self.starting_cash_input.textChanged.connect(self.save_settings)
+        self.engine_combobox.currentIndexChanged.connect(self.save_settings)
+        self.interval_combobox.currentIndexChanged.connect(self.save_settings)
+        self.base_interval_combobox.currentIndexChanged.connect(self.save_settings)
+        self.sizing_combobox.currentIndexChanged.connect(self.save_settings)
+        self.sizing_value_input.textChanged.connect(self.save_settings)
+        self.commission_input.textChanged.connect(self.save_settings)
+        self.slippage_combobox.currentIndexChanged.connect(self.save_settings)
+        self.slippage_value_input.textChanged.connect(self.save_settings)
+        self.fill_combobox.currentIndexChanged.connect(self.save_settings)
+        self.monte_carlo_method_combobox.currentIndexChanged.connect(self.save_settings)
+        self.monte_carlo_paths_input.textChanged.connect(self.save_settings)
+        self.monte_carlo_block_input.textChanged.connect(self.save_settings)
+        self.offline_checkbox.stateChanged.connect(self.save_settings)
+        self.cprofile_checkbox.stateChanged.connect(self.save_settings)
+        self.auto_rerun_checkbox.stateChanged.connect(self.save_settings)
+
+        # In what-if mode, any change of a backtest input re-runs the backtest
+        for signal in [
+            self.start_date_edit.dateChanged, self.end_date_edit.dateChanged, self.stock_combobox.currentIndexChanged,
+            self.manual_ticker_input.textChanged, self.strategy_combobox.currentIndexChanged, self.starting_cash_input.textChanged,
+            self.engine_combobox.currentIndexChanged, self.interval_combobox.currentIndexChanged,
+            self.base_interval_combobox.currentIndexChanged, self.sizing_combobox.currentIndexChanged,
+            self.sizing_value_input.textChanged, self.commission_input.textChanged, self.slippage_combobox.currentIndexChanged,
+            self.slippage_value_input.textChanged, self.fill_combobox.currentIndexChanged, self.offline_checkbox.stateChanged,
+            self.auto_rerun_checkbox.stateChanged,
+        ]:
+            signal.connect(self.schedule_what_if)
+        for inputs in self.strategy_inputs.values():
+            for line_edit in inputs.values():
+                line_edit.textChanged.connect(self.schedule_what_if)
+
+        # Load the heavy backtest dependencies in the background once the event loop runs
+        self.warmup_thread = WarmupThread()
+        QTimer.singleShot(0, self.warmup_thread.start)
 
         
 
         # Set the layout
         self.setLayout(self.layout)
 
-    def update_results(self, portfolio_value, sharpe_ratio, max_drawdown, equity_curve, price_data):
-        # Re-enable the Run Backtest button and enable Save Report
-        self.run_button.setEnabled(True)
+    # what_if: the run is a what-if preview, which replaces the previous preview in finished_runs
+    def update_results(self, portfolio_value, sharpe_ratio, max_drawdown, equity_curve, price_data, what_if=False):
+        # Enable Save Report
         self.save_report_button.setEnabled(True)
+        run = self.current_run
 
         if portfolio_value is None:
             self.results_label.setText("Error: Backtest failed. Check logs for details.")
+            self.show_performance(run.profile)
             return
 
         # Update result labels
@@ -198,146 +440,241 @@ class BacktestWindow(QWidget):
         self.sharpe_label.setText(f"Sharpe Ratio: {sharpe_ratio:.2f}")
         self.drawdown_label.setText(f"Max Drawdown: {max_drawdown:.2f}")
 
-        # Plot Equity Curve
-        self.figure.clear()
-        ax = self.figure.add_subplot(111)
-        ax.plot(equity_curve, label="Equity Curve")
-        ax.set_title("Equity Curve")
-        ax.set_xlabel("Time")
-        ax.set_ylabel("Portfolio Value")
-        ax.legend()
-        self.equity_canvas.draw()
+        # Additional risk metrics, with the drawdown dates taken from the price index
+        with run.profile.stage("metrics"):
+            summary = performance_summary(
+                equity_curve, periods_per_year(run.interval), index=price_data.index[-len(equity_curve):]
+            )
+        self.sortino_label.setText(f"Sortino Ratio: {summary['sortino_ratio']:.2f}")
+        self.calmar_label.setText(f"Calmar Ratio: {summary['calmar_ratio']:.2f}")
+        if summary["max_drawdown"] > 0:
+            recovery = summary["recovery"].strftime("%Y-%m-%d") if summary["recovery"] is not None else "not recovered"
+            self.drawdown_label.setText(
+                f"Max Drawdown: {max_drawdown:.2f} (peak {summary['peak']:%Y-%m-%d}, trough {summary['trough']:%Y-%m-%d}, "
+                f"recovery {recovery}, {summary['duration_bars']} bars)"
+            )
 
-        # Plot Price with SMAs
-        self.figure_price.clear()
-        ax_price = self.figure_price.add_subplot(111)
-        ax_price.plot(price_data["close"], label="Close Price", alpha=0.8)
-        ax_price.plot(price_data["short_sma"], label="Short SMA", linestyle="--")
-        ax_price.plot(price_data["long_sma"], label="Long SMA", linestyle="--")
-        ax_price.set_title("Price with Short and Long SMAs")
-        ax_price.set_xlabel("Date")
-        ax_price.set_ylabel("Price")
-        ax_price.legend()
-        self.price_canvas.draw()
+        # Trades paired from the run's fills
+        trades = run.ledger.trades(price_data["close"], price_data.index) if run.ledger is not None else None
+        if trades is not None:
+            stats = trade_summary(trades)
+            self.trades_label.setText(
+                f"Trades: {stats['trades']}, win rate {stats['win_rate']:.1%}, average PnL ${stats['average_pnl']:,.2f}, "
+                f"average {stats['average_bars_held']:.1f} bars held" if stats["closed_trades"] else f"Trades: {stats['trades']}"
+            )
+        else:
+            self.trades_label.setText("Trades: N/A")
+        self.trades_button.setEnabled(trades is not None)
+
+        with run.profile.stage("plot"):
+            # Long series are decimated to the pixel width and refined when zooming. The
+            # lines stay on the charts between runs and only the ones whose data changed
+            # are replotted, e.g. the equity curve and one SMA after a period change.
+            if self.equity_lines is None:
+                ax = self.figure.add_subplot(111)
+                ax.set_title("Equity Curve")
+                ax.set_xlabel("Time")
+                ax.set_ylabel("Portfolio Value")
+                self.equity_lines = LineSet(ax)
+            redrawn = self.equity_lines.update(np.arange(len(equity_curve)), {"Equity Curve": equity_curve})
+            self.equity_lines.ax.legend()
+            self.equity_canvas.draw()
+
+            # Price with the strategy's indicators
+            if self.price_lines is None:
+                ax_price = self.figure_price.add_subplot(111)
+                ax_price.set_xlabel("Date")
+                ax_price.set_ylabel("Price")
+                self.price_lines = LineSet(ax_price)
+            overlays = [column for column in price_data.columns if column != "close"]
+            series = {"Close Price": price_data["close"].to_numpy()}
+            series.update((column, price_data[column].to_numpy()) for column in overlays)
+            styles = {column: {"linestyle": "--"} for column in overlays}
+            styles["Close Price"] = {"alpha": 0.8}
+            redrawn += self.price_lines.update(price_data.index, series, styles)
+            self.price_lines.ax.set_title("Price with " + ", ".join(overlays) if overlays else "Price")
+            self.price_lines.ax.legend()
+            self.price_canvas.draw()
+        run.profile.count("lines_redrawn", redrawn)
+
+        self.show_performance(run.profile)
+
+        # Keep everything the PDF report needs, using the parameters of this run
+        self.last_report = {
+            "file_name": f"{run.stock_symbol}_{run.start_date}_{run.end_date}_{run.interval}_{run.strategy.tag}.pdf",
+            "parameters": [
+                ("Stock Ticker", run.stock_symbol),
+                ("Start Date", run.start_date),
+                ("End Date", run.end_date),
+                ("Bar Interval", INTERVAL_NAMES[run.interval] + (f" (from {INTERVAL_NAMES[run.base_interval]} bars)" if run.base_interval else "")),
+                ("Strategy", run.strategy.describe()),
+                ("Starting Cash ($)", f"${run.starting_cash:,.2f}"),
+                ("Engine", self.engine_combobox.itemText(max(self.engine_combobox.findData(run.engine), 0))),
+                ("Execution", (run.execution or ExecutionModel()).describe()),
+            ],
+            "results": [
+                ("Portfolio Value ($)", f"${portfolio_value:,.2f}"),
+                ("Sharpe Ratio", f"{sharpe_ratio:.2f}"),
+                ("Sortino Ratio", f"{summary['sortino_ratio']:.2f}"),
+                ("Calmar Ratio", f"{summary['calmar_ratio']:.2f}"),
+                ("Max Drawdown", f"{max_drawdown:.2%}"),
+            ],
+            "equity_curve": equity_curve,
+            "price_data": price_data,
+            "performance": run.profile.to_dict(),
+            "periods_per_year": periods_per_year(run.interval),
+            "trades": trades,
+        }
+        # Previews come at every pause in typing: keep only the latest one for the batch reports
+        if what_if and self.finished_runs and self.finished_runs[-1] is self.what_if_report:
+            self.finished_runs[-1] = self.last_report
+        else:
+            self.finished_runs.append(self.last_report)
+        self.what_if_report = self.last_report if what_if else None
+        self.batch_report_button.setEnabled(True)
+
+        # A Monte Carlo analysis belongs to the run it was made for
+        self.figure_fan.clear()
+        self.fan_canvas.draw()
+        self.monte_carlo_label.setText("Monte Carlo: N/A")
+        self.monte_carlo_button.setEnabled(True)
+
+        if run.cached:
+            self.results_label.setText("TradeWhiz Backtest Complete! (loaded from the result store)")
+        else:
+            self.results_label.setText("TradeWhiz Backtest Complete!")
+
+    # Fill the performance panel and append the run to the performance log
+    def show_performance(self, profile):
+        self.performance_label.setText(f"Performance: {profile.summary()}")
+        self.last_profile = profile
+        self.profile_button.setEnabled(bool(profile.profile_text))
+        try:
+            profile.write_log()
+        except OSError as e:
+            print(f"Failed to write performance log: {e}")
+
+    def show_profile(self):
+        dialog = QDialog(self)
+        dialog.setWindowTitle(f"Profile - {self.last_profile.label}")
+        dialog.setMinimumSize(900, 600)
+        layout = QVBoxLayout()
+        text = QTextEdit()
+        text.setReadOnly(True)
+        text.setFontFamily("Courier")
+        text.setPlainText(self.last_profile.profile_text)
+        layout.addWidget(text)
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(dialog.accept)
+        layout.addWidget(close_button)
+        dialog.setLayout(layout)
+        dialog.exec_()
+
+    def show_trades(self):
+        name = os.path.splitext(self.last_report["file_name"])[0]
+        TradesDialog(self, self.last_report["trades"], name).exec_()
+
+    # Resample the last run's returns into many paths, off the GUI thread
+    def run_monte_carlo(self):
+        if self.last_report is None:
+            return
+        try:
+            paths = int(self.monte_carlo_paths_input.text())
+            block_size = int(self.monte_carlo_block_input.text())
+            if paths < 100 or block_size < 1:
+                raise ValueError
+        except ValueError:
+            QMessageBox.warning(
+                self, "Invalid Monte Carlo Settings",
+                "The number of paths must be a whole number of at least 100, and the block size a positive whole number."
+            )
+            return
 
-        self.results_label.setText("TradeWhiz Backtest Complete!")
+        self.monte_carlo_button.setEnabled(False)
+        self.monte_carlo_label.setText(f"Monte Carlo: simulating {paths:,} paths...")
+        self.monte_carlo_thread = MonteCarloThread(self.last_report, paths, self.monte_carlo_method_combobox.currentData(), block_size)
+        self.monte_carlo_thread.result_signal.connect(self.monte_carlo_finished)
+        self.monte_carlo_thread.start()
+
+    def monte_carlo_finished(self, report, result, error, seconds):
+        # The analysis is kept with its run for the PDF, even if another run finished meanwhile
+        if result is not None:
+            report["monte_carlo"] = result
+        if report is not self.last_report:
+            return
+        self.monte_carlo_button.setEnabled(True)
+        if error:
+            self.monte_carlo_label.setText(f"Monte Carlo failed: {error}")
+            return
+
+        summary = result["summary"]
+        level = f"{result['confidence']:.0%}"
+        self.monte_carlo_label.setText(
+            f"Monte Carlo ({describe_monte_carlo(result)}, {seconds:.1f} s), {level} intervals: "
+            f"final value ${summary.at['final_value', 'lower']:,.2f} to ${summary.at['final_value', 'upper']:,.2f}, "
+            f"Sharpe {summary.at['sharpe_ratio', 'lower']:.2f} to {summary.at['sharpe_ratio', 'upper']:.2f}, "
+            f"max drawdown {summary.at['max_drawdown', 'lower']:.2%} to {summary.at['max_drawdown', 'upper']:.2%}; "
+            f"probability of loss {result['loss_probability']:.1%}"
+        )
 
+        self.figure_fan.clear()
+        ax = self.figure_fan.add_subplot(111)
+        plot_fan(ax, result["fan"])
+        ax.set_title("Monte Carlo Equity Paths")
+        ax.set_xlabel("Time")
+        ax.set_ylabel("Portfolio Value")
+        ax.legend(loc="upper left")
+        self.fan_canvas.draw()
 
     def save_report(self):
-        file_path, _ = QFileDialog.getSaveFileName(self, "Save Report", "", "PDF Files (*.pdf)")
+        if self.last_report is None:
+            QMessageBox.warning(self, "No Results", "Run a successful backtest before saving a report.")
+            return
+
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Report", self.last_report["file_name"], "PDF Files (*.pdf)")
         if not file_path:
             return
-    
-        # Backtest parameters to include in the report
-        manual_ticker = self.manual_ticker_input.text().strip()
-        stock_symbol = manual_ticker if manual_ticker else self.stock_combobox.currentText()
-        start_date = self.start_date_edit.date().toString("yyyy-MM-dd")
-        end_date = self.end_date_edit.date().toString("yyyy-MM-dd")
-        short_sma_period = int(self.short_sma_input.text())
-        long_sma_period = int(self.long_sma_input.text())
-        starting_cash = float(self.starting_cash_input.text())
-    
-        try:
-            # Temporary file paths for high-resolution graphs
-            equity_curve_path = "equity_curve_high_res.png"
-            sma_curve_path = "sma_curve_high_res.png"
-    
-            # Save high-resolution graphs
-            self.figure.savefig(equity_curve_path, dpi=300, bbox_inches='tight')  # High DPI for sharp text
-            self.figure_price.savefig(sma_curve_path, dpi=300, bbox_inches='tight')  # High DPI for sharp text
-    
-            # Create a PDF document
-            pdf = SimpleDocTemplate(
-                file_path, pagesize=letter, rightMargin=40, leftMargin=40, topMargin=60, bottomMargin=30
-            )
-    
-            # Styles
-            styles = getSampleStyleSheet()
-            title_style = styles['Title']
-            heading_style = styles['Heading2']
-            normal_style = styles['BodyText']
-    
-            # Title Page
-            elements = []
-    
-            title = Paragraph("TradeWhiz 9.11 Backtest Report", title_style)
-            subtitle = Paragraph("© SIG Labs 2024 | by peterdeceuster.uk", normal_style)
-            logo = Image("logo.png", width=100, height=50)  # Ensure logo.png exists in the same directory
-    
-            elements.append(logo)
-            elements.append(Spacer(1, 12))
-            elements.append(title)
-            elements.append(Spacer(1, 12))
-            elements.append(subtitle)
-            elements.append(Spacer(1, 24))
-    
-            # Backtest Parameters
-            elements.append(Paragraph("Backtest Parameters", heading_style))
-            params_data = [
-                ["Parameter", "Value"],
-                ["Stock Ticker", stock_symbol],
-                ["Start Date", start_date],
-                ["End Date", end_date],
-                ["Short SMA Period", short_sma_period],
-                ["Long SMA Period", long_sma_period],
-                ["Starting Cash ($)", f"${starting_cash:,.2f}"]
-            ]
-            params_table = Table(params_data, hAlign="LEFT")
-            params_table.setStyle(
-                TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                ])
-            )
-            elements.append(params_table)
-            elements.append(Spacer(1, 24))
-    
-            # Add Graphs - One per page
-            elements.append(Paragraph("Equity Curve", heading_style))
-            equity_curve_image = Image(equity_curve_path)
-            
-            # Resize the image proportionally to fit within the page (max size)
-            max_width = 500  # Max width for the image
-            max_height = 690  # Max height for the image
-            # Calculate aspect ratio to maintain the image proportions
-            aspect_ratio = equity_curve_image.imageWidth / equity_curve_image.imageHeight
-            if equity_curve_image.imageWidth > max_width:
-                equity_curve_image.drawWidth = max_width
-                equity_curve_image.drawHeight = max_width / aspect_ratio
-            else:
-                equity_curve_image.drawHeight = min(equity_curve_image.imageHeight, max_height)
-                equity_curve_image.drawWidth = equity_curve_image.drawHeight * aspect_ratio
-            
-            elements.append(equity_curve_image)
-    
-            # Ensure the graph is on a new page
-            elements.append(Spacer(1, 12))  # Adjust spacing if necessary
-            elements.append(PageBreak())  # This adds a new page after the equity curve graph
-    
-            elements.append(Paragraph("Price with Short and Long SMAs", heading_style))
-            sma_curve_image = Image(sma_curve_path)
-            
-            # Resize the image for SMAs graph similarly
-            if sma_curve_image.imageWidth > max_width:
-                sma_curve_image.drawWidth = max_width
-                sma_curve_image.drawHeight = max_width / (sma_curve_image.imageWidth / sma_curve_image.imageHeight)
-            else:
-                sma_curve_image.drawHeight = min(sma_curve_image.imageHeight, max_height)
-                sma_curve_image.drawWidth = sma_curve_image.drawHeight * (sma_curve_image.imageWidth / sma_curve_image.imageHeight)
-    
-            elements.append(sma_curve_image)
-    
-            # Build PDF
-            pdf.build(elements)
-    
-            QMessageBox.information(self, "Report Saved", f"Report saved to {file_path}")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to save report: {str(e)}")
+
+        # Build the PDF in the background so the UI stays responsive
+        self.start_report_thread(ReportThread(self.last_report, file_path=file_path))
+
+    def save_batch_reports(self):
+        if not self.finished_runs:
+            QMessageBox.warning(self, "No Results", "Run one or more successful backtests before saving reports.")
+            return
+
+        directory = QFileDialog.getExistingDirectory(self, "Save Reports To")
+        if not directory:
+            return
+
+        self.start_report_thread(ReportThread(list(self.finished_runs), directory=directory))
+
+    def start_report_thread(self, report_thread):
+        self.save_report_button.setEnabled(False)
+        self.batch_report_button.setEnabled(False)
+
+        self.report_progress = QProgressDialog("Building report...", None, 0, 100, self)
+        self.report_progress.setWindowTitle("Save Report")
+        self.report_progress.setMinimumDuration(0)
+        self.report_progress.setValue(0)
+
+        self.report_thread = report_thread
+        self.report_thread.progress_signal.connect(self.update_report_progress)
+        self.report_thread.result_signal.connect(self.report_finished)
+        self.report_thread.start()
+
+    def update_report_progress(self, percent, message):
+        self.report_progress.setLabelText(message)
+        self.report_progress.setValue(percent)
+
+    def report_finished(self, message, error):
+        self.report_progress.close()
+        self.save_report_button.setEnabled(True)
+        self.batch_report_button.setEnabled(True)
+        if error:
+            QMessageBox.critical(self, "Error", f"Failed to save report: {error}")
+        else:
+            QMessageBox.information(self, "Report Saved", message)
             
  
     def save_settings(self):
@@ -349,7 +686,27 @@ class BacktestWindow(QWidget):
             "manual_ticker": self.manual_ticker_input.text(),
             "short_sma": self.short_sma_input.text(),
             "long_sma": self.long_sma_input.text(),
+            "strategy": self.strategy_combobox.currentData(),
+            "strategy_params": {
+                name: {param: line_edit.text() for param, line_edit in inputs.items()}
+                for name, inputs in self.strategy_inputs.items() if name != "sma_cross"
+            },
             "starting_cash": self.starting_cash_input.text(),
+            "engine": self.engine_combobox.currentData(),
+            "interval": self.interval_combobox.currentData(),
+            "base_interval": self.base_interval_combobox.currentData(),
+            "sizing": self.sizing_combobox.currentData(),
+            "sizing_value": self.sizing_value_input.text(),
+            "commission": self.commission_input.text(),
+            "slippage": self.slippage_combobox.currentData(),
+            "slippage_value": self.slippage_value_input.text(),
+            "fill": self.fill_combobox.currentData(),
+            "monte_carlo_method": self.monte_carlo_method_combobox.currentData(),
+            "monte_carlo_paths": self.monte_carlo_paths_input.text(),
+            "monte_carlo_block": self.monte_carlo_block_input.text(),
+            "offline": self.offline_checkbox.isChecked(),
+            "cprofile": self.cprofile_checkbox.isChecked(),
+            "auto_rerun": self.auto_rerun_checkbox.isChecked(),
         }
     
         # Determine file path
@@ -378,7 +735,27 @@ class BacktestWindow(QWidget):
             self.manual_ticker_input.setText(settings.get("manual_ticker", ""))
             self.short_sma_input.setText(settings.get("short_sma", "50"))
             self.long_sma_input.setText(settings.get("long_sma", "200"))
+            for name, values in settings.get("strategy_params", {}).items():
+                for param, text in values.items():
+                    if param in self.strategy_inputs.get(name, {}):
+                        self.strategy_inputs[name][param].setText(text)
+            self.strategy_combobox.setCurrentIndex(max(self.strategy_combobox.findData(settings.get("strategy", "sma_cross")), 0))
             self.starting_cash_input.setText(settings.get("starting_cash", "100000"))
+            self.engine_combobox.setCurrentIndex(max(self.engine_combobox.findData(settings.get("engine", "cerebro")), 0))
+            self.interval_combobox.setCurrentIndex(max(self.interval_combobox.findData(settings.get("interval", "1d")), 0))
+            self.base_interval_combobox.setCurrentIndex(max(self.base_interval_combobox.findData(settings.get("base_interval")), 0))
+            self.sizing_combobox.setCurrentIndex(max(self.sizing_combobox.findData(settings.get("sizing", "fixed")), 0))
+            self.sizing_value_input.setText(settings.get("sizing_value", "10"))
+            self.commission_input.setText(settings.get("commission", "0.001"))
+            self.slippage_combobox.setCurrentIndex(max(self.slippage_combobox.findData(settings.get("slippage", "none")), 0))
+            self.slippage_value_input.setText(settings.get("slippage_value", "0"))
+            self.fill_combobox.setCurrentIndex(max(self.fill_combobox.findData(settings.get("fill", "next_open")), 0))
+            self.monte_carlo_method_combobox.setCurrentIndex(max(self.monte_carlo_method_combobox.findData(settings.get("monte_carlo_method", "block")), 0))
+            self.monte_carlo_paths_input.setText(settings.get("monte_carlo_paths", "10000"))
+            self.monte_carlo_block_input.setText(settings.get("monte_carlo_block", "20"))
+            self.offline_checkbox.setChecked(settings.get("offline", False))
+            self.cprofile_checkbox.setChecked(settings.get("cprofile", False))
+            self.auto_rerun_checkbox.setChecked(settings.get("auto_rerun", False))
     
             print("Settings applied successfully!")
         except FileNotFoundError:
@@ -391,28 +768,315 @@ class BacktestWindow(QWidget):
             
 
     def run_backtest(self):
-        self.run_button.setEnabled(False)
-        self.results_label.setText("Running backtest...")
-    
+        job = self.selected_job()
+        if job is None:
+            return
+        if self.auto_rerun_checkbox.isChecked():
+            self.start_what_if(job)
+            return
+        self.pool.submit(job)
+        self.add_queue_row(job)
+        self.poll_timer.start()
+        self.results_label.setText(f"Queued backtest {job.description} ({self.pool.pending} in queue)")
+
+    # Backtest job of the current inputs (None if invalid; warn: explain why in a message box)
+    def selected_job(self, warn=True):
         # Use manual ticker if provided, otherwise use dropdown
         manual_ticker = self.manual_ticker_input.text().strip()
         stock_symbol = manual_ticker if manual_ticker else self.stock_combobox.currentText()
         
         if manual_ticker and not manual_ticker.isalnum():
-            QMessageBox.warning(self, "Invalid Ticker", "The entered stock ticker is invalid. Please use a valid ticker symbol.")
-            self.run_button.setEnabled(True)
+            if warn:
+                QMessageBox.warning(self, "Invalid Ticker", "The entered stock ticker is invalid. Please use a valid ticker symbol.")
+            return None
+
+        start_date = self.start_date_edit.date().toString("yyyy-MM-dd")
+        end_date = self.end_date_edit.date().toString("yyyy-MM-dd")
+        starting_cash = self.selected_starting_cash(warn)
+        if starting_cash is None:
+            return None
+        engine = self.engine_combobox.currentData()
+        offline = self.offline_checkbox.isChecked()
+        strategy = self.selected_strategy(warn)
+        if strategy is None:
+            return None
+        interval, base_interval = self.selected_intervals(warn)
+        execution = self.selected_execution(warn)
+        if interval is None or execution is None:
+            return None
+        short_sma_period, long_sma_period = (strategy["short"], strategy["long"]) if isinstance(strategy, SMACrossover) else (0, 0)
+
+        return BacktestJob(
+            stock_symbol, start_date, end_date, short_sma_period, long_sma_period, starting_cash, engine, offline,
+            self.cprofile_checkbox.isChecked(), interval, base_interval, execution, strategy
+        )
+
+    # Any change of an input in what-if mode: re-run once the typing pauses
+    def schedule_what_if(self):
+        if self.auto_rerun_checkbox.isChecked():
+            self.what_if_timer.start()
+
+    def run_what_if(self):
+        job = self.selected_job(warn=False)
+        if job is None:
+            self.results_label.setText("What-if: waiting for valid inputs...")
             return
+        self.start_what_if(job)
 
-    
+    def start_what_if(self, job):
+        if self.what_if_thread is not None:
+            # Superseded: stop the running one (Cerebro stops at its next progress report)
+            self.what_if_pending = job
+            self.what_if_thread.cancelled = True
+            return
+        self.results_label.setText(f"Running what-if {job.description}...")
+        self.what_if_thread = WhatIfThread(self.what_if, job)
+        self.what_if_thread.result_signal.connect(self.what_if_finished)
+        self.what_if_thread.start()
+
+    def what_if_finished(self, job, result, reused, error):
+        self.what_if_thread.wait()
+        self.what_if_thread = None
+        if self.what_if_pending is not None:
+            job, self.what_if_pending = self.what_if_pending, None
+            self.start_what_if(job)
+            return
+        if error:
+            self.results_label.setText(f"Error: What-if {job.description} failed: {error}")
+            return
+        self.current_run = job
+        self.update_results(*result, what_if=True)
+        if result[0] is not None:
+            self.results_label.setText(
+                f"What-if {job.description} complete" + (f" (reused {', '.join(reused)})" if reused else "")
+            )
+
+    # Selected bar interval and the shorter interval to resample from (None to download directly)
+    def selected_intervals(self, warn=True):
+        interval = self.interval_combobox.currentData()
+        base_interval = self.base_interval_combobox.currentData()
+        if base_interval == interval:
+            base_interval = None
+        if base_interval is not None and (INTERVALS[base_interval] > INTERVALS[interval] or INTERVALS[interval] % INTERVALS[base_interval]):
+            if warn:
+                QMessageBox.warning(
+                    self, "Invalid Interval",
+                    f"{INTERVAL_NAMES[interval]} bars cannot be built from {INTERVAL_NAMES[base_interval]} bars."
+                )
+            return None, None
+        return interval, base_interval
+
+    # Starting cash entered (None if it is not a number)
+    def selected_starting_cash(self, warn=True):
+        try:
+            return float(self.starting_cash_input.text())
+        except ValueError:
+            if warn:
+                QMessageBox.warning(self, "Invalid Starting Cash", "The starting cash must be a number.")
+            return None
+
+    # Selected strategy (or the named one) with the parameters entered for it (None if invalid)
+    def selected_strategy(self, warn=True, name=None):
+        name = name or self.strategy_combobox.currentData()
+        try:
+            return STRATEGIES[name](**{param: float(line_edit.text()) for param, line_edit in self.strategy_inputs[name].items()})
+        except ValueError:
+            if warn:
+                QMessageBox.warning(self, "Invalid Strategy Parameters", f"The parameters of {STRATEGIES[name].label} must be positive numbers.")
+            return None
+
+    # Execution model of the sizing, commission, slippage and fill settings (None if invalid)
+    def selected_execution(self, warn=True):
+        sizing = self.sizing_combobox.currentData()
+        try:
+            value = float(self.sizing_value_input.text())
+            options = {"fixed": {"stake": int(value)}, "percent": {"percent": value}, "volatility": {"target_volatility": value}}[sizing]
+            return ExecutionModel(
+                sizing, commission=self.commission_input.text(), slippage=self.slippage_combobox.currentData(),
+                slippage_value=float(self.slippage_value_input.text() or 0), fill=self.fill_combobox.currentData(), **options
+            )
+        except ValueError:
+            if not warn:
+                return None
+            QMessageBox.warning(
+                self, "Invalid Execution Settings",
+                "The sizing and slippage values must be numbers, and the commission a rate (0.001) or rates by order value (0:0.001, 10000:0.0008)."
+            )
+            return None
+
+    def add_queue_row(self, job):
+        row = self.queue_table.rowCount()
+        self.queue_table.insertRow(row)
+        item = QTableWidgetItem(job.description)
+        item.setData(Qt.UserRole, job.job_id)
+        self.queue_table.setItem(row, 0, item)
+        self.queue_table.setItem(row, 1, QTableWidgetItem(job.status))
+        progress_bar = QProgressBar()
+        progress_bar.setRange(0, 100)
+        self.queue_table.setCellWidget(row, 2, progress_bar)
+        self.queue_rows[job.job_id] = (item, progress_bar)
+
+    def update_queue_row(self, job):
+        if job.job_id not in self.queue_rows:
+            return
+        item, progress_bar = self.queue_rows[job.job_id]
+        status = job.status + (" (cached)" if job.cached else "") + (f": {job.error}" if job.error else "")
+        if self.pool.cancelling(job.job_id):
+            status = "cancelling" + (" (fast runs finish their current stage)" if job.engine == "fast" and job.status == "running" else "")
+        self.queue_table.item(item.row(), 1).setText(status)
+        progress_bar.setValue(int(job.progress * 100))
+
+    # Runs on the poll timer: moves the progress bars and shows every finished run
+    def poll_pool(self):
+        updated, finished = self.pool.poll()
+        for job in updated:
+            self.update_queue_row(job)
+        for job, result in finished:
+            self.update_queue_row(job)
+            if job.status == "done":
+                self.current_run = job
+                self.update_results(*result)
+            elif job.status == "failed":
+                self.results_label.setText(f"Error: Backtest {job.description} failed: {job.error}")
+        if not self.pool.pending:
+            self.poll_timer.stop()
+
+    def cancel_selected(self):
+        for index in self.queue_table.selectionModel().selectedRows():
+            self.pool.cancel(self.queue_table.item(index.row(), 0).data(Qt.UserRole))
+        self.show_cancelling()
+
+    def cancel_all(self):
+        self.pool.cancel_all()
+        self.show_cancelling()
+
+    # Running jobs asked to stop say so until they do
+    def show_cancelling(self):
+        for job, _ in self.pool.jobs.values():
+            if self.pool.cancelling(job.job_id):
+                self.update_queue_row(job)
+
+    def clear_finished(self):
+        for row in reversed(range(self.queue_table.rowCount())):
+            job_id = self.queue_table.item(row, 0).data(Qt.UserRole)
+            if job_id not in self.pool.jobs:
+                self.queue_table.removeRow(row)
+                del self.queue_rows[job_id]
+
+    def closeEvent(self, event):
+        self.poll_timer.stop()
+        self.what_if_timer.stop()
+        if self.what_if_thread is not None:
+            self.what_if_thread.cancelled = True
+            self.what_if_thread.wait()
+        self.pool.shutdown()
+        super().closeEvent(event)
+
+    def show_optimizer(self):
+        manual_ticker = self.manual_ticker_input.text().strip()
+        stock_symbol = manual_ticker if manual_ticker else self.stock_combobox.currentText()
         start_date = self.start_date_edit.date().toString("yyyy-MM-dd")
         end_date = self.end_date_edit.date().toString("yyyy-MM-dd")
-        short_sma_period = int(self.short_sma_input.text())
-        long_sma_period = int(self.long_sma_input.text())
-        starting_cash = float(self.starting_cash_input.text())
-    
-        self.backtest_thread = BacktestThread(stock_symbol, start_date, end_date, short_sma_period, long_sma_period, starting_cash)
-        self.backtest_thread.result_signal.connect(self.update_results)
-        self.backtest_thread.start()
+        starting_cash = self.selected_starting_cash()
+        if starting_cash is None:
+            return
+        offline = self.offline_checkbox.isChecked()
+        interval, base_interval = self.selected_intervals()
+        execution = self.selected_execution()
+        if interval is None or execution is None:
+            return
+
+        optimizer_dialog = OptimizerDialog(
+            self, stock_symbol, start_date, end_date, starting_cash, offline, execution, interval, base_interval
+        )
+        optimizer_dialog.exec_()
+
+    def show_walk_forward(self):
+        manual_ticker = self.manual_ticker_input.text().strip()
+        stock_symbol = manual_ticker if manual_ticker else self.stock_combobox.currentText()
+        starting_cash = self.selected_starting_cash()
+        if starting_cash is None:
+            return
+        interval, base_interval = self.selected_intervals()
+        if interval is None:
+            return
+
+        walk_forward_dialog = WalkForwardDialog(
+            self, stock_symbol,
+            self.start_date_edit.date().toString("yyyy-MM-dd"), self.end_date_edit.date().toString("yyyy-MM-dd"),
+            starting_cash, self.offline_checkbox.isChecked(), interval, base_interval
+        )
+        walk_forward_dialog.exec_()
+
+    def show_portfolio(self):
+        manual_ticker = self.manual_ticker_input.text().strip()
+        stock_symbol = manual_ticker if manual_ticker else self.stock_combobox.currentText()
+        starting_cash = self.selected_starting_cash()
+        if starting_cash is None:
+            return
+        strategy = self.selected_strategy()
+        if strategy is None:
+            return
+        interval, base_interval = self.selected_intervals()
+        execution = self.selected_execution()
+        if interval is None or execution is None:
+            return
+
+        portfolio_dialog = PortfolioDialog(
+            self, stock_symbol,
+            self.start_date_edit.date().toString("yyyy-MM-dd"), self.end_date_edit.date().toString("yyyy-MM-dd"),
+            starting_cash, strategy,
+            self.engine_combobox.currentData(), self.offline_checkbox.isChecked(), interval, base_interval, execution
+        )
+        portfolio_dialog.exec_()
+
+    def show_prefetch(self):
+        interval, base_interval = self.selected_intervals()
+        if interval is None:
+            return
+        # The listed tickers by default; bars built by resampling need the base interval cached
+        stock_symbols = list(dict.fromkeys(self.stock_combobox.itemText(i) for i in range(self.stock_combobox.count())))
+        prefetch_dialog = PrefetchDialog(
+            self, ", ".join(stock_symbols),
+            self.start_date_edit.date().toString("yyyy-MM-dd"), self.end_date_edit.date().toString("yyyy-MM-dd"),
+            base_interval or interval
+        )
+        prefetch_dialog.exec_()
+
+    def show_screener(self):
+        interval, base_interval = self.selected_intervals()
+        if interval is None:
+            return
+        stock_symbols = list(dict.fromkeys(self.stock_combobox.itemText(i) for i in range(self.stock_combobox.count())))
+        screener_dialog = ScreenerDialog(
+            self, ", ".join(stock_symbols),
+            self.start_date_edit.date().toString("yyyy-MM-dd"), self.end_date_edit.date().toString("yyyy-MM-dd"),
+            self.short_sma_input.text(), self.long_sma_input.text(), interval, base_interval, self.offline_checkbox.isChecked()
+        )
+        screener_dialog.exec_()
+
+    def show_stream(self):
+        manual_ticker = self.manual_ticker_input.text().strip()
+        stock_symbol = manual_ticker if manual_ticker else self.stock_combobox.currentText()
+        # The stream trades the SMA crossover, whichever strategy is selected
+        strategy = self.selected_strategy(name="sma_cross")
+        if strategy is None:
+            return
+        starting_cash = self.selected_starting_cash()
+        if starting_cash is None:
+            return
+
+        stream_dialog = StreamDialog(
+            self, stock_symbol,
+            self.start_date_edit.date().toString("yyyy-MM-dd"), self.end_date_edit.date().toString("yyyy-MM-dd"),
+            strategy["short"], strategy["long"], starting_cash,
+            self.offline_checkbox.isChecked()
+        )
+        stream_dialog.exec_()
+
+    def show_history(self):
+        history_dialog = RunHistoryDialog(self)
+        history_dialog.exec_()
 
     def show_about(self):
             # Show an About dialog with clickable links
@@ -460,14 +1124,52 @@ class BacktestWindow(QWidget):
 <h2>Date Range</h2>
 <p>Specify the start and end dates for your backtest. Ensure there is sufficient historical data for the chosen SMA periods.</p>
 
+<h2>Strategy</h2>
+<p>Choose the trading strategy and enter its parameters; the periods count bars of the chosen interval. All strategies are long or flat:</p>
+<ul>
+    <li><b>SMA Crossover:</b> long while the short SMA is above the long SMA.</li>
+    <li><b>EMA Crossover:</b> long while the fast EMA is above the slow EMA.</li>
+    <li><b>RSI Mean Reversion:</b> buys when the RSI falls below the lower level and sells when it rises above the upper level.</li>
+    <li><b>Bollinger Breakout:</b> buys when the close breaks above the upper band and sells when it falls back below the middle band.</li>
+    <li><b>MACD:</b> long while the MACD line is above its signal line.</li>
+</ul>
+<p>Indicators are computed once per price series and shared, so running several strategies on the same ticker (e.g. the EMAs of EMA Crossover and MACD) does not compute them again. Backtests and portfolio backtests use the selected strategy; the optimizer, walk-forward validation and the live stream use the SMA crossover periods.</p>
+
 <h2>Short SMA Period</h2>
 <p>A short Simple Moving Average (SMA) reacts quickly to price changes. It is typically used to identify short-term trends.</p>
 
 <h2>Long SMA Period</h2>
 <p>A long SMA reacts more slowly to price changes, providing a broader view of overall trends.</p>
 
+<h2>Engine</h2>
+<ul>
+    <li><b>Backtrader (Cerebro):</b> The reference engine, processing the data bar by bar.</li>
+    <li><b>Fast (NumPy):</b> Computes the same trades and equity curve over the whole series at once. Much faster on long histories and intraday data.</li>
+</ul>
+
+<h2>Bar Interval</h2>
+<p>Backtests can run on 1, 5, 15 and 30 minute, hourly or daily bars. The SMA periods count bars of the chosen interval, so a 50 period SMA on hourly bars covers about 7 trading days, and the Sharpe, Sortino and Calmar ratios are annualized for the interval. Yahoo Finance only provides the last 7 days of 1 minute bars and the last 60 days of 5 to 30 minute bars. Instead of downloading the bars directly, you can build them from the cached bars of a shorter interval with <b>Resample cached ... bars</b>, e.g. hourly or daily bars from the 1 minute cache. The interval applies to backtests, portfolio backtests, the optimizer and walk-forward validation.</p>
+
+<h2>Prefetch Universe</h2>
+<p>Downloads the price data of many tickers into the local cache ahead of time, e.g. overnight, so later backtests of them start immediately. Tickers are fetched together in batched requests (<b>Tickers per Request</b>), several requests at once (<b>Requests at Once</b>), and requests that fail are retried with increasing waits (<b>Retries</b>). Only what is missing from the cache is downloaded. Each ticker gets a status: <i>downloaded</i>, <i>cached</i> (nothing new to download), <i>no data</i> (e.g. an unknown ticker or no trading in the range), <i>failed</i> with the error, or <i>cancelled</i>. The date range and bar interval (or the interval that is resampled) of the main window are used. Instead of Yahoo Finance, the bars can come from a folder of <i>TICKER.csv</i> files or a URL such as <i>http://127.0.0.1:8000/{symbol}.csv</i>.</p>
+
+<h2>What-If Re-runs</h2>
+<p>With <b>Auto Re-run on Changes</b> checked, the backtest runs again by itself shortly after you change any input, so you can explore settings interactively. Each step of the backtest is kept in memory and only the steps whose inputs changed are repeated: changing the starting cash or the execution settings reuses the downloaded bars and the indicators, a new SMA period computes just that one moving average, and going back to an earlier setting shows its result at once. Only the chart lines that changed are redrawn. <b>Run Backtest</b> also runs in this mode instead of queueing a worker process. The status line lists the reused steps.</p>
+
+<h2>Screen Universe</h2>
+<p>Ranks a whole universe of tickers by their SMA crossover signal at once, e.g. every morning before picking what to backtest. Enter the tickers or load them from a file (<b>Load Universe...</b>: one ticker per line, or a CSV file with a <i>ticker</i> or <i>symbol</i> column). For every ticker the table shows the current state (<i>long</i> while the short SMA is above the long SMA, otherwise <i>flat</i>), the bars since the last crossover and its date, how far apart the SMAs are, and the signal return, Sharpe ratio, max drawdown, trades and time in the market of the strategy over the last bars of the <b>Trailing Backtest</b>, next to buy and hold. The trailing backtest only follows the signal: it trades at the closes and without commissions, whereas a backtest fills at the next open and pays them, so it ranks tickers quickly but its return is not the result of a backtest. Click a column header to sort by it; double-click a ticker to use it in the main window. Missing price data is downloaded first, as by Prefetch Universe; all tickers are then screened together in a single pass, so thousands of tickers take seconds. Tickers with too little data, none at all, or no bars at the end of the range (<i>stale</i>) are listed without a signal.</p>
+
+<h2>Execution</h2>
+<p>Controls how the strategy's orders become trades. <b>Sizing</b> buys a fixed number of shares per trade, a percentage of the current equity (e.g. 95), or enough shares to target an annualized volatility (e.g. 0.15) based on the last 20 bars, without leverage. <b>Commission</b> is a rate of the order value (0.001 = 0.1%), or a schedule of rates by order value such as <i>0:0.001, 10000:0.0008, 100000:0.0005</i>. <b>Slippage</b> moves each fill against you by a fixed fraction of the price, or (Fast engine only) by the value times the order's share of the bar volume; fills never go beyond the bar's high or low. <b>Fill</b> executes orders at the next bar's open or at the close of the bar that gave the signal. The settings apply to backtests, portfolio backtests and the optimizer, and both engines give the same results.</p>
+
+<h2>Trades</h2>
+<p>Every fill of a backtest is recorded, by both engines, and paired into trades: entry and exit date and price, shares, commissions, net PnL, return and the number of bars held. The results show the number of trades, the win rate and the average PnL and holding period; <b>Show Trades</b> opens the full, sortable trade list, which can be exported to CSV or Parquet. A trade still open at the end of the backtest is valued at the last close. The trades are also included in the saved report.</p>
+
+<h2>Monte Carlo Robustness</h2>
+<p>The Sharpe Ratio and Max Drawdown of a backtest come from a single path of returns. After a run, <b>Run Monte Carlo</b> draws thousands of alternative paths from the run's own returns and shows the range of outcomes as confidence intervals (90%) and a fan chart; the analysis is included in the saved report. <b>Block bootstrap of bar returns</b> strings together randomly chosen blocks of consecutive bars (the block size), which keeps short-term patterns such as volatile periods. <b>Resampled trades</b> draws whole trades, each with the flat period after it, in a random order and with repetition. A wide interval, or a backtest near the edge of it, means the result depends heavily on the particular sequence of returns. The simulation uses all processor cores; 10,000 paths take seconds.</p>
+
 <h2>Sharpe Ratio</h2>
-<p>The Sharpe Ratio measures risk-adjusted returns. Higher values indicate better performance relative to risk.</p>
+<p>The Sharpe Ratio measures risk-adjusted returns. Higher values indicate better performance relative to risk. TradeWhiz annualizes the Sharpe Ratio of the daily portfolio returns.</p>
 <ul>
     <li><b>Low Value:</b> A Sharpe Ratio below 1 is generally considered low, suggesting that returns are not significantly greater than the risk taken.</li>
     <li><b>High Value:</b> A Sharpe Ratio above 2 is usually considered good, indicating that the strategy provides good returns relative to its risk.</li>
@@ -475,6 +1177,12 @@ class BacktestWindow(QWidget):
 </ul>
 <p><b>Backtesting Implications:</b> A higher Sharpe Ratio suggests that your strategy is providing consistent returns with lower risk. When optimizing your strategy, aim for a balance of returns and risk management. Extremely high Sharpe Ratios may sometimes indicate overfitting, especially with small datasets.</p>
 
+<h2>Sortino Ratio</h2>
+<p>Like the Sharpe Ratio, but only counts downside volatility as risk, so strategies are not penalized for large gains. Values are annualized.</p>
+
+<h2>Calmar Ratio</h2>
+<p>The annual growth rate (CAGR) divided by the Max Drawdown. Values above 1 mean the strategy earns more per year than its worst loss.</p>
+
 <h2>Max Drawdown</h2>
 <p>Max Drawdown represents the largest percentage loss from a portfolio peak, showing the worst possible loss in a given period.</p>
 <ul>
@@ -523,6 +1231,30 @@ class BacktestWindow(QWidget):
     <li><b>Emotional Control:</b> Stick to your strategy and avoid letting emotions drive your trading decisions.</li>
 </ul>
 
+<h2>Offline Mode</h2>
+<p>Downloaded prices are cached per ticker in the <i>price_cache</i> folder, and later runs only download the dates that are missing. The prices are stored column by column and read memory-mapped, so even years of intraday bars are loaded instantly and do not have to fit in memory. With Offline Mode enabled, TradeWhiz never contacts Yahoo Finance and uses only the cached data.</p>
+
+<h2>Walk-Forward Validation</h2>
+<p>Splits the date range into rolling windows. In each window the SMA periods are optimized on the train part (e.g. 756 bars, about 3 years) and then traded on the following test part (e.g. 252 bars, about 1 year). The chart joins the test results into one out-of-sample equity curve. This is a better estimate of real performance than a single optimized backtest. Windows run in parallel on all CPU cores.</p>
+
+<h2>Performance Panel</h2>
+<p>After every run the panel below the results shows how long each stage took (download, indicator calculation, engine, metrics, result store and chart drawing), the number of bars processed and orders issued. Each run is also appended to performance_log.jsonl in the working folder and included in the PDF report. Enable <b>Profile Runs</b> to capture a cProfile of the backtest; <b>Show Profile</b> lists the slowest functions. Profiling makes Backtrader runs noticeably slower.</p>
+
+<h2>Run Queue</h2>
+<p>Each click on <b>Run TradeWhiz</b> adds a backtest to the run queue, so you can queue several tickers or SMA settings without waiting. The queued runs are processed in the background by worker processes, several at a time, and the table shows the status and progress of each one. The results of every finished run are shown as soon as it completes. Select runs and click <b>Cancel Selected</b>, or click <b>Cancel All</b>, to stop them; a queued run is removed before it starts and a running Cerebro run stops within a moment. The fast engine computes a run in one vectorized pass, so a running fast run only stops between its stages (loading the bars, the indicators, the engine) and usually finishes first; its status shows <i>cancelling</i> until then. <b>Clear Finished</b> removes finished and cancelled runs from the table.</p>
+
+<h2>Past Runs</h2>
+<p>Every finished backtest is saved in a local result store (results.db) together with its equity curve. Running the same ticker, dates, strategy parameters, starting cash and engine again on unchanged price data loads the stored result instantly instead of running the backtest again. If the price data changes, for example because new bars were downloaded, the backtest runs again. The Past Runs window lists the stored runs; select several to compare their equity curves and metrics.</p>
+
+<h2>Portfolio Backtest</h2>
+<p>Runs the selected strategy on a list of tickers at once. The starting cash is split over the tickers, equally or by the weights you enter (e.g. <i>AAPL:2, MSFT:1</i>). Prices are downloaded concurrently and the tickers are backtested in parallel. The table shows the metrics per ticker and the chart shows the combined portfolio equity.</p>
+
+<h2>Live / Replay Stream</h2>
+<p>Paper-trades the SMA strategy one bar at a time. Bars can come from a replay of the selected ticker, a CSV file, or a socket sending one JSON bar per line (<i>python tradewhiz_stream.py prices.csv</i> serves a CSV file this way). The SMAs, signals, equity curve and charts update as every bar arrives.</p>
+
+<h2>Optimize SMA Periods</h2>
+<p>Evaluates every short/long SMA combination in the given ranges with the Fast engine, using all CPU cores and a single download. Results are ranked by portfolio value and shown as a heatmap. "Use Best Periods" copies the top combination into the main window.</p>
+
 <h2>Equity Curve</h2>
 <p>A graph showing the portfolio value over time. It helps visualize performance and trends.</p>
 
@@ -557,85 +1289,1357 @@ class BacktestWindow(QWidget):
         
  
 
-class BacktestThread(QThread):
-    result_signal = pyqtSignal(object, object, object, object, object)  # Added price_data to the signal
+class OptimizerDialog(QDialog):
+    def __init__(self, parent, stock_symbol, start_date, end_date, starting_cash, offline=False, execution=None, interval="1d",
+                 base_interval=None):
+        super().__init__(parent)
+        self.stock_symbol = stock_symbol
+        self.start_date = start_date
+        self.end_date = end_date
+        self.starting_cash = starting_cash
+        self.offline = offline
+        self.execution = execution or ExecutionModel()
+        self.interval = interval
+        self.base_interval = base_interval
+        self.results = None
+
+        self.setWindowTitle(f"Optimize SMA Periods - {stock_symbol}")
+        self.setMinimumSize(800, 600)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(
+            f"{stock_symbol} {INTERVAL_NAMES[interval]} bars from {start_date} to {end_date}, starting cash ${starting_cash:,.2f}"
+        ))
+        layout.addWidget(QLabel(f"Execution: {self.execution.describe()}"))
+
+        layout.addWidget(QLabel("Short SMA Range (start, stop, step):"))
+        self.short_range_input = QLineEdit("10, 100, 10")
+        layout.addWidget(self.short_range_input)
+
+        layout.addWidget(QLabel("Long SMA Range (start, stop, step):"))
+        self.long_range_input = QLineEdit("50, 300, 25")
+        layout.addWidget(self.long_range_input)
+
+        self.run_button = QPushButton("Run Optimization")
+        self.run_button.setStyleSheet("background-color: #0d47a1; color: white; font-weight: bold;")
+        self.run_button.clicked.connect(self.run_optimization)
+        layout.addWidget(self.run_button)
+
+        self.apply_button = QPushButton("Use Best Periods")
+        self.apply_button.clicked.connect(self.apply_best)
+        self.apply_button.setEnabled(False)
+        layout.addWidget(self.apply_button)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        # Ranked results
+        self.results_table = QTableWidget(0, 5)
+        self.results_table.setHorizontalHeaderLabels(["Short SMA", "Long SMA", "Portfolio Value", "Sharpe Ratio", "Max Drawdown"])
+        self.results_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.results_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.results_table)
+
+        # Heatmap of portfolio value per period pair
+        self.figure_heatmap = Figure()
+        self.heatmap_canvas = FigureCanvas(self.figure_heatmap)
+        layout.addWidget(self.heatmap_canvas)
+
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+        layout.addWidget(close_button)
 
-    def __init__(self, stock_symbol, start_date, end_date, short_sma_period, long_sma_period, starting_cash):
+        self.setLayout(layout)
+
+    def run_optimization(self):
+        try:
+            short_sma_periods = parse_period_range(self.short_range_input.text())
+            long_sma_periods = parse_period_range(self.long_range_input.text())
+        except ValueError as e:
+            QMessageBox.warning(self, "Invalid Range", str(e))
+            return
+
+        self.run_button.setEnabled(False)
+        self.apply_button.setEnabled(False)
+        self.status_label.setText(f"Evaluating up to {len(short_sma_periods) * len(long_sma_periods)} combinations...")
+
+        self.optimizer_thread = OptimizerThread(
+            self.stock_symbol, self.start_date, self.end_date, short_sma_periods, long_sma_periods, self.starting_cash, self.offline,
+            self.execution, self.interval, self.base_interval
+        )
+        self.optimizer_thread.result_signal.connect(self.update_results)
+        self.optimizer_thread.start()
+
+    def update_results(self, results):
+        self.run_button.setEnabled(True)
+
+        if results is None or results.empty:
+            self.status_label.setText("Error: Optimization failed. Check the date range and period ranges.")
+            return
+
+        self.results = results
+        self.apply_button.setEnabled(True)
+        self.status_label.setText(f"Optimization complete: {len(results)} combinations evaluated.")
+
+        # Fill the ranked table
+        self.results_table.setSortingEnabled(False)
+        self.results_table.setRowCount(len(results))
+        for row, values in enumerate(results.itertuples(index=False)):
+            for column, value in enumerate(values):
+                item = QTableWidgetItem()
+                item.setData(Qt.DisplayRole, int(value) if column < 2 else round(float(value), 4))
+                self.results_table.setItem(row, column, item)
+        self.results_table.setSortingEnabled(True)
+        self.results_table.sortItems(2, Qt.DescendingOrder)
+
+        # Plot the heatmap
+        heatmap = results.pivot(index="short_sma", columns="long_sma", values="portfolio_value")
+        self.figure_heatmap.clear()
+        ax = self.figure_heatmap.add_subplot(111)
+        image = ax.imshow(heatmap.to_numpy(), aspect="auto", origin="lower", cmap="viridis")
+        ax.set_xticks(range(len(heatmap.columns)))
+        ax.set_xticklabels(heatmap.columns, rotation=90)
+        ax.set_yticks(range(len(heatmap.index)))
+        ax.set_yticklabels(heatmap.index)
+        ax.set_title("Portfolio Value by SMA Periods")
+        ax.set_xlabel("Long SMA Period")
+        ax.set_ylabel("Short SMA Period")
+        self.figure_heatmap.colorbar(image, ax=ax)
+        self.figure_heatmap.tight_layout()
+        self.heatmap_canvas.draw()
+
+    def apply_best(self):
+        best = self.results.iloc[0]
+        self.parent().short_sma_input.setText(str(int(best["short_sma"])))
+        self.parent().long_sma_input.setText(str(int(best["long_sma"])))
+
+
+class OptimizerThread(QThread):
+    result_signal = pyqtSignal(object)
+
+    def __init__(self, stock_symbol, start_date, end_date, short_sma_periods, long_sma_periods, starting_cash, offline=False, execution=None,
+                 interval="1d", base_interval=None):
         super().__init__()
         self.stock_symbol = stock_symbol
         self.start_date = start_date
         self.end_date = end_date
-        self.short_sma_period = short_sma_period
-        self.long_sma_period = long_sma_period
+        self.short_sma_periods = short_sma_periods
+        self.long_sma_periods = long_sma_periods
         self.starting_cash = starting_cash
-     
- 
+        self.offline = offline
+        self.execution = execution
+        self.interval = interval
+        self.base_interval = base_interval
+
+    def run(self):
+        try:
+            # Download once, then evaluate the whole grid on all cores
+            data = load_bars(self.stock_symbol, self.start_date, self.end_date, self.offline, self.interval, self.base_interval)
+            results = optimize_sma_grid(
+                data, self.short_sma_periods, self.long_sma_periods, self.starting_cash, execution=self.execution, interval=self.interval
+            )
+        except Exception as e:
+            print(f"Optimization failed: {e}")
+            results = None
+        self.result_signal.emit(results)
+
+
+class WalkForwardDialog(QDialog):
+    def __init__(self, parent, stock_symbol, start_date, end_date, starting_cash, offline=False, interval="1d", base_interval=None):
+        super().__init__(parent)
+        self.stock_symbol = stock_symbol
+        self.start_date = start_date
+        self.end_date = end_date
+        self.starting_cash = starting_cash
+        self.offline = offline
+        self.interval = interval
+        self.base_interval = base_interval
+
+        self.setWindowTitle(f"Walk-Forward Validation - {stock_symbol}")
+        self.setMinimumSize(800, 600)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(
+            f"{stock_symbol} {INTERVAL_NAMES[interval]} bars from {start_date} to {end_date}, starting cash ${starting_cash:,.2f}"
+        ))
+
+        layout.addWidget(QLabel("Short SMA Range (start, stop, step):"))
+        self.short_range_input = QLineEdit("10, 100, 10")
+        layout.addWidget(self.short_range_input)
+
+        layout.addWidget(QLabel("Long SMA Range (start, stop, step):"))
+        self.long_range_input = QLineEdit("50, 300, 25")
+        layout.addWidget(self.long_range_input)
+
+        layout.addWidget(QLabel("Train Window (bars):"))
+        self.train_bars_input = QLineEdit("756")
+        layout.addWidget(self.train_bars_input)
+
+        layout.addWidget(QLabel("Test Window (bars):"))
+        self.test_bars_input = QLineEdit("252")
+        layout.addWidget(self.test_bars_input)
+
+        layout.addWidget(QLabel("Optimize For:"))
+        self.objective_combobox = QComboBox()
+        for objective in OBJECTIVES:
+            self.objective_combobox.addItem(objective.replace("_", " ").title(), objective)
+        layout.addWidget(self.objective_combobox)
+
+        self.run_button = QPushButton("Run Walk-Forward")
+        self.run_button.setStyleSheet("background-color: #0d47a1; color: white; font-weight: bold;")
+        self.run_button.clicked.connect(self.run_walk_forward)
+        layout.addWidget(self.run_button)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        # One row per window
+        self.results_table = QTableWidget(0, 8)
+        self.results_table.setHorizontalHeaderLabels([
+            "Test Start", "Test End", "Short SMA", "Long SMA", "Train Score", "Test Profit", "Test Sharpe", "Test Max Drawdown"
+        ])
+        self.results_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.results_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.results_table)
+
+        # Stitched out-of-sample equity curve
+        self.figure_oos = Figure()
+        self.oos_canvas = FigureCanvas(self.figure_oos)
+        layout.addWidget(self.oos_canvas)
+
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+        layout.addWidget(close_button)
+
+        self.setLayout(layout)
+
+    def run_walk_forward(self):
+        try:
+            short_sma_periods = parse_period_range(self.short_range_input.text())
+            long_sma_periods = parse_period_range(self.long_range_input.text())
+            train_bars = int(self.train_bars_input.text())
+            test_bars = int(self.test_bars_input.text())
+            if train_bars < 2 or test_bars < 1:
+                raise ValueError("The train and test windows must be positive.")
+        except ValueError as e:
+            QMessageBox.warning(self, "Invalid Input", str(e))
+            return
+
+        self.run_button.setEnabled(False)
+        self.status_label.setText("Running walk-forward windows...")
+
+        self.walk_forward_thread = WalkForwardThread(
+            self.stock_symbol, self.start_date, self.end_date, short_sma_periods, long_sma_periods,
+            train_bars, test_bars, self.starting_cash, self.objective_combobox.currentData(), self.offline, self.interval,
+            self.base_interval
+        )
+        self.walk_forward_thread.result_signal.connect(self.update_results)
+        self.walk_forward_thread.start()
+
+    def update_results(self, windows, oos_equity, error):
+        self.run_button.setEnabled(True)
+
+        if error or oos_equity.empty:
+            self.status_label.setText(f"Error: Walk-forward failed. {error}")
+            return
 
+        equity_curve = oos_equity.to_numpy()
+        self.status_label.setText(
+            f"{len(windows)} windows. Out-of-sample Portfolio Value: {equity_curve[-1]:.2f}   "
+            f"Sharpe Ratio: {calculate_sharpe_ratio(equity_curve, periods_per_year=periods_per_year(self.interval)):.2f}   "
+            f"Max Drawdown: {calculate_max_drawdown(equity_curve):.2f}"
+        )
+
+        columns = ["test_start", "test_end", "short_sma", "long_sma", "train_score", "test_profit", "test_sharpe", "test_max_drawdown"]
+        self.results_table.setRowCount(len(windows))
+        for row, values in enumerate(windows[columns].itertuples(index=False)):
+            for column, value in enumerate(values):
+                if column < 2:
+                    text = value.strftime("%Y-%m-%d")
+                elif value is None or pd.isna(value):
+                    text = "N/A"
+                elif column < 4:
+                    text = str(int(value))
+                else:
+                    text = f"{value:.4f}"
+                self.results_table.setItem(row, column, QTableWidgetItem(text))
+
+        self.figure_oos.clear()
+        ax = self.figure_oos.add_subplot(111)
+        self.lod_line = plot_decimated(ax, oos_equity.index, equity_curve, label="Out-of-Sample Equity")
+        for test_start in windows["test_start"]:
+            ax.axvline(test_start, color="grey", linewidth=0.5, alpha=0.5)
+        ax.set_title("Walk-Forward Out-of-Sample Equity Curve")
+        ax.set_xlabel("Date")
+        ax.set_ylabel("Portfolio Value")
+        ax.legend()
+        self.oos_canvas.draw()
 
 
+class WalkForwardThread(QThread):
+    result_signal = pyqtSignal(object, object, str)
+
+    def __init__(self, stock_symbol, start_date, end_date, short_sma_periods, long_sma_periods, train_bars, test_bars,
+                 starting_cash, objective="portfolio_value", offline=False, interval="1d", base_interval=None):
+        super().__init__()
+        self.stock_symbol = stock_symbol
+        self.start_date = start_date
+        self.end_date = end_date
+        self.short_sma_periods = short_sma_periods
+        self.long_sma_periods = long_sma_periods
+        self.train_bars = train_bars
+        self.test_bars = test_bars
+        self.starting_cash = starting_cash
+        self.objective = objective
+        self.offline = offline
+        self.interval = interval
+        self.base_interval = base_interval
+
     def run(self):
-        portfolio_value, sharpe_ratio, max_drawdown, equity_curve, price_data = self.backtest(
-            self.stock_symbol, self.start_date, self.end_date, self.short_sma_period, self.long_sma_period, self.starting_cash
+        try:
+            # Download once; all windows share the same price arrays
+            data = load_bars(self.stock_symbol, self.start_date, self.end_date, self.offline, self.interval, self.base_interval)
+            windows, oos_equity = walk_forward(
+                data, self.short_sma_periods, self.long_sma_periods, self.train_bars, self.test_bars,
+                self.starting_cash, self.objective, interval=self.interval
+            )
+            self.result_signal.emit(windows, oos_equity, "")
+        except Exception as e:
+            self.result_signal.emit(None, None, str(e))
+
+
+class RunHistoryDialog(QDialog):
+    COLUMNS = [
+        ("id", "Run"), ("ticker", "Ticker"), ("start_date", "Start"), ("end_date", "End"), ("strategy", "Strategy"),
+        ("short_sma", "Short SMA"), ("long_sma", "Long SMA"), ("starting_cash", "Starting Cash"), ("engine", "Engine"),
+        ("portfolio_value", "Portfolio Value"), ("sharpe_ratio", "Sharpe Ratio"), ("max_drawdown", "Max Drawdown"),
+        ("created_at", "Run At"),
+    ]
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.store = ResultStore()
+        self.lod_lines = []
+
+        self.setWindowTitle("Past Runs")
+        self.setMinimumSize(900, 650)
+
+        layout = QVBoxLayout()
+
+        layout.addWidget(QLabel("Filter by Ticker (empty for all):"))
+        self.ticker_filter_input = QLineEdit()
+        self.ticker_filter_input.returnPressed.connect(self.load_runs)
+        layout.addWidget(self.ticker_filter_input)
+
+        self.refresh_button = QPushButton("Refresh")
+        self.refresh_button.clicked.connect(self.load_runs)
+        layout.addWidget(self.refresh_button)
+
+        # Sortable table of stored runs; select several rows to compare them
+        self.runs_table = QTableWidget(0, len(self.COLUMNS))
+        self.runs_table.setHorizontalHeaderLabels([title for _, title in self.COLUMNS])
+        self.runs_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.runs_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.runs_table.setSelectionBehavior(QTableWidget.SelectRows)
+        layout.addWidget(self.runs_table)
+
+        self.compare_button = QPushButton("Compare Selected")
+        self.compare_button.setStyleSheet("background-color: #0d47a1; color: white; font-weight: bold;")
+        self.compare_button.clicked.connect(self.compare_selected)
+        layout.addWidget(self.compare_button)
+
+        self.delete_button = QPushButton("Delete Selected")
+        self.delete_button.clicked.connect(self.delete_selected)
+        layout.addWidget(self.delete_button)
+
+        self.status_label = QLabel("")
+        self.status_label.setWordWrap(True)
+        layout.addWidget(self.status_label)
+
+        # Equity curves of the compared runs
+        self.figure_compare = Figure()
+        self.compare_canvas = FigureCanvas(self.figure_compare)
+        layout.addWidget(self.compare_canvas)
+
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+        layout.addWidget(close_button)
+
+        self.setLayout(layout)
+        self.load_runs()
+
+    def load_runs(self):
+        runs = self.store.runs(ticker=self.ticker_filter_input.text().strip() or None)
+
+        self.runs_table.setSortingEnabled(False)
+        self.runs_table.setRowCount(len(runs))
+        for row, values in enumerate(runs[[name for name, _ in self.COLUMNS]].itertuples(index=False)):
+            for column, value in enumerate(values):
+                item = QTableWidgetItem()
+                if isinstance(value, str):
+                    item.setData(Qt.DisplayRole, value)
+                elif pd.isna(value):
+                    item.setData(Qt.DisplayRole, "N/A")
+                elif isinstance(value, (int, np.integer)):
+                    item.setData(Qt.DisplayRole, int(value))
+                else:
+                    item.setData(Qt.DisplayRole, round(float(value), 4))
+                self.runs_table.setItem(row, column, item)
+        self.runs_table.setSortingEnabled(True)
+        self.status_label.setText(f"{len(runs)} stored runs in {self.store.path}")
+
+    def selected_run_ids(self):
+        rows = sorted({index.row() for index in self.runs_table.selectionModel().selectedRows()})
+        return [int(self.runs_table.item(row, 0).text()) for row in rows]
+
+    def compare_selected(self):
+        run_ids = self.selected_run_ids()
+        if not run_ids:
+            QMessageBox.warning(self, "No Selection", "Select one or more runs to compare.")
+            return
+
+        comparison = self.store.compare(run_ids)
+        curves = self.store.equity_curves(run_ids)
+
+        self.figure_compare.clear()
+        ax = self.figure_compare.add_subplot(111)
+        self.lod_lines = []
+        for run_id, curve in curves.items():
+            run = comparison.loc[run_id]
+            strategy = f"{run['short_sma']}/{run['long_sma']}" if run["strategy"] == "sma_cross" else run["strategy"]
+            label = f"#{run_id} {run['ticker']} {strategy} ({run['engine']})"
+            self.lod_lines.append(plot_decimated(ax, np.arange(len(curve)), curve, label=label))
+        ax.set_title("Equity Curves of Selected Runs")
+        ax.set_xlabel("Time")
+        ax.set_ylabel("Portfolio Value")
+        ax.legend()
+        self.compare_canvas.draw()
+
+        self.status_label.setText("   ".join(
+            f"#{run_id}: return {run['total_return']:.2%}, Sortino {run['sortino_ratio']:.2f}, Calmar {run['calmar_ratio']:.2f}"
+            for run_id, run in comparison.iterrows()
+        ))
+
+    def delete_selected(self):
+        run_ids = self.selected_run_ids()
+        if run_ids:
+            self.store.delete(run_ids)
+            self.load_runs()
+
+
+# Sortable table of a run's trades, with CSV and Parquet export
+class TradesDialog(QDialog):
+    COLUMNS = [
+        ("entry_date", "Entry"), ("exit_date", "Exit"), ("shares", "Shares"), ("entry_price", "Entry Price"),
+        ("exit_price", "Exit Price"), ("commission", "Commission"), ("pnl", "PnL"), ("trade_return", "Return (%)"),
+        ("bars_held", "Bars Held"), ("status", "Status"),
+    ]
+
+    def __init__(self, parent, trades, name):
+        super().__init__(parent)
+        self.trades = trades
+        self.name = name
+
+        self.setWindowTitle(f"Trades - {name}")
+        self.setMinimumSize(900, 600)
+
+        layout = QVBoxLayout()
+
+        summary_label = QLabel("   ".join(f"{label}: {value}" for label, value in trade_summary_rows(trade_summary(trades))[1:]))
+        summary_label.setWordWrap(True)
+        layout.addWidget(summary_label)
+
+        self.trades_table = QTableWidget(len(trades), len(self.COLUMNS))
+        self.trades_table.setHorizontalHeaderLabels([title for _, title in self.COLUMNS])
+        self.trades_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.trades_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.trades_table.setSelectionBehavior(QTableWidget.SelectRows)
+        for row, values in enumerate(trades[[name for name, _ in self.COLUMNS]].itertuples(index=False)):
+            for column, (key, value) in enumerate(zip([name for name, _ in self.COLUMNS], values)):
+                item = QTableWidgetItem()
+                if isinstance(value, pd.Timestamp):
+                    item.setData(Qt.DisplayRole, str(value.date()) if value == value.normalize() else str(value))
+                elif isinstance(value, str):
+                    item.setData(Qt.DisplayRole, value)
+                elif key == "trade_return":
+                    item.setData(Qt.DisplayRole, round(float(value) * 100, 2))
+                elif isinstance(value, (int, np.integer)):
+                    item.setData(Qt.DisplayRole, int(value))
+                else:
+                    item.setData(Qt.DisplayRole, round(float(value), 2))
+                self.trades_table.setItem(row, column, item)
+        self.trades_table.setSortingEnabled(True)
+        self.trades_table.sortByColumn(0, Qt.AscendingOrder)
+        layout.addWidget(self.trades_table)
+
+        export_buttons = QHBoxLayout()
+        export_csv_button = QPushButton("Export CSV")
+        export_csv_button.clicked.connect(lambda: self.export("CSV Files (*.csv)", ".csv"))
+        export_buttons.addWidget(export_csv_button)
+        export_parquet_button = QPushButton("Export Parquet")
+        export_parquet_button.clicked.connect(lambda: self.export("Parquet Files (*.parquet)", ".parquet"))
+        export_buttons.addWidget(export_parquet_button)
+        layout.addLayout(export_buttons)
+
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+        layout.addWidget(close_button)
+
+        self.setLayout(layout)
+
+    def export(self, file_filter, extension):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Trades", f"{self.name}_trades{extension}", file_filter)
+        if not file_path:
+            return
+        if not file_path.lower().endswith(extension):
+            file_path += extension
+        try:
+            export_trades(self.trades, file_path)
+        except ImportError as e:
+            QMessageBox.critical(self, "Error", f"Parquet export needs pyarrow or fastparquet: {e}")
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Failed to export trades: {e}")
+
+
+class PortfolioDialog(QDialog):
+    def __init__(self, parent, stock_symbols, start_date, end_date, starting_cash, strategy, engine="fast", offline=False,
+                 interval="1d", base_interval=None, execution=None):
+        super().__init__(parent)
+        self.interval = interval
+        self.base_interval = base_interval
+        self.execution = execution or ExecutionModel()
+        self.start_date = start_date
+        self.end_date = end_date
+        self.strategy = strategy
+        self.starting_cash = starting_cash
+        self.engine = engine
+        self.offline = offline
+
+        self.setWindowTitle("Portfolio Backtest")
+        self.setMinimumSize(800, 600)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(
+            f"From {start_date} to {end_date}, {INTERVAL_NAMES[interval]} bars, {strategy.describe()}, "
+            f"starting cash ${starting_cash:,.2f}"
+        ))
+        layout.addWidget(QLabel(f"Execution: {self.execution.describe()}"))
+
+        layout.addWidget(QLabel("Tickers (comma separated):"))
+        self.tickers_input = QLineEdit(stock_symbols)
+        layout.addWidget(self.tickers_input)
+
+        layout.addWidget(QLabel("Cash Allocation Weights (optional, e.g. AAPL:2, MSFT:1; default equal):"))
+        self.weights_input = QLineEdit("")
+        layout.addWidget(self.weights_input)
+
+        self.run_button = QPushButton("Run Portfolio")
+        self.run_button.setStyleSheet("background-color: #0d47a1; color: white; font-weight: bold;")
+        self.run_button.clicked.connect(self.run_portfolio)
+        layout.addWidget(self.run_button)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        # Per-ticker results
+        self.results_table = QTableWidget(0, 6)
+        self.results_table.setHorizontalHeaderLabels(["Ticker", "Allocation", "Portfolio Value", "Sharpe Ratio", "Max Drawdown", "Status"])
+        self.results_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.results_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.results_table)
+
+        # Aggregate equity curve
+        self.figure_portfolio = Figure()
+        self.portfolio_canvas = FigureCanvas(self.figure_portfolio)
+        layout.addWidget(NavigationToolbar(self.portfolio_canvas, self))
+        layout.addWidget(self.portfolio_canvas)
+
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+        layout.addWidget(close_button)
+
+        self.setLayout(layout)
+
+    def run_portfolio(self):
+        stock_symbols = list(dict.fromkeys(t.strip().upper() for t in self.tickers_input.text().split(",") if t.strip()))
+        if not stock_symbols or not all(symbol.isalnum() for symbol in stock_symbols):
+            QMessageBox.warning(self, "Invalid Ticker", "Please enter one or more valid ticker symbols separated by commas.")
+            return
+        try:
+            weights = parse_weights(stock_symbols, self.weights_input.text())
+        except ValueError:
+            QMessageBox.warning(self, "Invalid Weights", "Weights must look like AAPL:2, MSFT:1.")
+            return
+
+        self.run_button.setEnabled(False)
+        self.status_label.setText(f"Running {len(stock_symbols)} tickers...")
+
+        self.portfolio_thread = PortfolioThread(
+            stock_symbols, self.start_date, self.end_date, self.strategy,
+            self.starting_cash, weights, self.engine, self.offline, self.interval, self.base_interval, self.execution
         )
-        self.result_signal.emit(portfolio_value, sharpe_ratio, max_drawdown, equity_curve, price_data)
+        self.portfolio_thread.result_signal.connect(self.update_results)
+        self.portfolio_thread.start()
 
-    def backtest(self, stock_symbol, start_date, end_date, short_sma_period, long_sma_period, starting_cash):
-        # Download data from Yahoo Finance
-        data = yf.download(stock_symbol, start=start_date, end=end_date)
-    
-        if len(data) < long_sma_period:
-            return None, None, None, None, None
-    
-        # If the DataFrame has a MultiIndex, flatten it
-        if isinstance(data.columns, pd.MultiIndex):
-            # Flatten the MultiIndex and use the first level of the index (e.g., 'Adj Close', 'Close', etc.)
-            data.columns = [col[0] for col in data.columns]
-    
-        # Rename columns to standardize them
-        data = data.rename(columns={
-            'Adj Close': 'close', 
-            'Open': 'open', 
-            'High': 'high', 
-            'Low': 'low', 
-            'Volume': 'volume'
-        })
-    
-        # Ensure "close" column exists
-        if "close" not in data.columns:
-            raise KeyError("The 'close' column is missing from the downloaded data. Verify the data source.")
-    
-        # Calculate SMAs
-        data["short_sma"] = data["close"].rolling(window=short_sma_period).mean()
-        data["long_sma"] = data["close"].rolling(window=long_sma_period).mean()
-    
-        # Prepare data feed for Backtrader
-        data_feed = bt.feeds.PandasData(dataname=data)
-    
-        # Initialize Cerebro
-        cerebro = bt.Cerebro()
-        cerebro.adddata(data_feed)
-        cerebro.addstrategy(SMAStrategy)
-        cerebro.addobserver(bt.observers.Value)  # Track portfolio value
-    
-        # Broker settings
-        cerebro.broker.set_cash(starting_cash)
-        cerebro.broker.setcommission(commission=0.001)
-        cerebro.addsizer(bt.sizers.FixedSize, stake=10)
-    
-        # Run backtest
-        results = cerebro.run()
-    
-        # Get portfolio value and equity curve
-        strategy = results[0]  # Access the strategy instance
-        equity_curve = strategy.equity_curve
-        portfolio_value = cerebro.broker.getvalue()
-        sharpe_ratio = calculate_sharpe_ratio(np.diff(equity_curve))
+    def update_results(self, summary, portfolio_equity):
+        self.run_button.setEnabled(True)
+
+        if summary is None or portfolio_equity.empty:
+            self.status_label.setText("Error: Portfolio backtest failed. Check logs for details.")
+            return
+
+        equity_curve = portfolio_equity.to_numpy()
+        sharpe_ratio = calculate_sharpe_ratio(equity_curve, periods_per_year=periods_per_year(self.interval))
         max_drawdown = calculate_max_drawdown(equity_curve)
-    
-        # Extract only the required columns for price_data
-        price_data = data[["close", "short_sma", "long_sma"]]
-    
-        return portfolio_value, sharpe_ratio, max_drawdown, equity_curve, price_data
+        self.status_label.setText(
+            f"Portfolio Value: {equity_curve[-1]:.2f}   Sharpe Ratio: {sharpe_ratio:.2f}   Max Drawdown: {max_drawdown:.2f}"
+        )
+
+        # Fill the per-ticker table
+        self.results_table.setSortingEnabled(False)
+        self.results_table.setRowCount(len(summary))
+        for row, values in enumerate(summary.itertuples(index=False)):
+            for column, value in enumerate(values):
+                item = QTableWidgetItem()
+                if isinstance(value, str):
+                    item.setData(Qt.DisplayRole, value)
+                elif value is None or np.isnan(value):
+                    item.setData(Qt.DisplayRole, "N/A")
+                else:
+                    item.setData(Qt.DisplayRole, round(float(value), 4))
+                self.results_table.setItem(row, column, item)
+        self.results_table.setSortingEnabled(True)
+        self.results_table.sortItems(0, Qt.AscendingOrder)
+
+        # Plot the aggregate equity curve
+        self.figure_portfolio.clear()
+        ax = self.figure_portfolio.add_subplot(111)
+        self.lod_line = plot_decimated(ax, portfolio_equity.index, equity_curve, label="Portfolio Equity")
+        ax.set_title("Portfolio Equity Curve")
+        ax.set_xlabel("Date")
+        ax.set_ylabel("Portfolio Value")
+        ax.legend()
+        self.portfolio_canvas.draw()
+
+
+class PortfolioThread(QThread):
+    result_signal = pyqtSignal(object, object)
+
+    def __init__(self, stock_symbols, start_date, end_date, strategy, starting_cash, weights, engine="fast", offline=False,
+                 interval="1d", base_interval=None, execution=None):
+        super().__init__()
+        self.interval = interval
+        self.base_interval = base_interval
+        self.execution = execution
+        self.stock_symbols = stock_symbols
+        self.start_date = start_date
+        self.end_date = end_date
+        self.strategy = strategy
+        self.starting_cash = starting_cash
+        self.weights = weights
+        self.engine = engine
+        self.offline = offline
+
+    def run(self):
+        try:
+            summary, portfolio_equity = portfolio_backtest(
+                self.stock_symbols, self.start_date, self.end_date, 0, 0,
+                self.starting_cash, self.weights, self.engine, self.offline, None, self.interval, self.base_interval,
+                self.execution, self.strategy
+            )
+        except Exception as e:
+            print(f"Portfolio backtest failed: {e}")
+            summary, portfolio_equity = None, None
+        self.result_signal.emit(summary, portfolio_equity)
+
+
+class PrefetchDialog(QDialog):
+    def __init__(self, parent, stock_symbols, start_date, end_date, interval="1d"):
+        super().__init__(parent)
+        self.start_date = start_date
+        self.end_date = end_date
+        self.interval = interval
+        self.prefetch_thread = None
+
+        self.setWindowTitle("Prefetch Universe")
+        self.setMinimumSize(800, 600)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(f"Download {INTERVAL_NAMES[interval]} bars from {start_date} to {end_date} into the price cache"))
+
+        layout.addWidget(QLabel("Tickers (comma or space separated):"))
+        self.tickers_input = QTextEdit(stock_symbols)
+        self.tickers_input.setMaximumHeight(80)
+        layout.addWidget(self.tickers_input)
+
+        form = QFormLayout()
+        self.source_input = QLineEdit("")
+        self.source_input.setPlaceholderText("Yahoo Finance")
+        form.addRow("Source (CSV folder or URL with {symbol}, optional):", self.source_input)
+        self.batch_size_input = QLineEdit("50")
+        form.addRow("Tickers per Request:", self.batch_size_input)
+        self.workers_input = QLineEdit("4")
+        form.addRow("Requests at Once:", self.workers_input)
+        self.retries_input = QLineEdit("3")
+        form.addRow("Retries:", self.retries_input)
+        layout.addLayout(form)
+
+        buttons = QHBoxLayout()
+        self.start_button = QPushButton("Start")
+        self.start_button.setStyleSheet("background-color: #0d47a1; color: white; font-weight: bold;")
+        self.start_button.clicked.connect(self.start_prefetch)
+        buttons.addWidget(self.start_button)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_prefetch)
+        self.cancel_button.setEnabled(False)
+        buttons.addWidget(self.cancel_button)
+        layout.addLayout(buttons)
+
+        self.progress_bar = QProgressBar()
+        layout.addWidget(self.progress_bar)
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        # Status per ticker, filled in as the tickers finish
+        self.status_table = QTableWidget(0, len(PREFETCH_COLUMNS))
+        self.status_table.setHorizontalHeaderLabels(["Ticker", "Status", "Bars", "Attempts", "Error"])
+        self.status_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.status_table.horizontalHeader().setStretchLastSection(True)
+        self.status_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.status_table)
+
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+        layout.addWidget(close_button)
+
+        self.setLayout(layout)
+
+    def start_prefetch(self):
+        stock_symbols = list(dict.fromkeys(t.upper() for t in self.tickers_input.toPlainText().replace(",", " ").split()))
+        if not stock_symbols or not all(symbol.replace(".", "").replace("-", "").isalnum() for symbol in stock_symbols):
+            QMessageBox.warning(self, "Invalid Ticker", "Please enter one or more valid ticker symbols.")
+            return
+        try:
+            batch_size, max_workers, retries = (int(line_edit.text()) for line_edit in (self.batch_size_input, self.workers_input, self.retries_input))
+            if batch_size < 1 or max_workers < 1 or retries < 0:
+                raise ValueError
+        except ValueError:
+            QMessageBox.warning(self, "Invalid Settings", "Tickers per request and requests at once must be positive whole numbers, retries zero or more.")
+            return
+
+        self.status_table.setSortingEnabled(False)
+        self.status_table.setRowCount(0)
+        self.progress_bar.setRange(0, len(stock_symbols))
+        self.progress_bar.setValue(0)
+        self.status_label.setText(f"Prefetching {len(stock_symbols)} tickers...")
+        self.start_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+
+        prefetcher = Prefetcher(
+            make_source(self.source_input.text().strip()), self.interval, batch_size=batch_size, max_workers=max_workers, retries=retries
+        )
+        self.prefetch_thread = PrefetchThread(prefetcher, stock_symbols, self.start_date, self.end_date)
+        self.prefetch_thread.row_signal.connect(self.add_row)
+        self.prefetch_thread.result_signal.connect(self.prefetch_finished)
+        self.prefetch_thread.start()
+
+    def cancel_prefetch(self):
+        if self.prefetch_thread is not None:
+            self.prefetch_thread.cancelled = True
+            self.cancel_button.setEnabled(False)
+            self.status_label.setText("Cancelling after the requests in flight...")
+
+    def add_row(self, status):
+        row = self.status_table.rowCount()
+        self.status_table.insertRow(row)
+        for column, key in enumerate(PREFETCH_COLUMNS):
+            item = QTableWidgetItem()
+            item.setData(Qt.DisplayRole, status[key])
+            self.status_table.setItem(row, column, item)
+        self.progress_bar.setValue(row + 1)
+
+    def prefetch_finished(self, status, error):
+        self.start_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        self.status_table.setSortingEnabled(True)
+        self.status_table.sortByColumn(0, Qt.AscendingOrder)
+        if status is None:
+            self.status_label.setText(f"Error: Prefetch failed: {error}")
+            return
+        self.status_label.setText(f"Done: {describe_prefetch(status)}")
+
+    def done(self, result):
+        # Closing the dialog stops the prefetch once the requests in flight return
+        if self.prefetch_thread is not None:
+            self.prefetch_thread.cancelled = True
+            self.prefetch_thread.wait()
+        super().done(result)
+
+
+class PrefetchThread(QThread):
+    row_signal = pyqtSignal(object)
+    result_signal = pyqtSignal(object, str)
+
+    def __init__(self, prefetcher, stock_symbols, start_date, end_date):
+        super().__init__()
+        self.prefetcher = prefetcher
+        self.stock_symbols = stock_symbols
+        self.start_date = start_date
+        self.end_date = end_date
+        self.cancelled = False
+
+    def run(self):
+        try:
+            status = self.prefetcher.prefetch(
+                self.stock_symbols, self.start_date, self.end_date, progress=self.row_signal.emit, cancelled=lambda: self.cancelled
+            )
+            self.result_signal.emit(status, "")
+        except Exception as e:
+            self.result_signal.emit(None, str(e))
+
+
+# Table cell that sorts last in either direction when it has no value (shown as N/A),
+# so tickers without a signal stay at the bottom of a ranking
+class RankItem(QTableWidgetItem):
+    def __init__(self, value=None):
+        super().__init__()
+        self.setData(Qt.DisplayRole, "N/A" if value is None else value)
+        self.setData(Qt.UserRole, value is None)
+
+    def __lt__(self, other):
+        missing, other_missing = self.data(Qt.UserRole), other.data(Qt.UserRole)
+        if not missing and not other_missing:
+            return super().__lt__(other)
+        descending = self.tableWidget().horizontalHeader().sortIndicatorOrder() == Qt.DescendingOrder
+        return (missing and not other_missing) if descending else (other_missing and not missing)
+
+
+# SMA crossover state of a whole universe in one pass, as a sortable table; double-click a
+# row to pick the ticker for a backtest
+class ScreenerDialog(QDialog):
+    COLUMNS = [
+        ("symbol", "Ticker"), ("state", "State"), ("bars_since_cross", "Bars Since Cross"), ("last_cross", "Last Cross"),
+        ("close", "Close"), ("sma_spread", "SMA Spread (%)"), ("signal_return", "Signal Return, No Costs (%)"),
+        ("buy_hold_return", "Buy & Hold (%)"), ("sharpe_ratio", "Sharpe"), ("max_drawdown", "Max Drawdown (%)"),
+        ("trades", "Trades"), ("exposure", "Exposure (%)"), ("bars", "Bars"), ("status", "Status"),
+    ]
+    PERCENT_COLUMNS = ("sma_spread", "signal_return", "buy_hold_return", "max_drawdown", "exposure")
+
+    def __init__(self, parent, stock_symbols, start_date, end_date, short_sma_period, long_sma_period, interval="1d",
+                 base_interval=None, offline=False):
+        super().__init__(parent)
+        self.start_date = start_date
+        self.end_date = end_date
+        self.interval = interval
+        self.base_interval = base_interval
+        self.offline = offline
+        self.screener_thread = None
+        self.result = None
+
+        self.setWindowTitle("Screen Universe")
+        self.setMinimumSize(1000, 700)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(
+            f"SMA crossover state of every ticker on {INTERVAL_NAMES[interval]} bars from {start_date} to {end_date}"
+            + (" (cached data only)" if offline else "")
+        ))
+
+        tickers_row = QHBoxLayout()
+        tickers_row.addWidget(QLabel("Tickers (comma or space separated):"))
+        load_button = QPushButton("Load Universe...")
+        load_button.clicked.connect(self.load_universe)
+        tickers_row.addWidget(load_button)
+        layout.addLayout(tickers_row)
+        self.tickers_input = QTextEdit(stock_symbols)
+        self.tickers_input.setMaximumHeight(80)
+        layout.addWidget(self.tickers_input)
+
+        form = QFormLayout()
+        self.short_sma_input = QLineEdit(short_sma_period)
+        form.addRow("Short SMA Period:", self.short_sma_input)
+        self.long_sma_input = QLineEdit(long_sma_period)
+        form.addRow("Long SMA Period:", self.long_sma_input)
+        self.lookback_input = QLineEdit("252")
+        form.addRow("Trailing Backtest (bars):", self.lookback_input)
+        self.source_input = QLineEdit("")
+        self.source_input.setPlaceholderText("Yahoo Finance")
+        self.source_input.setEnabled(not offline)
+        form.addRow("Source (CSV folder or URL with {symbol}, optional):", self.source_input)
+        layout.addLayout(form)
+
+        buttons = QHBoxLayout()
+        self.start_button = QPushButton("Screen")
+        self.start_button.setStyleSheet("background-color: #0d47a1; color: white; font-weight: bold;")
+        self.start_button.clicked.connect(self.start_screen)
+        buttons.addWidget(self.start_button)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_screen)
+        self.cancel_button.setEnabled(False)
+        buttons.addWidget(self.cancel_button)
+        self.export_button = QPushButton("Export CSV")
+        self.export_button.clicked.connect(self.export)
+        self.export_button.setEnabled(False)
+        buttons.addWidget(self.export_button)
+        layout.addLayout(buttons)
+
+        self.progress_bar = QProgressBar()
+        layout.addWidget(self.progress_bar)
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        self.results_table = QTableWidget(0, len(self.COLUMNS))
+        self.results_table.setHorizontalHeaderLabels([title for _, title in self.COLUMNS])
+        self.results_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.results_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.results_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.results_table.cellDoubleClicked.connect(self.pick_ticker)
+        layout.addWidget(self.results_table)
+
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+        layout.addWidget(close_button)
+
+        self.setLayout(layout)
+
+    def load_universe(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Load Universe", "", "Ticker Lists (*.txt *.csv);;All Files (*)")
+        if not file_path:
+            return
+        try:
+            stock_symbols = read_universe(file_path)
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Error", f"Failed to load the universe: {e}")
+            return
+        self.tickers_input.setPlainText(", ".join(stock_symbols))
+        self.status_label.setText(f"Loaded {len(stock_symbols)} tickers from {os.path.basename(file_path)}")
+
+    def start_screen(self):
+        stock_symbols = list(dict.fromkeys(t.upper() for t in self.tickers_input.toPlainText().replace(",", " ").split()))
+        if not stock_symbols or not all(symbol.replace(".", "").replace("-", "").isalnum() for symbol in stock_symbols):
+            QMessageBox.warning(self, "Invalid Ticker", "Please enter one or more valid ticker symbols.")
+            return
+        try:
+            short_sma_period, long_sma_period, lookback = (
+                int(line_edit.text()) for line_edit in (self.short_sma_input, self.long_sma_input, self.lookback_input)
+            )
+            if min(short_sma_period, long_sma_period, lookback) < 1:
+                raise ValueError
+        except ValueError:
+            QMessageBox.warning(self, "Invalid Settings", "The SMA periods and the trailing backtest must be positive whole numbers.")
+            return
+
+        self.results_table.setSortingEnabled(False)
+        self.results_table.setRowCount(0)
+        self.progress_bar.setRange(0, 0 if self.offline else len(stock_symbols))
+        self.progress_bar.setValue(0)
+        self.status_label.setText(f"Screening {len(stock_symbols)} tickers...")
+        self.start_button.setEnabled(False)
+        self.cancel_button.setEnabled(not self.offline)
+        self.export_button.setEnabled(False)
+
+        prefetcher = None if self.offline else Prefetcher(make_source(self.source_input.text().strip()), self.base_interval or self.interval)
+        self.screener_thread = ScreenerThread(
+            stock_symbols, self.start_date, self.end_date, short_sma_period, long_sma_period, lookback, self.interval,
+            self.base_interval, self.offline, prefetcher
+        )
+        self.screener_thread.progress_signal.connect(self.update_progress)
+        self.screener_thread.result_signal.connect(self.screen_finished)
+        self.screener_thread.start()
+
+    def cancel_screen(self):
+        if self.screener_thread is not None:
+            self.screener_thread.cancelled = True
+            self.cancel_button.setEnabled(False)
+            self.status_label.setText("Cancelling the download; cached tickers are still screened...")
+
+    def update_progress(self, downloaded):
+        self.progress_bar.setValue(downloaded)
+        if downloaded == self.progress_bar.maximum():
+            self.progress_bar.setRange(0, 0)
+            self.status_label.setText("Screening...")
+
+    def screen_finished(self, result, seconds, error):
+        self.screener_thread.wait()
+        self.screener_thread = None
+        self.start_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        self.progress_bar.setRange(0, 1)
+        self.progress_bar.setValue(1)
+        if result is None:
+            self.status_label.setText(f"Error: Screen failed: {error}")
+            return
+        self.result = result
+        self.export_button.setEnabled(True)
+        self.show_result(result)
+        counts = result["state"][result["status"] == "ok"].value_counts()
+        self.status_label.setText(
+            f"Screened {len(result)} tickers in {seconds:.2f}s: {counts.get('long', 0)} long, {counts.get('flat', 0)} flat, "
+            f"{int((result['status'] != 'ok').sum())} without a signal. Double-click a ticker to backtest it."
+        )
+
+    def show_result(self, result):
+        self.results_table.setRowCount(len(result))
+        for row, values in enumerate(result[[name for name, _ in self.COLUMNS]].itertuples(index=False)):
+            for column, (key, value) in enumerate(zip([name for name, _ in self.COLUMNS], values)):
+                if isinstance(value, pd.Timestamp):
+                    value = str(value.date()) if value == value.normalize() else str(value)
+                elif isinstance(value, str):
+                    value = value or None  # No state
+                elif pd.isna(value):
+                    value = None
+                elif key in self.PERCENT_COLUMNS:
+                    value = round(float(value) * 100, 2)
+                elif key in ("bars_since_cross", "trades", "bars"):
+                    value = int(value)
+                else:
+                    value = round(float(value), 2)
+                self.results_table.setItem(row, column, RankItem(value))
+        # Fresh crossovers first
+        self.results_table.setSortingEnabled(True)
+        self.results_table.sortByColumn(2, Qt.AscendingOrder)
+
+    def pick_ticker(self, row, column):
+        stock_symbol = self.results_table.item(row, 0).text()
+        self.parent().manual_ticker_input.setText(stock_symbol)
+        self.status_label.setText(f"{stock_symbol} is set as the ticker of the main window.")
+
+    def export(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Screen", "screen.csv", "CSV Files (*.csv)")
+        if not file_path:
+            return
+        try:
+            self.result.to_csv(file_path, index=False)
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Failed to export the screen: {e}")
+
+    def done(self, result):
+        # Closing the dialog stops the download once the requests in flight return
+        if self.screener_thread is not None:
+            self.screener_thread.cancelled = True
+            self.screener_thread.wait()
+        super().done(result)
+
+
+class ScreenerThread(QThread):
+    progress_signal = pyqtSignal(int)
+    result_signal = pyqtSignal(object, float, str)
+
+    def __init__(self, stock_symbols, start_date, end_date, short_sma_period, long_sma_period, lookback, interval, base_interval,
+                 offline, prefetcher):
+        super().__init__()
+        self.stock_symbols = stock_symbols
+        self.start_date = start_date
+        self.end_date = end_date
+        self.short_sma_period = short_sma_period
+        self.long_sma_period = long_sma_period
+        self.lookback = lookback
+        self.interval = interval
+        self.base_interval = base_interval
+        self.offline = offline
+        self.prefetcher = prefetcher
+        self.downloaded = 0
+        self.cancelled = False
+
+    def progress(self, status):
+        self.downloaded += 1
+        self.progress_signal.emit(self.downloaded)
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            result = screen_universe(
+                self.stock_symbols, self.start_date, self.end_date, self.short_sma_period, self.long_sma_period, self.lookback,
+                self.interval, self.base_interval, self.offline, self.prefetcher, progress=self.progress,
+                cancelled=lambda: self.cancelled
+            )
+            self.result_signal.emit(result, time.perf_counter() - start, "")
+        except Exception as e:
+            self.result_signal.emit(None, 0.0, str(e))
+
+
+class StreamDialog(QDialog):
+    def __init__(self, parent, stock_symbol, start_date, end_date, short_sma_period, long_sma_period, starting_cash, offline=False):
+        super().__init__(parent)
+        self.stock_symbol = stock_symbol
+        self.start_date = start_date
+        self.end_date = end_date
+        self.short_sma_period = short_sma_period
+        self.long_sma_period = long_sma_period
+        self.starting_cash = starting_cash
+        self.offline = offline
+        self.stream_thread = None
+
+        self.setWindowTitle("Live / Replay Stream")
+        self.setMinimumSize(800, 600)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(f"SMA {short_sma_period}/{long_sma_period}, starting cash ${starting_cash:,.2f} (paper trading)"))
+
+        layout.addWidget(QLabel("Bar Source:"))
+        self.source_combobox = QComboBox()
+        self.source_combobox.addItem(f"Replay {stock_symbol} {start_date} to {end_date}", "replay")
+        self.source_combobox.addItem("Replay CSV file", "csv")
+        self.source_combobox.addItem("Socket (host:port, JSON lines)", "socket")
+        layout.addWidget(self.source_combobox)
+
+        layout.addWidget(QLabel("CSV File or host:port:"))
+        self.location_input = QLineEdit("127.0.0.1:9999")
+        layout.addWidget(self.location_input)
+
+        layout.addWidget(QLabel("Replay Delay per Bar (seconds):"))
+        self.delay_input = QLineEdit("0.01")
+        layout.addWidget(self.delay_input)
+
+        self.start_button = QPushButton("Start")
+        self.start_button.setStyleSheet("background-color: #0d47a1; color: white; font-weight: bold;")
+        self.start_button.clicked.connect(self.start_stream)
+        layout.addWidget(self.start_button)
+
+        self.stop_button = QPushButton("Stop")
+        self.stop_button.clicked.connect(self.stop_stream)
+        self.stop_button.setEnabled(False)
+        layout.addWidget(self.stop_button)
+
+        self.status_label = QLabel("Idle")
+        layout.addWidget(self.status_label)
+
+        self.signal_log = QTextEdit()
+        self.signal_log.setReadOnly(True)
+        self.signal_log.setMaximumHeight(80)
+        layout.addWidget(self.signal_log)
+
+        # Charts are extended in place as bars arrive
+        self.figure_stream = Figure()
+        self.stream_canvas = FigureCanvas(self.figure_stream)
+        layout.addWidget(self.stream_canvas)
+
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+        layout.addWidget(close_button)
+
+        self.setLayout(layout)
+
+        # Redraw at most ten times per second, however fast the bars come in
+        self.redraw_timer = QTimer(self)
+        self.redraw_timer.setInterval(100)
+        self.redraw_timer.timeout.connect(self.redraw)
+        self.dirty = False
+
+    def make_source(self):
+        source = self.source_combobox.currentData()
+        delay = float(self.delay_input.text() or 0)
+        if source == "replay":
+            data = download_data(self.stock_symbol, self.start_date, self.end_date, self.offline)
+            return dataframe_bar_source(data, delay)
+        if source == "csv":
+            return csv_bar_source(self.location_input.text().strip(), delay)
+        host, port = self.location_input.text().strip().rsplit(":", 1)
+        return socket_bar_source(host, int(port))
+
+    def start_stream(self):
+        try:
+            source = self.make_source()
+        except Exception as e:
+            QMessageBox.warning(self, "Invalid Source", f"Could not open the bar source: {e}")
+            return
+
+        # Reset the charts
+        self.bars = 0
+        self.closes, self.short_smas, self.long_smas = [], [], []
+        self.equity_x, self.equity = [], []
+        self.figure_stream.clear()
+        self.ax_price = self.figure_stream.add_subplot(211)
+        self.ax_equity = self.figure_stream.add_subplot(212, sharex=self.ax_price)
+        self.close_line, = self.ax_price.plot([], [], label="Close Price", alpha=0.8)
+        self.short_line, = self.ax_price.plot([], [], label="Short SMA", linestyle="--")
+        self.long_line, = self.ax_price.plot([], [], label="Long SMA", linestyle="--")
+        self.equity_line, = self.ax_equity.plot([], [], label="Equity Curve")
+        self.ax_price.legend(loc="upper left")
+        self.ax_equity.legend(loc="upper left")
+        self.signal_log.clear()
+
+        trader = StreamingSMATrader(self.short_sma_period, self.long_sma_period, self.starting_cash)
+        self.stream_thread = StreamThread(trader, source)
+        self.stream_thread.bars_signal.connect(self.add_bars)
+        self.stream_thread.finished.connect(self.stream_finished)
+        self.start_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+        self.status_label.setText("Streaming...")
+        self.stream_thread.start()
+        self.redraw_timer.start()
+
+    def stop_stream(self):
+        if self.stream_thread is not None:
+            self.stream_thread.stop()
+
+
+    def add_bars(self, events):
+        for event in events:
+            self.closes.append(event["close"])
+            self.short_smas.append(event["short_sma"] if event["short_sma"] is not None else np.nan)
+            self.long_smas.append(event["long_sma"] if event["long_sma"] is not None else np.nan)
+            if event["equity"] is not None:
+                self.equity_x.append(self.bars)
+                self.equity.append(event["equity"])
+            if event["signal"]:
+                self.signal_log.append(f"{event['time']}: {event['signal'].upper()} signal at close {event['close']:.2f}")
+            self.bars += 1
+
+        last = events[-1]
+        equity = f"{last['equity']:.2f}" if last["equity"] is not None else "N/A (waiting for SMAs)"
+        self.status_label.setText(f"Bar {self.bars} ({last['time']}): close {last['close']:.2f}, position {last['position']}, equity {equity}")
+        self.dirty = True
+
+    def redraw(self):
+        if not self.dirty:
+            return
+        x = np.arange(len(self.closes))
+        self.close_line.set_data(x, self.closes)
+        self.short_line.set_data(x, self.short_smas)
+        self.long_line.set_data(x, self.long_smas)
+        self.equity_line.set_data(self.equity_x, self.equity)
+        for ax in (self.ax_price, self.ax_equity):
+            ax.relim()
+            ax.autoscale_view()
+        self.stream_canvas.draw_idle()
+        self.dirty = False
+
+    def stream_finished(self):
+        self.redraw_timer.stop()
+        self.redraw()
+        self.start_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        if self.stream_thread.error:
+            self.status_label.setText(f"Stream stopped: {self.stream_thread.error}")
+
+    def done(self, result):
+        # Let a running replay wind down before the dialog goes away
+        if self.stream_thread is not None:
+            self.stream_thread.stop()
+            self.stream_thread.wait(2000)
+        super().done(result)
+
+
+class StreamThread(QThread):
+    bars_signal = pyqtSignal(object)
+
+    def __init__(self, trader, source, batch_interval=0.05):
+        super().__init__()
+        self.trader = trader
+        self.source = source
+        self.batch_interval = batch_interval
+        self.stopped = False
+        self.error = None
+
+    def stop(self):
+        self.stopped = True
+
+    def run(self):
+        # Bars are handed to the GUI in batches so fast replays do not flood the event loop
+        events = []
+        last_emit = time.perf_counter()
+        try:
+            for bar in self.source:
+                if self.stopped:
+                    break
+                events.append(self.trader.on_bar(bar))
+                if time.perf_counter() - last_emit >= self.batch_interval:
+                    self.bars_signal.emit(events)
+                    events = []
+                    last_emit = time.perf_counter()
+        except Exception as e:
+            self.error = str(e)
+        if events:
+            self.bars_signal.emit(events)
+
+
+class ReportThread(QThread):
+    progress_signal = pyqtSignal(int, str)
+    result_signal = pyqtSignal(str, str)
+
+    # Either one report to file_path, or a batch of reports into directory
+    def __init__(self, reports, file_path=None, directory=None):
+        super().__init__()
+        self.reports = reports
+        self.file_path = file_path
+        self.directory = directory
+
+    def run(self):
+        try:
+            # reportlab is only loaded once a report is actually saved
+            from tradewhiz_report import build_report, build_reports
+
+            if self.file_path:
+                build_report(self.file_path, self.reports, self.progress_signal.emit)
+                self.result_signal.emit(f"Report saved to {self.file_path}", "")
+            else:
+                results = build_reports(self.directory, self.reports, self.progress_signal.emit)
+                errors = [f"{path}: {error}" for path, error in results if error]
+                saved = len(results) - len(errors)
+                self.result_signal.emit(f"{saved} reports saved to {self.directory}", "\n".join(errors))
+        except Exception as e:
+            self.result_signal.emit("", str(e))
+
+
+class MonteCarloThread(QThread):
+    result_signal = pyqtSignal(object, object, str, float)
+
+    def __init__(self, report, paths, method, block_size):
+        super().__init__()
+        self.report = report
+        self.paths = paths
+        self.method = method
+        self.block_size = block_size
+
+    def run(self):
+        started = time.perf_counter()
+        try:
+            result = monte_carlo(
+                self.report["equity_curve"], self.paths, self.method, self.block_size,
+                periods_per_year=self.report["periods_per_year"]
+            )
+            self.result_signal.emit(self.report, result, "", time.perf_counter() - started)
+        except Exception as e:
+            self.result_signal.emit(self.report, None, str(e), time.perf_counter() - started)
+
+
+# One what-if run on a WhatIfSession; cancelled by setting cancelled, which stops a Cerebro run at its next progress report
+class WhatIfThread(QThread):
+    result_signal = pyqtSignal(object, object, object, str)
+
+    def __init__(self, session, job):
+        super().__init__()
+        self.session = session
+        self.job = job
+        self.cancelled = False
+
+    def progress(self, fraction):
+        if self.cancelled:
+            raise JobCancelled()
+
+    def run(self):
+        self.job.profile.start_cprofile()
+        try:
+            result, reused = self.session.run(self.job, self.progress)
+            self.result_signal.emit(self.job, result, reused, "")
+        except JobCancelled:
+            self.result_signal.emit(self.job, None, None, "cancelled")
+        except Exception as e:
+            self.result_signal.emit(self.job, None, None, str(e))
+        finally:
+            self.job.profile.stop_cprofile()
+
+
+# Imports yfinance and Backtrader after the window is shown, so the first run does not wait for them
+class WarmupThread(QThread):
+    def run(self):
+        try:
+            warm_imports()
+        except Exception as e:
+            print(f"Background import failed: {e}")
+
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = BacktestWindow()
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The tradewhiz modules live at the top of the repository, next to the GUI script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Synthetic daily OHLCV bars (a geometric random walk) with lowercase columns, as
+# returned by PriceCache.get()
+def make_bars(n_bars=1500, seed=0, start="2000-01-03", volatility=0.015):
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0003, volatility, n_bars)))
+    open_ = close * np.exp(rng.normal(0.0, 0.01, n_bars))
+    spread = np.abs(rng.normal(0.0, 0.005, n_bars))
+    return pd.DataFrame({
+        "open": open_, "high": np.maximum(open_, close) * (1 + spread), "low": np.minimum(open_, close) * (1 - spread),
+        "close": close, "volume": rng.integers(100000, 10000000, n_bars).astype(float),
+    }, index=pd.bdate_range(start, periods=n_bars, name="Date"))
+
+@pytest.fixture
+def bars():
+    return make_bars()
@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from conftest import make_bars
+from tradewhiz_cli import main
+from tradewhiz_core import PriceCache
+from tradewhiz_sources import CSVSource
+
+@pytest.fixture
+def cached(tmp_path, monkeypatch):
+    # The CLI reads the price cache of the working directory
+    monkeypatch.chdir(tmp_path)
+    for seed, symbol in enumerate(["AAA", "BBB"]):
+        make_bars(800, seed=seed, start="2010-01-01").to_csv(tmp_path / f"{symbol}.csv")
+        PriceCache(source=CSVSource(str(tmp_path))).get(symbol, "2010-01-01", "2013-01-01")
+    return tmp_path
+
+PORTFOLIO = ["AAA", "BBB", "--portfolio", "--offline", "--start", "2010-01-01", "--end", "2013-01-01", "--engine", "fast"]
+
+@pytest.mark.parametrize("options, message", [
+    (["--commission", "abc"], "Invalid execution settings"),
+    (["--sizing", "percent", "--slippage", "fixed", "--fill", "close", "--commission", "0:x"], "Invalid execution settings"),
+    (["--strategy", "no_such_strategy"], "Invalid portfolio"),
+    (["--weights", "AAA:heavy"], "Invalid portfolio"),
+])
+def test_invalid_portfolio_settings_exit_with_a_message(cached, capsys, options, message):
+    assert main(PORTFOLIO + options) == 2
+    captured = capsys.readouterr()
+    assert message in captured.err
+    assert "Traceback" not in captured.err
+
+def test_portfolio_runs_offline(cached, capsys):
+    output = cached / "portfolio.json"
+    assert main(PORTFOLIO + ["--short-sma", "20", "--long-sma", "50", "--output", str(output)]) == 0
+    with open(output) as f:
+        rows = json.load(f)
+    assert [row["ticker"] for row in rows] == ["AAA", "BBB", "PORTFOLIO"]
+    assert all(row["status"] == "ok" for row in rows)
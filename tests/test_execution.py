@@ -0,0 +1,52 @@
+import pytest
+
+from tradewhiz_core import backtest_data, bar_arrays, rolling_sma, sma_orders
+from tradewhiz_execution import ExecutionModel
+
+# Every sizing mode, including orders worth all of the cash (percent 100, leverage
+# above 1), which only fill if the shares are capped at what the cash pays for
+PARITY_MODELS = [
+    dict(sizing="fixed", stake=10),
+    dict(sizing="fixed", stake=25, slippage="fixed", slippage_value=0.002),
+    dict(sizing="percent", percent=95),
+    dict(sizing="percent", percent=100),
+    dict(sizing="percent", percent=100, slippage="fixed", slippage_value=0.002),
+    dict(sizing="percent", percent=100, slippage="fixed", slippage_value=0.002, fill="close"),
+    dict(sizing="percent", percent=100, commission="0:0.003,50000:0.001"),
+    dict(sizing="volatility"),
+    dict(sizing="volatility", target_volatility=0.5, max_leverage=2.0),
+    dict(sizing="volatility", target_volatility=0.5, max_leverage=2.0, slippage="fixed", slippage_value=0.002),
+]
+
+def crossover_orders(bars, short_sma_period=20, long_sma_period=50):
+    close = bars["close"].to_numpy(dtype=float)
+    return sma_orders(rolling_sma(close, short_sma_period), rolling_sma(close, long_sma_period), long_sma_period - 1)
+
+# With 1000 or 2500 of cash some buys cost more than the cash: the broker rejects them
+# (a fixed stake) or they get no shares, and the strategy buys again on the next bar
+@pytest.mark.parametrize("starting_cash", [100000, 2500, 1000])
+@pytest.mark.parametrize("settings", PARITY_MODELS, ids=lambda settings: ExecutionModel(**settings).key())
+def test_fast_engine_matches_cerebro(bars, settings, starting_cash):
+    pytest.importorskip("backtrader")
+    execution = ExecutionModel(**settings)
+    fast_value, _, _, fast_equity, _ = backtest_data(bars, 20, 50, starting_cash, "fast", execution=execution)
+    cerebro_value, _, _, cerebro_equity, _ = backtest_data(bars, 20, 50, starting_cash, "cerebro", execution=execution)
+    assert fast_value == pytest.approx(cerebro_value, rel=1e-9)
+    assert fast_equity == pytest.approx(cerebro_equity, rel=1e-9)
+
+@pytest.mark.parametrize("settings", [settings for settings in PARITY_MODELS if settings["sizing"] != "fixed"])
+def test_buys_never_cost_more_than_the_cash(bars, settings):
+    execution = ExecutionModel(**settings)
+    _, sides, shares, prices, commissions = execution.fills(crossover_orders(bars), 100000.0, *bar_arrays(bars))
+    assert shares.min() > 0
+    cash = 100000.0
+    for side, count, price, commission in zip(sides, shares, prices, commissions):
+        cash -= side * count * price + commission
+        assert cash >= 0.0
+
+def test_affordable_shares_with_a_commission_schedule():
+    execution = ExecutionModel(commission="0:0.01,1000:0.001")
+    # 10 shares at 99 cost 990 plus 9.90 commission; 11 shares reach the cheaper tier
+    assert execution.affordable_shares(1000.0, [99.0])[0] == 10
+    assert execution.affordable_shares(1100.0, [99.0])[0] == 11
+    assert execution.affordable_shares(50.0, [99.0])[0] == 0
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from tradewhiz_core import backtest_data
+from tradewhiz_execution import ExecutionModel
+from tradewhiz_ledger import TradeLedger, trade_summary
+
+MODELS = [
+    dict(),
+    dict(sizing="percent", percent=100, slippage="fixed", slippage_value=0.002),
+    dict(sizing="volatility", commission="0:0.003,50000:0.001"),
+]
+
+def run(bars, engine, settings, starting_cash):
+    if engine == "cerebro":
+        pytest.importorskip("backtrader")
+    ledger = TradeLedger()
+    execution = ExecutionModel(**settings)
+    _, _, _, equity_curve, _ = backtest_data(bars, 20, 50, starting_cash, engine, execution=execution, ledger=ledger)
+    return ledger, execution, equity_curve
+
+# The fills account for the whole run: the cash they leave plus the shares they hold at
+# the last close is the last equity, and each commission is the model's for its fill
+@pytest.mark.parametrize("starting_cash", [100000, 1000])
+@pytest.mark.parametrize("settings", MODELS, ids=lambda settings: ExecutionModel(**settings).key())
+@pytest.mark.parametrize("engine", ["fast", "cerebro"])
+def test_ledger_reconciles_with_the_equity(bars, engine, settings, starting_cash):
+    ledger, execution, equity_curve = run(bars, engine, settings, starting_cash)
+    fills = ledger.to_array()
+    assert len(fills) > 0
+    cash = starting_cash - np.sum(fills["side"] * fills["shares"] * fills["price"] + fills["commission"])
+    position = np.sum(fills["side"] * fills["shares"])
+    assert position >= 0
+    assert cash + position * bars["close"].iloc[-1] == pytest.approx(equity_curve[-1], rel=1e-9)
+
+    np.testing.assert_allclose(fills["commission"], execution.commissions(fills["price"], fills["shares"]), rtol=1e-9)
+    trades = ledger.trades(bars["close"])
+    assert trade_summary(trades)["total_commission"] == pytest.approx(fills["commission"].sum(), rel=1e-12)
+    # Net PnL of the trades is the change in equity
+    assert trades["pnl"].sum() == pytest.approx(equity_curve[-1] - starting_cash, rel=1e-9, abs=1e-6)
+
+@pytest.mark.parametrize("settings", MODELS[:2], ids=lambda settings: ExecutionModel(**settings).key())
+def test_engines_record_the_same_fills(bars, settings):
+    fast, _, _ = run(bars, "fast", settings, 100000)
+    cerebro, _, _ = run(bars, "cerebro", settings, 100000)
+    fast, cerebro = fast.to_array(), cerebro.to_array()
+    np.testing.assert_array_equal(fast["bar"], cerebro["bar"])
+    np.testing.assert_array_equal(fast["shares"], cerebro["shares"])
+    for name in ("price", "commission"):
+        np.testing.assert_allclose(fast[name], cerebro[name], rtol=1e-9)
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+import tradewhiz_metrics as metrics
+
+# Returns +20%, -25%, +20%, +25%: mean 0.1, population variance 0.04125, downside
+# deviation sqrt(0.25^2 / 4) = 0.125; one year at 4 bars a year
+CURVE = [100.0, 120.0, 90.0, 108.0, 135.0]
+PERIODS = 4
+
+def test_ratios_of_a_hand_computed_curve():
+    assert metrics.sharpe_ratio(CURVE, PERIODS) == pytest.approx(0.1 / np.sqrt(0.04125) * 2.0)
+    assert metrics.sortino_ratio(CURVE, PERIODS) == pytest.approx(0.1 / 0.125 * 2.0)
+    assert metrics.cagr(CURVE, PERIODS) == pytest.approx(0.35)
+    assert metrics.max_drawdown(CURVE) == pytest.approx(0.25)
+    assert metrics.calmar_ratio(CURVE, PERIODS) == pytest.approx(0.35 / 0.25)
+    # A 40% risk-free rate is 10% a bar, the mean return
+    assert metrics.sharpe_ratio(CURVE, PERIODS, risk_free_rate=0.4) == pytest.approx(0.0)
+    assert metrics.cagr(CURVE[:3], PERIODS) == pytest.approx(0.9 ** 2 - 1.0)
+
+def test_drawdown_details_of_a_hand_computed_curve():
+    details = metrics.drawdown_details(CURVE, index=list("abcde"))
+    assert details == {"max_drawdown": pytest.approx(0.25), "peak": "b", "trough": "c", "recovery": "e",
+                       "duration_bars": 3, "longest_drawdown_bars": 3}
+    # Not recovered: the drawdown runs to the last bar
+    details = metrics.drawdown_details(CURVE[:4])
+    assert (details["peak"], details["trough"], details["recovery"]) == (1, 2, None)
+    assert details["duration_bars"] == details["longest_drawdown_bars"] == 2
+    # The longest drawdown need not be the deepest one
+    details = metrics.drawdown_details([100.0, 99.0, 99.0, 99.0, 101.0, 80.0, 102.0])
+    assert (details["peak"], details["trough"], details["recovery"]) == (4, 5, 6)
+    assert details["duration_bars"] == 2
+    assert details["longest_drawdown_bars"] == 4
+
+def test_rolling_metrics_of_a_hand_computed_curve():
+    # Windows of two returns: (+20%, -25%), (-25%, +20%), (+20%, +25%)
+    expected = [np.nan, np.nan, -0.025 / 0.225 * 2.0, -0.025 / 0.225 * 2.0, 0.225 / 0.025 * 2.0]
+    np.testing.assert_allclose(metrics.rolling_sharpe(CURVE, 2, PERIODS), expected)
+    np.testing.assert_allclose(metrics.rolling_drawdown(CURVE, 2), [0.0, 0.0, 0.25, 0.0, 0.0], atol=1e-15)
+
+def test_flat_curve():
+    flat = [100.0] * 5
+    assert np.isnan(metrics.sharpe_ratio(flat))
+    assert np.isnan(metrics.sortino_ratio(flat))
+    assert metrics.cagr(flat) == 0.0
+    assert metrics.max_drawdown(flat) == 0.0
+    assert np.isnan(metrics.calmar_ratio(flat))
+    assert np.isnan(metrics.rolling_sharpe(flat, 2)).all()
+    details = metrics.drawdown_details(flat)
+    assert (details["max_drawdown"], details["recovery"], details["duration_bars"], details["longest_drawdown_bars"]) == (0.0, None, 0, 0)
+
+def test_curve_that_never_draws_down():
+    rising = [100.0, 110.0, 121.0, 133.1]
+    assert metrics.cagr(rising, 3) == pytest.approx(0.331)
+    assert metrics.max_drawdown(rising) == 0.0
+    assert np.isnan(metrics.sortino_ratio(rising))
+    assert np.isnan(metrics.calmar_ratio(rising))
+    np.testing.assert_array_equal(metrics.rolling_drawdown(rising, 2), np.zeros(4))
+    details = metrics.drawdown_details(rising)
+    assert (details["duration_bars"], details["longest_drawdown_bars"]) == (0, 0)
+
+def test_performance_summary():
+    summary = metrics.performance_summary(CURVE, PERIODS)
+    assert summary["final_value"] == 135.0
+    assert summary["total_return"] == pytest.approx(0.35)
+    assert summary["calmar_ratio"] == pytest.approx(1.4)
+    assert summary["duration_bars"] == 3
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import tradewhiz_montecarlo
+from tradewhiz_montecarlo import block_indices, monte_carlo, trade_indices, trade_units
+
+# Equity of a strategy that is in the market on some bars only: runs of non-zero
+# returns (trades) separated by flat bars
+def trading_equity(n_bars=500, seed=0):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0005, 0.01, n_bars) * (np.sin(np.arange(n_bars) / 7.0) > 0)
+    return 100000.0 * np.cumprod(np.concatenate(([1.0], 1.0 + returns)))
+
+def assert_same_result(result, other):
+    pd.testing.assert_frame_equal(result["summary"], other["summary"])
+    pd.testing.assert_frame_equal(result["fan"], other["fan"])
+    assert result["loss_probability"] == other["loss_probability"]
+
+@pytest.mark.parametrize("method", ["block", "trades"])
+def test_seed_reproduces_the_paths(method):
+    equity = trading_equity()
+    result = monte_carlo(equity, paths=2500, method=method, seed=7)
+    assert_same_result(result, monte_carlo(equity, paths=2500, method=method, seed=7))
+    other = monte_carlo(equity, paths=2500, method=method, seed=8)
+    assert not result["summary"].equals(other["summary"])
+
+@pytest.mark.parametrize("method", ["block", "trades"])
+def test_worker_processes_match_the_serial_run(method, monkeypatch):
+    equity = trading_equity()
+    serial = monte_carlo(equity, paths=2500, method=method, seed=7, max_workers=1)
+    # The pool is only used from PARALLEL_BARS paths x bars on
+    monkeypatch.setattr(tradewhiz_montecarlo, "PARALLEL_BARS", 0)
+    assert_same_result(serial, monte_carlo(equity, paths=2500, method=method, seed=7, max_workers=3))
+
+def test_block_length_one_draws_single_bars():
+    rng = np.random.default_rng(0)
+    indices = block_indices(rng, 2000, 50, 1)
+    assert indices.shape == (2000, 50)
+    assert indices.min() == 0 and indices.max() == 49
+    # Independent draws: consecutive bars follow each other about 1 time in 50
+    assert np.mean(np.diff(indices, axis=1) % 50 == 1) == pytest.approx(1 / 50, abs=0.005)
+
+def test_blocks_are_consecutive_bars():
+    indices = block_indices(np.random.default_rng(0), 100, 50, 10)
+    blocks = indices.reshape(100, 5, 10)
+    assert (np.diff(blocks, axis=2) % 50 == 1).all()
+
+def test_block_length_of_the_whole_series_rotates_it():
+    equity = trading_equity()
+    bars = len(equity) - 1
+    indices = block_indices(np.random.default_rng(0), 100, bars, bars)
+    assert ((indices - indices[:, :1]) % bars == np.arange(bars)).all()
+    # Every rotation compounds to the same final value; longer blocks are cut to the series
+    for block_size in (bars, 10 * bars):
+        result = monte_carlo(equity, paths=200, method="block", block_size=block_size, seed=0)
+        assert result["block_size"] == bars
+        final = result["summary"].loc["final_value"]
+        assert final[["mean", "lower", "median", "upper"]].to_numpy() == pytest.approx([equity[-1]] * 4, rel=1e-9)
+
+def test_trade_units():
+    returns = np.array([0.0, 0.01, 0.02, 0.0, 0.0, -0.01, 0.0, 0.03])
+    starts, lengths = trade_units(returns)
+    assert list(starts) == [0, 1, 5, 7]
+    assert list(lengths) == [1, 4, 2, 1]
+
+def test_trade_paths_are_made_of_whole_units():
+    returns = np.diff(trading_equity()) / trading_equity()[:-1]
+    starts, lengths = trade_units(returns)
+    indices = trade_indices(np.random.default_rng(0), 300, len(returns), starts, lengths)
+    assert indices.shape == (300, len(returns))
+    unit_of = np.repeat(np.arange(len(starts)), lengths)
+    # Each bar continues the unit of the bar before it or starts a new unit, always at its first bar
+    continues = (indices[:, 1:] == indices[:, :-1] + 1) & (unit_of[np.minimum(indices[:, :-1] + 1, len(returns) - 1)] == unit_of[indices[:, :-1]])
+    assert (continues | np.isin(indices[:, 1:], starts)).all()
+    assert np.isin(indices[:, 0], starts).all()
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        monte_carlo(trading_equity(), method="jackknife")
+    with pytest.raises(ValueError):
+        monte_carlo([100.0, 101.0])
+    with pytest.raises(ValueError):
+        monte_carlo(np.linspace(100.0, 110.0, 50), method="trades")
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from tradewhiz_core import backtest_data, cerebro_sma_grid, optimize_sma_grid
+from tradewhiz_execution import ExecutionModel
+from tradewhiz_metrics import periods_per_year
+from tradewhiz_walkforward import walk_forward
+
+SCALE = np.sqrt(periods_per_year("1h") / periods_per_year("1d"))
+
+def test_grid_sharpe_is_annualized_for_the_interval(bars):
+    daily = optimize_sma_grid(bars, [10, 20], [50, 100], 100000, max_workers=1).set_index(["short_sma", "long_sma"])
+    hourly = optimize_sma_grid(bars, [10, 20], [50, 100], 100000, max_workers=1, interval="1h").set_index(["short_sma", "long_sma"])
+    np.testing.assert_allclose(hourly["sharpe_ratio"], daily["sharpe_ratio"] * SCALE)
+    np.testing.assert_allclose(hourly["portfolio_value"], daily["portfolio_value"])
+
+def test_grid_matches_single_runs_with_volatility_sizing(bars):
+    execution = ExecutionModel("volatility", target_volatility=0.5)
+    grid = optimize_sma_grid(bars, [20], [50], 100000, max_workers=1, execution=execution, interval="1h")
+    value, sharpe_ratio, _, _, _ = backtest_data(bars, 20, 50, 100000, "fast", interval="1h", execution=execution)
+    assert grid.at[0, "portfolio_value"] == pytest.approx(value)
+    assert grid.at[0, "sharpe_ratio"] == pytest.approx(sharpe_ratio)
+
+def test_cerebro_grid_matches_fast_grid(bars):
+    pytest.importorskip("backtrader")
+    fast = optimize_sma_grid(bars, [20], [50], 100000, max_workers=1, interval="1h")
+    cerebro = cerebro_sma_grid(bars, [20], [50], 100000, interval="1h")
+    np.testing.assert_allclose(cerebro[["portfolio_value", "sharpe_ratio"]], fast[["portfolio_value", "sharpe_ratio"]])
+
+def test_walk_forward_sharpe_is_annualized_for_the_interval(bars):
+    options = dict(train_bars=500, test_bars=250, starting_cash=100000, objective="sharpe_ratio", max_workers=1)
+    daily, _ = walk_forward(bars, [10, 20], [50, 100], **options)
+    hourly, _ = walk_forward(bars, [10, 20], [50, 100], interval="1h", **options)
+    np.testing.assert_allclose(hourly["train_score"], daily["train_score"] * SCALE)
+    np.testing.assert_allclose(hourly["test_sharpe"], daily["test_sharpe"] * SCALE)
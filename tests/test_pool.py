@@ -0,0 +1,64 @@
+import time
+
+import pandas as pd
+import pytest
+
+from conftest import make_bars
+from tradewhiz_core import PriceCache, backtest_data, strategy_price_data
+from tradewhiz_pool import BacktestJob, BacktestPool
+from tradewhiz_sources import CSVSource
+from tradewhiz_strategies import SMACrossover
+
+def wait_for(pool, timeout=60):
+    finished = []
+    deadline = time.monotonic() + timeout
+    while pool.pending and time.monotonic() < deadline:
+        finished.extend(pool.poll()[1])
+        time.sleep(0.05)
+    return finished
+
+def test_finished_job_brings_back_its_chart_data(tmp_path, monkeypatch):
+    # Jobs read the price cache of the working directory
+    monkeypatch.chdir(tmp_path)
+    bars = make_bars(800, start="2010-01-01")
+    bars.to_csv(tmp_path / "AAA.csv")
+    PriceCache(source=CSVSource(str(tmp_path))).get("AAA", "2010-01-01", "2014-01-01")
+    data = PriceCache(offline=True).get("AAA", "2010-01-01", "2014-01-01")
+
+    pool = BacktestPool(max_workers=1, store_path=str(tmp_path / "results.db"))
+    try:
+        job = pool.submit(BacktestJob("AAA", "2010-01-01", "2014-01-01", 20, 50, 100000, engine="fast", offline=True))
+        finished = wait_for(pool)
+    finally:
+        pool.shutdown()
+
+    assert [(finished_job.job_id, finished_job.status) for finished_job, _ in finished] == [(job.job_id, "done")]
+    value, _, _, equity_curve, price_data = finished[0][1]
+    expected = backtest_data(data, 20, 50, 100000, "fast")
+    assert value == expected[0]
+    pd.testing.assert_frame_equal(price_data, strategy_price_data(data, SMACrossover(20, 50)))
+    assert len(equity_curve) == len(expected[3])
+
+def test_cancelled_running_job_is_cancelling_until_it_stops(tmp_path, monkeypatch):
+    pytest.importorskip("backtrader")
+    monkeypatch.chdir(tmp_path)
+    make_bars(6000, start="1990-01-01").to_csv(tmp_path / "AAA.csv")
+    PriceCache(source=CSVSource(str(tmp_path))).get("AAA", "1990-01-01", "2015-01-01")
+
+    pool = BacktestPool(max_workers=1, store_path=str(tmp_path / "results.db"))
+    try:
+        running = pool.submit(BacktestJob("AAA", "1990-01-01", "2015-01-01", 20, 50, 100000, engine="cerebro", offline=True))
+        queued = pool.submit(BacktestJob("AAA", "1990-01-01", "2015-01-01", 30, 50, 100000, engine="cerebro", offline=True))
+        deadline = time.monotonic() + 60
+        while running.status != "running" and time.monotonic() < deadline:
+            pool.poll()
+            time.sleep(0.01)
+        pool.cancel(queued.job_id)
+        pool.cancel(running.job_id)
+        assert pool.cancelling(running.job_id)
+        finished = wait_for(pool)
+    finally:
+        pool.shutdown()
+
+    assert {job.job_id: job.status for job, _ in finished} == {running.job_id: "cancelled", queued.job_id: "cancelled"}
+    assert not pool.cancelling(running.job_id)
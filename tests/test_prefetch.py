@@ -0,0 +1,123 @@
+import threading
+
+import pytest
+
+from conftest import make_bars
+from tradewhiz_prefetch import Prefetcher
+from tradewhiz_sources import CSVSource, DownloadError, with_retries
+
+START, END = "2011-01-01", "2012-01-01"
+
+# CSVSource with injected failures. A request containing a symbol of fail_batches
+# together with any other symbol raises; a symbol of flaky is left out of the
+# results (a retryable failure) for its first flaky[symbol] requests.
+class FlakySource(CSVSource):
+    batch_size = 4
+
+    def __init__(self, directory, fail_batches=(), flaky=None):
+        super().__init__(directory)
+        self.fail_batches = set(fail_batches)
+        self.flaky = dict(flaky or {})
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def fetch(self, symbols, start_date, end_date, interval="1d"):
+        with self.lock:
+            self.requests.append(list(symbols))
+            if len(symbols) > 1 and self.fail_batches.intersection(symbols):
+                raise ConnectionError("batch request failed")
+            left_out = [symbol for symbol in symbols if self.flaky.get(symbol, 0) > 0]
+            for symbol in left_out:
+                self.flaky[symbol] -= 1
+        results = super().fetch(symbols, start_date, end_date, interval)
+        for symbol in left_out:
+            del results[symbol]
+        return results
+
+@pytest.fixture
+def directory(tmp_path):
+    for seed, symbol in enumerate(["AAA", "BBB", "CCC", "DDD"]):
+        make_bars(1000, seed=seed, start="2010-01-01").to_csv(tmp_path / f"{symbol}.csv")
+    return str(tmp_path)
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr("tradewhiz_prefetch.time.sleep", delays.append)
+    return delays
+
+def prefetcher(source, tmp_path, **options):
+    return Prefetcher(source, cache_dir=str(tmp_path / "price_cache"), max_workers=1, **options)
+
+def statuses(status):
+    return {row.symbol: (row.status, row.attempts) for row in status.itertuples()}
+
+def test_failing_batch_is_split_into_halves(directory, tmp_path, sleeps):
+    source = FlakySource(directory, fail_batches=["CCC"])
+    status = prefetcher(source, tmp_path, retries=3).prefetch(["AAA", "BBB", "CCC", "DDD"], START, END)
+
+    assert source.requests == [["AAA", "BBB", "CCC", "DDD"], ["AAA", "BBB"], ["CCC", "DDD"], ["CCC"], ["DDD"]]
+    assert statuses(status) == {
+        "AAA": ("downloaded", 2), "BBB": ("downloaded", 2), "CCC": ("downloaded", 3), "DDD": ("downloaded", 3)
+    }
+    assert len(sleeps) == 2
+
+def test_symbol_fails_only_once_the_retries_run_out(directory, tmp_path, sleeps):
+    # BBB succeeds on its last attempt, CCC never does
+    source = FlakySource(directory, flaky={"BBB": 2, "CCC": 10})
+    status = prefetcher(source, tmp_path, retries=2, backoff=0.5).prefetch(["BBB", "CCC"], START, END)
+
+    assert statuses(status) == {"BBB": ("downloaded", 3), "CCC": ("failed", 3)}
+    assert status.set_index("symbol").at["CCC", "error"] == "no data returned"
+    assert len(source.requests) == 5  # One batch, then two halves twice
+    # Exponential backoff with jitter: 0.5 s, then 1 s, give or take 25%
+    assert len(sleeps) == 2
+    assert 0.375 <= sleeps[0] <= 0.625 and 0.75 <= sleeps[1] <= 1.25
+
+def test_partial_failure_reports_a_status_per_symbol(directory, tmp_path, sleeps):
+    source = FlakySource(directory, flaky={"CCC": 10})
+    fetcher = prefetcher(source, tmp_path, retries=1)
+    fetcher.prefetch(["DDD"], START, END)
+    status = fetcher.prefetch(["AAA", "CCC", "DDD", "ZZZ"], START, END)
+
+    assert list(status["symbol"]) == ["AAA", "CCC", "DDD", "ZZZ"]
+    # ZZZ has no CSV file: a permanent failure, never retried
+    assert statuses(status) == {
+        "AAA": ("downloaded", 1), "CCC": ("failed", 2), "DDD": ("cached", 0), "ZZZ": ("failed", 1)
+    }
+    rows = status.set_index("symbol")
+    assert rows.at["AAA", "bars"] == rows.at["DDD", "bars"] > 0
+    assert rows.at["CCC", "bars"] == rows.at["ZZZ", "bars"] == 0
+    assert "No such file" in rows.at["ZZZ", "error"]
+    # Failed symbols leave nothing in the cache
+    assert fetcher.cache.load("CCC")[0] is None
+
+def test_cancelled_prefetch_fetches_nothing(directory, tmp_path, sleeps):
+    source = FlakySource(directory)
+    status = prefetcher(source, tmp_path).prefetch(["AAA", "BBB"], START, END, cancelled=lambda: True)
+    assert source.requests == []
+    assert set(status["status"]) == {"cancelled"}
+
+def test_with_retries_backs_off_then_raises(monkeypatch):
+    delays, calls = [], []
+    monkeypatch.setattr("tradewhiz_sources.time.sleep", delays.append)
+
+    def source(*args):
+        calls.append(args)
+        if len(calls) < 3:
+            raise ConnectionError("reset")
+        return "bars"
+
+    assert with_retries(source, retries=3, backoff=1.0)("AAA", START, END) == "bars"
+    assert len(calls) == 3 and len(delays) == 2
+
+    def broken(*args):
+        calls.append(args)
+        raise ConnectionError("reset")
+
+    calls.clear()
+    delays.clear()
+    with pytest.raises(DownloadError, match="after 3 attempts"):
+        with_retries(broken, retries=2, backoff=1.0)("AAA", START, END)
+    assert len(calls) == 3
+    assert 0.75 <= delays[0] <= 1.25 and 1.5 <= delays[1] <= 2.5
@@ -0,0 +1,97 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import make_bars
+from tradewhiz_core import PriceCache
+from tradewhiz_sources import CSVSource
+
+# CSVSource that records the ranges it is asked for
+class CountingSource(CSVSource):
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.requests = []
+
+    def fetch(self, symbols, start_date, end_date, interval="1d"):
+        self.requests.extend((symbol, start_date, end_date) for symbol in symbols)
+        return super().fetch(symbols, start_date, end_date, interval)
+
+@pytest.fixture
+def source(tmp_path):
+    directory = tmp_path / "csv"
+    directory.mkdir()
+    make_bars(1000, start="2010-01-01").to_csv(directory / "AAA.csv")
+    return CountingSource(str(directory))
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / "price_cache")
+
+def cached_version(cache_dir, symbol="AAA"):
+    with open(os.path.join(cache_dir, f"{symbol}.json")) as f:
+        return json.load(f)["version"]
+
+def version_folders(cache_dir, symbol="AAA"):
+    return sorted(os.listdir(os.path.join(cache_dir, symbol)))
+
+def test_cold_fill_fetches_the_range_once(source, cache_dir):
+    data = PriceCache(cache_dir, source=source).get("AAA", "2011-01-01", "2012-01-01")
+    expected = make_bars(1000, start="2010-01-01").loc["2011-01-01":"2011-12-31"]
+
+    assert source.requests == [("AAA", "2011-01-01", "2012-01-01")]
+    pd.testing.assert_frame_equal(data, expected, check_freq=False, check_index_type=False)
+    assert version_folders(cache_dir) == [cached_version(cache_dir)]
+
+def test_cached_range_is_served_without_fetching(source, cache_dir):
+    PriceCache(cache_dir, source=source).get("AAA", "2011-01-01", "2012-01-01")
+    source.requests.clear()
+
+    data = PriceCache(cache_dir, source=source).get("AAA", "2011-03-01", "2011-09-01")
+    assert source.requests == []
+    assert data.index[0] == pd.Timestamp("2011-03-01") and data.index[-1] < pd.Timestamp("2011-09-01")
+
+def test_incremental_top_up_fetches_only_the_missing_ranges(source, cache_dir):
+    PriceCache(cache_dir, source=source).get("AAA", "2011-01-01", "2012-01-01")
+    source.requests.clear()
+
+    data = PriceCache(cache_dir, source=source).get("AAA", "2010-06-01", "2012-06-01")
+    assert source.requests == [("AAA", "2010-06-01", "2011-01-01"), ("AAA", "2012-01-01", "2012-06-01")]
+    expected = make_bars(1000, start="2010-01-01").loc["2010-06-01":"2012-05-31"]
+    pd.testing.assert_frame_equal(data, expected, check_freq=False, check_index_type=False)
+    with open(os.path.join(cache_dir, "AAA.json")) as f:
+        meta = json.load(f)
+    assert (meta["start"], meta["end"], meta["rows"]) == ("2010-06-01", "2012-06-01", len(expected))
+
+def test_offline_without_a_cache_returns_no_bars(source, cache_dir):
+    data = PriceCache(cache_dir, source=source, offline=True).get("AAA", "2011-01-01", "2012-01-01")
+    assert len(data) == 0
+    assert list(data.columns) == ["open", "high", "low", "close", "volume"]
+    assert source.requests == []
+    assert not os.path.exists(cache_dir)
+
+def test_offline_serves_the_cached_bars_only(source, cache_dir):
+    PriceCache(cache_dir, source=source).get("AAA", "2011-01-01", "2012-01-01")
+    source.requests.clear()
+
+    data = PriceCache(cache_dir, source=source, offline=True).get("AAA", "2010-01-01", "2013-01-01")
+    assert source.requests == []
+    assert data.index[0] >= pd.Timestamp("2011-01-01") and data.index[-1] < pd.Timestamp("2012-01-01")
+
+def test_version_folder_is_reused_until_the_cache_changes(source, cache_dir):
+    PriceCache(cache_dir, source=source).get("AAA", "2011-01-01", "2012-01-01")
+    version = cached_version(cache_dir)
+
+    # Reads of the covered range map the same files
+    PriceCache(cache_dir, source=source).get("AAA", "2011-01-01", "2012-01-01")
+    assert cached_version(cache_dir) == version
+    assert version_folders(cache_dir) == [version]
+
+    # A top-up writes a new version and removes the previous one
+    old = PriceCache(cache_dir, source=source).get("AAA", "2011-01-01", "2012-01-01")
+    PriceCache(cache_dir, source=source).get("AAA", "2011-01-01", "2012-06-01")
+    assert cached_version(cache_dir) != version
+    assert version_folders(cache_dir) == [cached_version(cache_dir)]
+    # Data mapped from the previous version stays readable
+    assert old["close"].sum() > 0
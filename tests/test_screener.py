@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_bars
+from tradewhiz_screener import rolling_means, screen
+
+def test_rolling_means_match_pandas_with_gaps():
+    rng = np.random.default_rng(0)
+    values = rng.normal(100.0, 5.0, (400, 6))
+    values[rng.random(values.shape) < 0.05] = np.nan
+    values[:30, 2] = np.nan  # Listed late
+    values[-40:, 3] = np.nan  # Delisted
+    values[:, 4] = np.nan  # No data
+    for period, means in zip((1, 5, 50), rolling_means(values, 1, 5, 50)):
+        expected = pd.DataFrame(values).rolling(period).mean().to_numpy()
+        np.testing.assert_allclose(means, expected, rtol=1e-12, equal_nan=True)
+
+def test_rolling_means_longer_than_the_data():
+    means, = rolling_means(np.ones((10, 2)), 20)
+    assert np.isnan(means).all()
+
+# Columns: A trades all 300 bars, B has no bars for the last 5 dates, C only the last 30
+# (fewer than the long SMA), D none at all
+@pytest.fixture
+def closes():
+    closes = pd.DataFrame({
+        symbol: make_bars(300, seed=seed)["close"] for seed, symbol in enumerate("ABCD", start=1)
+    })
+    closes.iloc[-5:, 1] = np.nan
+    closes.iloc[:-30, 2] = np.nan
+    closes.iloc[:, 3] = np.nan
+    return closes
+
+def test_screen_state_and_bars_since_cross(closes):
+    result = screen(closes, 20, 50, lookback=100).set_index("symbol")
+    close = closes["A"]
+    state = (close.rolling(20).mean() > close.rolling(50).mean()).astype(float).where(close.rolling(50).mean().notna())
+    crosses = np.flatnonzero(state.diff().abs() == 1.0)
+    row = result.loc["A"]
+    assert row["status"] == "ok"
+    assert row["state"] == ("long" if state.iloc[-1] == 1.0 else "flat")
+    assert row["bars_since_cross"] == len(close) - 1 - crosses[-1]
+    assert row["last_cross"] == close.index[crosses[-1]]
+    assert row["close"] == close.iloc[-1]
+
+    # Signal only: the state of each close held over the next bar, close to close
+    returns = close.pct_change().iloc[-100:]
+    held = state.shift(1).iloc[-100:]
+    assert row["signal_return"] == pytest.approx(np.prod(1.0 + held * returns) - 1.0, rel=1e-12)
+    assert row["buy_hold_return"] == pytest.approx(close.iloc[-1] / close.iloc[-101] - 1.0, rel=1e-12)
+    assert row["exposure"] == pytest.approx(held.mean(), rel=1e-12)
+
+def test_screen_statuses(closes):
+    result = screen(closes, 20, 50).set_index("symbol")
+    assert list(result["status"]) == ["ok", "stale", "insufficient data", "no data"]
+    assert list(result["bars"]) == [300, 295, 30, 0]
+    # Tickers without a signal get no state or metrics
+    for symbol in "BCD":
+        assert result.loc[symbol, "state"] == ""
+        assert result.loc[symbol, ["bars_since_cross", "close", "signal_return", "sharpe_ratio"]].isna().all()
+        assert pd.isna(result.loc[symbol, "last_cross"])
@@ -0,0 +1,24 @@
+import pytest
+
+from tradewhiz_store import ResultStore, data_hash
+
+@pytest.mark.parametrize("column", ["open", "high", "low", "close", "volume"])
+def test_revising_any_ohlcv_column_changes_the_hash(bars, column):
+    revised = bars.copy()
+    revised.iloc[100, revised.columns.get_loc(column)] *= 1.01
+    assert data_hash(revised) != data_hash(bars)
+
+def test_hash_ignores_memory_layout_and_index_resolution(bars):
+    copy = bars.copy()
+    copy.index = copy.index.as_unit("us")
+    assert data_hash(copy) == data_hash(bars)
+
+def test_revised_bars_miss_the_stored_run(bars, tmp_path):
+    store = ResultStore(str(tmp_path / "results.db"))
+    key = store.key("AAA", "2000-01-01", "2006-01-01", 20, 50, 100000, "fast", bars)
+    store.save(key, 110000.0, 0.5, 0.1, bars["close"].to_numpy())
+    assert store.lookup(key) is not None
+
+    revised = bars.copy()
+    revised.iloc[100, revised.columns.get_loc("volume")] += 1
+    assert store.lookup(store.key("AAA", "2000-01-01", "2006-01-01", 20, 50, 100000, "fast", revised)) is None
@@ -0,0 +1,25 @@
+import pytest
+
+from conftest import make_bars
+from tradewhiz_core import backtest_data
+from tradewhiz_stream import StreamingSMATrader, dataframe_bar_source
+
+# With 1000 of cash some buys of the 10 share stake cost more than the cash
+@pytest.mark.parametrize("starting_cash", [100000, 1000, 500])
+def test_replay_matches_cerebro(starting_cash):
+    pytest.importorskip("backtrader")
+    bars = make_bars()
+    trader = StreamingSMATrader(20, 50, starting_cash)
+    for bar in dataframe_bar_source(bars):
+        trader.on_bar(bar)
+    cerebro_value, _, _, cerebro_equity, _ = backtest_data(bars, 20, 50, starting_cash, "cerebro")
+    assert trader.equity_curve[-1] == pytest.approx(cerebro_value, rel=1e-9)
+    assert trader.equity_curve == pytest.approx(list(cerebro_equity), rel=1e-9)
+
+def test_rejected_buy_is_not_filled():
+    trader = StreamingSMATrader(20, 50, 500)
+    for bar in dataframe_bar_source(make_bars()):
+        update = trader.on_bar(bar)
+        assert update["signal"] != "buy"
+        assert trader.position == 0
+    assert trader.cash == 500
@@ -0,0 +1,69 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import tradewhiz_strategies
+from conftest import make_bars
+from tradewhiz_core import PriceCache, backtest_data
+from tradewhiz_pool import BacktestJob
+from tradewhiz_sources import CSVSource
+from tradewhiz_whatif import WhatIfSession
+
+START, END = "2010-01-01", "2014-01-01"
+
+# Bars of AAA in the price cache of the working directory; jobs read it offline
+@pytest.fixture
+def data(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(tradewhiz_strategies, "_shared_caches", OrderedDict())
+    make_bars(800, start=START).to_csv(tmp_path / "AAA.csv")
+    PriceCache(source=CSVSource(str(tmp_path))).get("AAA", START, END)
+    return PriceCache(offline=True).get("AAA", START, END)
+
+def job(short_sma_period, long_sma_period, starting_cash, engine):
+    return BacktestJob("AAA", START, END, short_sma_period, long_sma_period, starting_cash, engine=engine, offline=True)
+
+def assert_fresh_result(result, data, short_sma_period, long_sma_period, starting_cash, engine):
+    expected = backtest_data(data, short_sma_period, long_sma_period, starting_cash, engine)
+    assert result[0] == pytest.approx(expected[0], rel=1e-12)
+    assert result[1] == pytest.approx(expected[1], rel=1e-12)
+    assert result[2] == pytest.approx(expected[2], rel=1e-12)
+    np.testing.assert_allclose(result[3], expected[3], rtol=1e-12)
+    pd.testing.assert_frame_equal(result[4], expected[4])
+
+@pytest.mark.parametrize("engine", ["fast", "cerebro"])
+def test_rerun_only_computes_the_changed_stages(data, engine):
+    if engine == "cerebro":
+        pytest.importorskip("backtrader")
+    session = WhatIfSession()
+
+    first = job(20, 50, 100000, engine)
+    result, reused = session.run(first)
+    assert reused == []
+    assert first.profile.counters["indicators_computed"] == 2
+    assert_fresh_result(result, data, 20, 50, 100000, engine)
+
+    # Only the engine depends on the starting cash
+    cash = job(20, 50, 50000, engine)
+    result, reused = session.run(cash)
+    assert reused == ["download", "indicators"]
+    assert cash.profile.counters["indicators_computed"] == 0
+    assert "download" not in cash.profile.stages
+    assert_fresh_result(result, data, 20, 50, 50000, engine)
+
+    # A new short period is one new SMA column; the long SMA is reused
+    short = job(30, 50, 50000, engine)
+    result, reused = session.run(short)
+    assert reused == ["download"]
+    assert short.profile.counters["indicators_computed"] == 1
+    assert_fresh_result(result, data, 30, 50, 50000, engine)
+
+    # Back to the first settings: every stage is a lookup
+    again = job(20, 50, 100000, engine)
+    result, reused = session.run(again)
+    assert reused == ["download", "indicators", engine, "metrics"]
+    assert engine not in again.profile.stages
+    assert_fresh_result(result, data, 20, 50, 100000, engine)
+    assert len(again.ledger) == len(first.ledger)
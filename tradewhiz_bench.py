@@ -0,0 +1,378 @@
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from tradewhiz_core import (
+    PriceCache, add_sma_columns, calculate_max_drawdown, calculate_sharpe_ratio, resample_bars, run_cerebro_sma, run_fast_sma,
+    warm_imports
+)
+from tradewhiz_pool import BacktestJob
+from tradewhiz_screener import close_matrix, screen
+from tradewhiz_sources import normalize_yahoo
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# TradeWhiz benchmarks. Each benchmark prints its timings and exits with status 1
+# when a limit is exceeded, so it can guard against performance regressions.
+#
+#   python tradewhiz_bench.py startup --runs 5 --max-seconds 2.0
+#   python tradewhiz_bench.py pipeline --bars 1000 100000 1000000 --output bench.json
+#   python tradewhiz_bench.py pipeline --compare bench.json --tolerance 1.25
+#   python tradewhiz_bench.py screen --tickers 5000 --bars 1000 --max-seconds 5.0
+#
+# Everything runs on synthetic prices, so no network access is needed.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GUI_SCRIPT = os.path.join(HERE, "TradeWhiz 9.11.py")
+
+# Must not be imported before the main window is shown
+LAZY_MODULES = ["backtrader", "yfinance", "reportlab", "matplotlib.pyplot"]
+
+# Runs in a fresh interpreter: import the GUI script and show the main window
+STARTUP_PROBE = """
+import importlib.util, json, os, sys, time
+start = time.perf_counter()
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, {here!r})
+spec = importlib.util.spec_from_file_location("tradewhiz_gui", {script!r})
+gui = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(gui)
+imported = time.perf_counter()
+app = gui.QApplication(sys.argv[:1])
+window = gui.BacktestWindow()
+window.show()
+shown = time.perf_counter()
+loaded = [name for name in {lazy!r} if name in sys.modules]
+print(json.dumps({{"import": imported - start, "window": shown - imported, "total": shown - start, "loaded": loaded}}))
+"""
+
+def measure_startup(runs=5):
+    probe = STARTUP_PROBE.format(here=HERE, script=GUI_SCRIPT, lazy=LAZY_MODULES)
+    samples = []
+    for _ in range(runs):
+        # The GUI reads and writes gui_settings.json in the working directory, so run in an empty one
+        with tempfile.TemporaryDirectory(prefix="tradewhiz_bench_") as directory:
+            output = subprocess.run(
+                [sys.executable, "-c", probe], cwd=directory, capture_output=True, text=True, check=True
+            ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return samples
+
+def bench_startup(args):
+    samples = measure_startup(args.runs)
+    result = {
+        name: statistics.median(sample[name] for sample in samples) for name in ("import", "window", "total")
+    }
+    result["loaded"] = sorted({name for sample in samples for name in sample["loaded"]})
+    print(json.dumps(result, indent=4))
+
+    failures = []
+    if result["total"] > args.max_seconds:
+        failures.append(f"startup took {result['total']:.2f}s, limit {args.max_seconds:.2f}s")
+    if result["loaded"]:
+        failures.append("imported before the window was shown: " + ", ".join(result["loaded"]))
+    for failure in failures:
+        print(f"REGRESSION: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+# Synthetic prices shaped like a yfinance download (MultiIndex columns, 'Adj Close'),
+# so the normalization stage does the same work as for real data. Daily bars up to
+# 50,000 bars, minute bars with intraday-sized moves beyond that (pandas timestamps
+# end in 2262, and daily volatility over millions of bars would overflow).
+def synthetic_download(n_bars, seed=0, symbol="SYN"):
+    rng = np.random.default_rng(seed)
+    if n_bars <= 50000:
+        index = pd.bdate_range("2000-01-03", periods=n_bars, name="Date")
+        bars_per_day = 1
+    else:
+        index = pd.date_range("2000-01-03", periods=n_bars, freq="min", name="Date")
+        bars_per_day = 390
+    scale = np.sqrt(bars_per_day)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0002 / bars_per_day, 0.01 / scale, n_bars)))
+    open_ = close * np.exp(rng.normal(0.0, 0.002 / scale, n_bars))
+    spread = np.abs(rng.normal(0.0, 0.005 / scale, n_bars))
+    data = pd.DataFrame({
+        "Adj Close": close, "Close": close * 1.1, "High": np.maximum(open_, close) * (1 + spread),
+        "Low": np.minimum(open_, close) * (1 - spread), "Open": open_,
+        "Volume": rng.integers(100000, 10000000, n_bars).astype(float),
+    }, index=index)
+    data.columns = pd.MultiIndex.from_product([data.columns, [symbol]], names=["Price", "Ticker"])
+    return data
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10  # Bytes on macOS, KiB on Linux
+
+# Times named stages; with trace_memory also records the peak Python/NumPy allocation of
+# each stage (tracemalloc slows down pure-Python code such as Cerebro noticeably)
+class StageTimer:
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.records = []
+
+    def run(self, bars, stage, function, *args):
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        value = function(*args)
+        seconds = time.perf_counter() - start
+        self.records.append({
+            "bars": bars, "stage": stage, "seconds": seconds,
+            "peak_alloc_mb": (tracemalloc.get_traced_memory()[1] - before) / 2 ** 20 if self.trace_memory else None,
+            "peak_rss_mb": peak_rss_mb(),
+        })
+        return value
+
+    # Best time and largest allocation over the repeats of every stage
+    def summary(self):
+        stages = {}
+        for record in self.records:
+            key = (record["bars"], record["stage"])
+            if key not in stages:
+                stages[key] = dict(record)
+            else:
+                best = stages[key]
+                best["seconds"] = min(best["seconds"], record["seconds"])
+                if record["peak_alloc_mb"] is not None:
+                    best["peak_alloc_mb"] = max(best["peak_alloc_mb"], record["peak_alloc_mb"])
+                best["peak_rss_mb"] = record["peak_rss_mb"]
+        return list(stages.values())
+
+# Main window of the GUI, offscreen, for timing update_results; None without PyQt5
+def load_gui_window():
+    try:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        spec = importlib.util.spec_from_file_location("tradewhiz_gui", GUI_SCRIPT)
+        gui = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(gui)
+    except ImportError as e:
+        print(f"GUI not available, skipping the plot stage: {e}", file=sys.stderr)
+        return None, None
+
+    app = gui.QApplication.instance() or gui.QApplication(sys.argv[:1])
+    window = gui.BacktestWindow()
+    window.resize(1600, 1000)
+    window.show()
+    app.processEvents()
+    return gui, window
+
+def plot_results(gui, window, run, portfolio_value, sharpe_ratio, max_drawdown, equity_curve, price_data):
+    window.current_run = run
+    window.update_results(portfolio_value, sharpe_ratio, max_drawdown, equity_curve, price_data)
+
+def save_report(report, file_path):
+    from tradewhiz_report import build_report
+    build_report(file_path, report)
+
+# The stages of a queued backtest job, then the GUI plotting and the PDF report
+def run_pipeline(n_bars, args, timer, gui, window, report_dir):
+    short_sma_period, long_sma_period, starting_cash = args.short_sma, args.long_sma, args.cash
+    raw = synthetic_download(n_bars, args.seed)
+
+    data = timer.run(n_bars, "normalize", normalize_yahoo, raw)
+    del raw
+
+    # Round trip through the price cache: the rest of the pipeline runs on the memory-mapped columns
+    cache = PriceCache(os.path.join(report_dir, "price_cache"), offline=True)
+    start, end = data.index[0].normalize(), data.index[-1].normalize() + pd.Timedelta(days=1)
+    timer.run(n_bars, "cache_store", cache.store, "SYN", data, start, end)
+    data = timer.run(n_bars, "cache_load", cache.get, "SYN", start, end)
+    if data.index[1] - data.index[0] < pd.Timedelta(days=1):
+        # Minute bars: time the resampling to hourly bars as well
+        timer.run(n_bars, "resample_1h", resample_bars, data, "1h")
+    data = timer.run(n_bars, "rolling_sma", add_sma_columns, data, short_sma_period, long_sma_period)
+
+    results = {}
+    if "cerebro" in args.engines and n_bars <= args.max_cerebro_bars:
+        results["cerebro"] = timer.run(n_bars, "cerebro", run_cerebro_sma, data, short_sma_period, long_sma_period, starting_cash)
+    if "fast" in args.engines:
+        results["fast"] = timer.run(n_bars, "fast", run_fast_sma, data, short_sma_period, long_sma_period, starting_cash)
+    if not results:
+        return
+    engine = "cerebro" if "cerebro" in results else "fast"
+    portfolio_value, equity_curve = results[engine]
+
+    sharpe_ratio = timer.run(n_bars, "sharpe_ratio", calculate_sharpe_ratio, equity_curve)
+    max_drawdown = timer.run(n_bars, "max_drawdown", calculate_max_drawdown, equity_curve)
+    price_data = data[["close", "short_sma", "long_sma"]].rename(columns={"short_sma": "Short SMA", "long_sma": "Long SMA"})
+
+    if window is not None:
+        run = BacktestJob("SYN", str(data.index[0].date()), str(data.index[-1].date()), short_sma_period,
+                          long_sma_period, starting_cash, engine)
+        timer.run(n_bars, "plot", plot_results, gui, window, run, portfolio_value, sharpe_ratio, max_drawdown,
+                  equity_curve, price_data)
+        report = window.last_report
+    else:
+        report = {
+            "parameters": [("Stock Ticker", "SYN"), ("Bars", n_bars), ("Engine", engine)],
+            "results": [("Portfolio Value ($)", f"${portfolio_value:,.2f}")],
+            "equity_curve": equity_curve, "price_data": price_data,
+        }
+    if not args.no_report:
+        timer.run(n_bars, "save_report", save_report, report, os.path.join(report_dir, f"report_{n_bars}.pdf"))
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def package_versions():
+    versions = {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__}
+    for name in ("backtrader", "matplotlib", "reportlab"):
+        try:
+            versions[name] = __import__(name).__version__
+        except (ImportError, AttributeError):
+            versions[name] = None
+    return versions
+
+# Stages that got slower than the baseline by more than tolerance (and by at least min_delta seconds)
+def compare_results(results, baseline, tolerance, min_delta=0.005):
+    previous = {(record["bars"], record["stage"]): record["seconds"] for record in baseline["results"]}
+    regressions = []
+    for record in results:
+        before = previous.get((record["bars"], record["stage"]))
+        if before is not None and record["seconds"] > before * tolerance and record["seconds"] - before > min_delta:
+            regressions.append(f"{record['stage']} at {record['bars']:,} bars: {before:.4f}s -> {record['seconds']:.4f}s")
+    return regressions
+
+def bench_pipeline(args):
+    # Import time is measured by the startup benchmark, not here
+    warm_imports()
+    timer = StageTimer(args.trace_memory)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="tradewhiz_bench_") as scratch_dir:
+        # The GUI reads gui_settings.json and appends to the performance log in the working directory
+        os.chdir(scratch_dir)
+        try:
+            gui, window = (None, None) if args.no_gui else load_gui_window()
+            for n_bars in args.bars:
+                for _ in range(args.repeat):
+                    run_pipeline(n_bars, args, timer, gui, window, scratch_dir)
+                print(f"{n_bars:,} bars done", file=sys.stderr)
+        finally:
+            os.chdir(cwd)
+
+    results = timer.summary()
+    document = {
+        "meta": {
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"), "revision": git_revision(),
+            "platform": platform.platform(), "versions": package_versions(), "repeat": args.repeat,
+            "short_sma": args.short_sma, "long_sma": args.long_sma, "trace_memory": args.trace_memory,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=4)
+    else:
+        json.dump(document, sys.stdout, indent=4)
+        sys.stdout.write("\n")
+
+    for record in results:
+        memory = f"{record['peak_alloc_mb']:9.1f} MB" if record["peak_alloc_mb"] is not None else ""
+        print(f"{record['bars']:>12,} {record['stage']:<14} {record['seconds']:10.4f}s {memory}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            regressions = compare_results(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+# Screen a synthetic universe in a scratch price cache: reading the close matrix from
+# the cache, then the vectorized screen
+def bench_screen(args):
+    rng = np.random.default_rng(args.seed)
+    index = pd.bdate_range("2000-01-03", periods=args.bars)
+    stock_symbols = [f"SYN{i}" for i in range(args.tickers)]
+    with tempfile.TemporaryDirectory(prefix="tradewhiz_bench_") as scratch_dir:
+        cache = PriceCache(scratch_dir)
+        for symbol in stock_symbols:
+            close = 100.0 * np.exp(np.cumsum(rng.normal(0.0002, 0.01, args.bars)))
+            data = pd.DataFrame({"open": close, "high": close, "low": close, "close": close, "volume": 1e6}, index=index)
+            cache.store(symbol, data, index[0], index[-1] + pd.Timedelta(days=1))
+        print(f"{args.tickers:,} tickers of {args.bars:,} bars cached", file=sys.stderr)
+
+        start = time.perf_counter()
+        closes = close_matrix(stock_symbols, str(index[0].date()), str((index[-1] + pd.Timedelta(days=1)).date()), cache_dir=scratch_dir)
+        loaded = time.perf_counter()
+        result = screen(closes, args.short_sma, args.long_sma, args.lookback)
+        screened = time.perf_counter()
+
+    document = {
+        "tickers": args.tickers, "bars": args.bars, "load_seconds": loaded - start, "screen_seconds": screened - loaded,
+        "total_seconds": screened - start, "signals": int((result["status"] == "ok").sum()),
+    }
+    print(json.dumps(document, indent=4))
+    if document["total_seconds"] > args.max_seconds:
+        print(f"REGRESSION: screen took {document['total_seconds']:.2f}s, limit {args.max_seconds:.2f}s", file=sys.stderr)
+        return 1
+    return 0
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="TradeWhiz performance benchmarks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    startup = commands.add_parser("startup", help="Time from interpreter start to the main window being shown")
+    startup.add_argument("--runs", type=int, default=5, help="Number of cold starts; the median is reported")
+    startup.add_argument("--max-seconds", type=float, default=2.0, help="Fail when the median startup time is above this")
+    startup.set_defaults(run=bench_startup)
+
+    pipeline = commands.add_parser("pipeline", help="Time each stage of a backtest on synthetic prices")
+    pipeline.add_argument("--bars", type=int, nargs="+", default=[1000, 100000, 1000000], help="Series lengths to run")
+    pipeline.add_argument("--engines", nargs="+", choices=["cerebro", "fast"], default=["cerebro", "fast"])
+    pipeline.add_argument("--max-cerebro-bars", type=int, default=100000, help="Skip Cerebro on longer series (about 2,000 bars per second)")
+    pipeline.add_argument("--short-sma", type=int, default=50, help="Short SMA period")
+    pipeline.add_argument("--long-sma", type=int, default=200, help="Long SMA period")
+    pipeline.add_argument("--cash", type=float, default=100000, help="Starting cash ($)")
+    pipeline.add_argument("--seed", type=int, default=0, help="Random seed of the synthetic prices")
+    pipeline.add_argument("--repeat", type=int, default=1, help="Runs per length; the best time is reported")
+    pipeline.add_argument("--trace-memory", action="store_true", help="Record the peak allocation of every stage")
+    pipeline.add_argument("--no-gui", action="store_true", help="Skip the plot stage (no PyQt5 needed)")
+    pipeline.add_argument("--no-report", action="store_true", help="Skip the PDF report stage")
+    pipeline.add_argument("--output", help="Write the results as JSON to this file instead of stdout")
+    pipeline.add_argument("--compare", help="Baseline JSON from an earlier run; exit with status 1 on regressions")
+    pipeline.add_argument("--tolerance", type=float, default=1.25, help="Allowed slowdown factor against the baseline")
+    pipeline.set_defaults(run=bench_pipeline)
+
+    screener = commands.add_parser("screen", help="Time the universe screener on synthetic prices")
+    screener.add_argument("--tickers", type=int, default=5000, help="Tickers in the universe")
+    screener.add_argument("--bars", type=int, default=1000, help="Daily bars per ticker")
+    screener.add_argument("--short-sma", type=int, default=50, help="Short SMA period")
+    screener.add_argument("--long-sma", type=int, default=200, help="Long SMA period")
+    screener.add_argument("--lookback", type=int, default=252, help="Bars of the trailing backtest")
+    screener.add_argument("--seed", type=int, default=0, help="Random seed of the synthetic prices")
+    screener.add_argument("--max-seconds", type=float, default=5.0, help="Fail when reading and screening take longer than this")
+    screener.set_defaults(run=bench_screen)
+
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    return args.run(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
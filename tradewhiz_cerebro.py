@@ -0,0 +1,157 @@
+from array import array
+
+import backtrader as bt
+import numpy as np
+
+# Backtrader side of the backtest pipeline. Kept apart from tradewhiz_core so that
+# Backtrader is only imported when a Cerebro backtest actually runs.
+
+# Backtrader indicator that replays a precomputed array instead of recalculating it
+class PrecomputedSMA(bt.Indicator):
+    lines = ("sma",)
+    params = (("period", 1), ("values", None))
+
+    def __init__(self):
+        self.addminperiod(self.p.period)
+
+    def next(self):
+        self.lines.sma[0] = self.p.values[len(self) - 1]
+
+    def once(self, start, end):
+        self.lines.sma.array[start:end] = array("d", self.p.values[start:end])
+
+# Order notifications arrive once per order, not per bar, so recording fills adds
+# nothing to next()
+def record_fill(ledger, order, bar):
+    ledger.record(bar, 1 if order.isbuy() else -1, abs(order.executed.size), order.executed.price, order.executed.comm)
+
+# Corrected SMAStrategy class
+class SMAStrategy(bt.Strategy):
+    # sma_cache: optional SMACache for the data feed, so the SMAs are not recomputed
+    # in every Cerebro instance or optstrategy run on the same prices.
+    # progress: optional callable, called with the number of bars processed every
+    # progress_every bars; it may raise to abort the run.
+    # ledger: optional tradewhiz_ledger.TradeLedger that records every fill.
+    params = (("short_period", 50), ("long_period", 200), ("sma_cache", None), ("progress", None), ("progress_every", 100),
+              ("ledger", None))
+
+    def __init__(self):
+        if self.p.sma_cache is not None:
+            self.short_sma = PrecomputedSMA(self.data, period=self.p.short_period, values=self.p.sma_cache.get(self.p.short_period))
+            self.long_sma = PrecomputedSMA(self.data, period=self.p.long_period, values=self.p.sma_cache.get(self.p.long_period))
+        else:
+            self.short_sma = bt.indicators.SimpleMovingAverage(self.data.close, period=self.p.short_period)
+            self.long_sma = bt.indicators.SimpleMovingAverage(self.data.close, period=self.p.long_period)
+        self.equity_curve = array("d")  # Store portfolio values
+        self.orders_issued = 0
+
+    def notify_order(self, order):
+        if self.p.ledger is not None and order.status == order.Completed:
+            record_fill(self.p.ledger, order, len(self) - 1)
+
+    def next(self):
+        # Track portfolio value
+        self.equity_curve.append(self.broker.getvalue())
+        if self.p.progress is not None and len(self) % self.p.progress_every == 0:
+            self.p.progress(len(self))
+
+        # Buy when short SMA crosses above long SMA
+        if self.short_sma > self.long_sma:
+            if not self.position:
+                self.buy()
+                self.orders_issued += 1
+        # Sell the whole position when short SMA crosses below long SMA
+        elif self.short_sma < self.long_sma:
+            if self.position:
+                self.close()
+                self.orders_issued += 1
+
+# Long/flat strategy replaying precomputed target states (1 = long, 0 = flat per bar),
+# e.g. Strategy.states() of a tradewhiz_strategies strategy. The equity curve starts
+# at bar start, where the strategy's indicators are defined.
+class SignalStrategy(bt.Strategy):
+    params = (("states", None), ("start", 0), ("progress", None), ("progress_every", 100), ("ledger", None))
+
+    def __init__(self):
+        self.equity_curve = array("d")
+        self.orders_issued = 0
+
+    def notify_order(self, order):
+        if self.p.ledger is not None and order.status == order.Completed:
+            record_fill(self.p.ledger, order, len(self) - 1)
+
+    def next(self):
+        bar = len(self) - 1
+        if self.p.progress is not None and len(self) % self.p.progress_every == 0:
+            self.p.progress(len(self))
+        if bar < self.p.start:
+            return
+        self.equity_curve.append(self.broker.getvalue())
+
+        if self.p.states[bar] > 0:
+            if not self.position:
+                self.buy()
+                self.orders_issued += 1
+        elif self.position:
+            self.close()
+            self.orders_issued += 1
+
+# Backtrader timeframe and compression of each bar interval
+TIMEFRAMES = {
+    "1m": (bt.TimeFrame.Minutes, 1),
+    "5m": (bt.TimeFrame.Minutes, 5),
+    "15m": (bt.TimeFrame.Minutes, 15),
+    "30m": (bt.TimeFrame.Minutes, 30),
+    "1h": (bt.TimeFrame.Minutes, 60),
+    "1d": (bt.TimeFrame.Days, 1),
+}
+
+# Data feed with explicit, case-sensitive column names. By default Backtrader matches
+# columns case-insensitively, so with both 'Close' and 'close' present it picks the
+# unadjusted 'Close' instead of the adjusted 'close' used for the SMAs.
+def make_data_feed(data, interval="1d"):
+    timeframe, compression = TIMEFRAMES[interval]
+    return bt.feeds.PandasData(
+        dataname=data, nocase=False, open="open", high="high", low="low", close="close", volume="volume", openinterest=None,
+        timeframe=timeframe, compression=compression
+    )
+
+# Sizer for the sizing of a tradewhiz_execution.ExecutionModel; factors holds the
+# fraction of equity to invest per bar for percent and volatility sizing, and bars the
+# (open, high, low, close, volume) arrays of the feed, so that the shares are capped at
+# what the cash pays for at the fill price exactly as in the fast engine
+class ExecutionSizer(bt.Sizer):
+    params = (("execution", None), ("factors", None), ("bars", None))
+
+    def _getsizing(self, comminfo, cash, data, isbuy):
+        if self.p.execution.sizing == "fixed":
+            return self.p.execution.stake
+        bar = len(data) - 1
+        return int(self.p.execution.buy_shares(self.broker.getvalue(), bar, *self.p.bars, factors=self.p.factors)[0])
+
+# Commission by order value, with the rate schedule of an ExecutionModel
+class ScheduleCommission(bt.CommInfoBase):
+    params = (("stocklike", True), ("commtype", bt.CommInfoBase.COMM_PERC), ("percabs", True), ("execution", None))
+
+    def _getcommission(self, size, price, pseudoexec):
+        value = abs(size) * price
+        return value * float(self.p.execution.commission_rate(value))
+
+# Apply an execution model to a Cerebro: sizer, commissions, slippage and fill price.
+# Backtrader has no volume-dependent slippage, so that one is only in the fast engine.
+# bars: (open, high, low, close, volume) arrays of the data, as from tradewhiz_core.bar_arrays
+def configure_broker(cerebro, execution, bars, periods_per_year=252):
+    if execution.slippage == "volume":
+        raise ValueError("Volume-based slippage is only supported by the fast engine.")
+    close = bars[3]
+    factors = None
+    if execution.sizing == "percent":
+        factors = np.full(len(close), execution.percent / 100.0)
+    elif execution.sizing == "volatility":
+        factors = execution.volatility_factors(close, periods_per_year)
+    cerebro.addsizer(ExecutionSizer, execution=execution, factors=factors, bars=bars)
+    cerebro.broker.addcommissioninfo(ScheduleCommission(execution=execution))
+    if execution.slippage == "fixed":
+        # Slip market orders filled at the open as well, capped at the bar's high and low
+        cerebro.broker.set_slippage_perc(execution.slippage_value, slip_open=True, slip_match=True, slip_out=False)
+    cerebro.broker.set_coc(execution.fill == "close")
@@ -0,0 +1,468 @@
+import argparse
+import csv
+import datetime
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from tradewhiz_core import COMMISSION, INTERVALS, STAKE, backtest, calculate_max_drawdown, calculate_sharpe_ratio, parse_weights, portfolio_backtest
+from tradewhiz_execution import FILLS, SIZINGS, SLIPPAGES, ExecutionModel
+from tradewhiz_ledger import TradeLedger, export_trades, trade_summary
+from tradewhiz_metrics import calmar_ratio, periods_per_year, sortino_ratio
+from tradewhiz_montecarlo import METHODS as MONTE_CARLO_METHODS, monte_carlo
+from tradewhiz_prefetch import STATUS_COLUMNS, Prefetcher, describe as describe_prefetch
+from tradewhiz_screener import SCREEN_COLUMNS, read_universe, screen_universe, to_records
+from tradewhiz_sources import make_source
+from tradewhiz_store import ResultStore, memoized_backtest
+from tradewhiz_strategies import STRATEGIES, SMACrossover, parse_strategy
+
+# Headless TradeWhiz runner. Runs the same pipeline as the GUI without PyQt5 or
+# matplotlib, either for tickers given on the command line or for a JSON/CSV job
+# file, and writes the metrics as JSON or CSV.
+#
+#   python tradewhiz_cli.py AAPL MSFT --start 2010-01-01 --end 2024-12-31 --engine fast
+#   python tradewhiz_cli.py --jobs jobs.csv --workers 8 --output results.csv
+#   python tradewhiz_cli.py --prefetch --jobs universe.csv --batch-size 50 --download-workers 4 --output prefetch.csv
+#   python tradewhiz_cli.py AAPL MSFT --source fixtures/prices --engine fast    (CSV files instead of Yahoo Finance)
+#   python tradewhiz_cli.py AAPL --sizing percent --percent 90 --commission 0:0.001,10000:0.0005 --slippage fixed --slippage-value 0.0005
+#   python tradewhiz_cli.py AAPL --strategy sma_cross --strategy rsi_reversion:period=14,lower=25 --strategy macd --engine fast
+#   python tradewhiz_cli.py AAPL MSFT --engine fast --trades-dir trades --trades-format parquet
+#   python tradewhiz_cli.py AAPL --engine fast --monte-carlo 10000 --mc-method trades --report-dir reports
+#   python tradewhiz_cli.py SPY --interval 1h --base-interval 1m --short-sma 10 --long-sma 40 --engine fast
+#   python tradewhiz_cli.py AAPL MSFT GOOGL --portfolio --weights AAPL:2 --engine fast
+#   python tradewhiz_cli.py --screen --universe sp500.txt --short-sma 50 --long-sma 200 --sort-by bars_since_cross --output screen.csv
+#   python tradewhiz_cli.py --jobs jobs.csv --store results.db    (repeated jobs come from the store)
+#   python tradewhiz_cli.py --store results.db --list-runs AAPL
+
+JOB_FIELDS = ["ticker", "start_date", "end_date", "interval", "strategy", "short_sma", "long_sma", "starting_cash", "engine"]
+RESULT_FIELDS = JOB_FIELDS + ["execution", "portfolio_value", "sharpe_ratio", "sortino_ratio", "calmar_ratio", "max_drawdown", "trades",
+                              "win_rate", "bars", "cached", "status"]
+# Monte Carlo confidence intervals, only in the results of runs with --monte-carlo
+MONTE_CARLO_FIELDS = ["mc_final_value_low", "mc_final_value_high", "mc_sharpe_low", "mc_sharpe_high",
+                      "mc_max_drawdown_low", "mc_max_drawdown_high", "mc_loss_probability"]
+PREFETCH_FIELDS = ["start_date", "end_date", "interval"] + STATUS_COLUMNS
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run TradeWhiz backtests without the GUI.")
+    parser.add_argument("tickers", nargs="*", help="Stock tickers to backtest")
+    parser.add_argument("--universe", help="File with more tickers: one per line, or a CSV file with a ticker or symbol column")
+    parser.add_argument("--jobs", help="JSON or CSV file with one backtest per entry/row (columns: %s)" % ", ".join(JOB_FIELDS))
+    parser.add_argument("--start", default="2010-01-01", help="Start date (yyyy-mm-dd)")
+    parser.add_argument("--end", default=None, help="End date (yyyy-mm-dd), defaults to today")
+    parser.add_argument("--interval", choices=list(INTERVALS), default="1d", help="Bar interval")
+    parser.add_argument("--base-interval", choices=list(INTERVALS),
+                        help="Build the bars by resampling the cached bars of this shorter interval instead of downloading them")
+    parser.add_argument("--strategy", action="append",
+                        help="Strategy with optional parameters, e.g. rsi_reversion:period=14,lower=25; repeat to run several "
+                             "strategies per ticker (available: %s; default sma_cross with --short-sma/--long-sma)" % ", ".join(STRATEGIES))
+    parser.add_argument("--short-sma", type=int, default=50, help="Short SMA period")
+    parser.add_argument("--long-sma", type=int, default=200, help="Long SMA period")
+    parser.add_argument("--cash", type=float, default=100000, help="Starting cash ($)")
+    parser.add_argument("--engine", choices=["cerebro", "fast"], default="cerebro", help="Backtest engine")
+    parser.add_argument("--sizing", choices=SIZINGS, default="fixed",
+                        help="Position sizing: a fixed number of shares, a percentage of equity or a volatility target")
+    parser.add_argument("--stake", type=int, default=STAKE, help="Shares per trade with fixed sizing")
+    parser.add_argument("--percent", type=float, default=95.0, help="Percent of equity per trade with percent sizing")
+    parser.add_argument("--target-volatility", type=float, default=0.15, help="Annualized volatility target, e.g. 0.15")
+    parser.add_argument("--volatility-window", type=int, default=20, help="Bars of returns for the realized volatility")
+    parser.add_argument("--commission", default=str(COMMISSION),
+                        help="Commission rate, or rates by order value, e.g. 0:0.001,10000:0.0008,100000:0.0005")
+    parser.add_argument("--slippage", choices=SLIPPAGES, default="none", help="Slippage model")
+    parser.add_argument("--slippage-value", type=float, default=0.0,
+                        help="Fixed slippage as a fraction of the price, or the factor on the order's share of the bar volume")
+    parser.add_argument("--fill", choices=FILLS, default="next_open", help="Fill orders at the next open or at the signal bar's close")
+    parser.add_argument("--monte-carlo", type=int, default=0, metavar="PATHS",
+                        help="Resample each run's returns into this many paths and add 90%% confidence intervals (e.g. 10000)")
+    parser.add_argument("--mc-method", choices=list(MONTE_CARLO_METHODS), default="block",
+                        help="Monte Carlo resampling: block bootstrap of bar returns, or whole trades")
+    parser.add_argument("--block-size", type=int, default=20, help="Bars per block of the Monte Carlo block bootstrap")
+    parser.add_argument("--offline", action="store_true", help="Use cached price data only")
+    parser.add_argument("--prefetch", action="store_true",
+                        help="Only download the tickers' price data into the cache and write the status of every ticker")
+    parser.add_argument("--source", help="Directory of <TICKER>.csv files or URL template (with {symbol}, {start}, {end}, "
+                                         "{interval}) to download from instead of Yahoo Finance")
+    parser.add_argument("--batch-size", type=int, help="Tickers per download request (default 50 for Yahoo Finance)")
+    parser.add_argument("--retries", type=int, default=3, help="Retries of failed downloads, with exponential backoff")
+    parser.add_argument("--download-workers", type=int, default=4, help="Download requests in flight at once")
+    parser.add_argument("--screen", action="store_true",
+                        help="Screen the tickers by their SMA crossover state (--short-sma/--long-sma) instead of backtesting them")
+    parser.add_argument("--lookback", type=int, default=252, help="Bars of the trailing backtest of --screen")
+    parser.add_argument("--sort-by", choices=SCREEN_COLUMNS, help="Sort the --screen results by this column (ascending)")
+    parser.add_argument("--descending", action="store_true", help="Sort --screen results in descending order")
+    parser.add_argument("--portfolio", action="store_true", help="Run the tickers as one portfolio sharing the starting cash")
+    parser.add_argument("--weights", default="", help="Portfolio cash weights, e.g. AAPL:2,MSFT:1 (default equal)")
+    parser.add_argument("--equity", help="With --portfolio, also write the aggregate equity curve to this CSV file")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--trades-dir", help="Also write the trades of each successful backtest into this directory")
+    parser.add_argument("--trades-format", choices=["csv", "parquet"], default="csv", help="File format of --trades-dir")
+    parser.add_argument("--report-dir", help="Also write a PDF report per successful backtest into this directory")
+    parser.add_argument("--store", help="SQLite result store; finished runs are saved and repeated runs are read from it")
+    parser.add_argument("--list-runs", action="store_true", help="List the runs in --store (optionally only the given tickers)")
+    parser.add_argument("--output", help="Output file (.json or .csv), defaults to JSON on stdout")
+    return parser.parse_args(argv)
+
+# Read jobs from a JSON list or a CSV file; missing fields fall back to the command line values
+def load_jobs(path, defaults):
+    with open(path, "r", newline="") as f:
+        if path.lower().endswith(".json"):
+            entries = json.load(f)
+        else:
+            entries = list(csv.DictReader(f))
+
+    jobs = []
+    for entry in entries:
+        job = dict(defaults)
+        job.update({key: value for key, value in entry.items() if key in JOB_FIELDS and value not in (None, "")})
+        jobs.append(normalize_job(job))
+    return jobs
+
+def normalize_job(job):
+    job["ticker"] = str(job["ticker"]).strip().upper()
+    if job["interval"] not in INTERVALS:
+        raise ValueError(f"Unknown interval: {job['interval']}")
+    job["short_sma"] = int(job["short_sma"])
+    job["long_sma"] = int(job["long_sma"])
+    job["starting_cash"] = float(job["starting_cash"])
+    job["strategy"] = job_strategy(job).key()
+    return job
+
+# Strategy of a job: the given key, or the SMA crossover of the job's periods. A bare
+# "sma_cross" also takes the job's periods; the SMA periods of other strategies are cleared.
+def job_strategy(job):
+    text = str(job.get("strategy") or "sma_cross").strip()
+    if text == "sma_cross":
+        return SMACrossover(job["short_sma"], job["long_sma"])
+    strategy = parse_strategy(text)
+    if isinstance(strategy, SMACrossover):
+        job["short_sma"], job["long_sma"] = strategy["short"], strategy["long"]
+    else:
+        job["short_sma"] = job["long_sma"] = None
+    return strategy
+
+# Metrics can be NaN (e.g. no trades or failed tickers), which is not valid JSON
+def _number(value):
+    return None if value is None or np.isnan(value) else float(value)
+
+def execution_model(args):
+    return ExecutionModel(
+        args.sizing, args.stake, args.percent, args.target_volatility, args.volatility_window,
+        commission=args.commission, slippage=args.slippage, slippage_value=args.slippage_value, fill=args.fill
+    )
+
+# monte_carlo_options: keyword arguments of monte_carlo() (paths, method, block_size, max_workers), or None
+# trades_dir: optional directory for a CSV or Parquet file (trades_format) of the job's trades
+def run_job(job, offline=False, report_dir=None, store_path=None, base_interval=None, execution=None, monte_carlo_options=None,
+            trades_dir=None, trades_format="csv"):
+    execution = execution or ExecutionModel()
+    result = dict(job, execution=execution.key(), cached=False)
+    ledger = TradeLedger()
+    try:
+        strategy = parse_strategy(job["strategy"])
+        arguments = (job["ticker"], job["start_date"], job["end_date"], job["short_sma"] or 0, job["long_sma"] or 0,
+                     job["starting_cash"], job["engine"], offline)
+        options = dict(interval=job["interval"], base_interval=base_interval, execution=execution, strategy=strategy, ledger=ledger)
+        if store_path:
+            (portfolio_value, sharpe_ratio, max_drawdown, equity_curve, price_data), result["cached"] = memoized_backtest(
+                ResultStore(store_path), *arguments, **options
+            )
+        else:
+            portfolio_value, sharpe_ratio, max_drawdown, equity_curve, price_data = backtest(*arguments, **options)
+    except Exception as e:
+        result.update(portfolio_value=None, sharpe_ratio=None, max_drawdown=None, bars=0, status=f"failed: {e}")
+        return result
+
+    if portfolio_value is None:
+        result.update(portfolio_value=None, sharpe_ratio=None, max_drawdown=None, bars=0, status="failed: not enough data")
+    else:
+        trades = ledger.trades(price_data["close"], price_data.index)
+        result.update(
+            trades=len(trades), win_rate=_number(trade_summary(trades)["win_rate"]),
+            portfolio_value=float(portfolio_value), sharpe_ratio=_number(sharpe_ratio),
+            sortino_ratio=_number(sortino_ratio(equity_curve, periods_per_year(job["interval"]))),
+            calmar_ratio=_number(calmar_ratio(equity_curve, periods_per_year(job["interval"]))),
+            max_drawdown=float(max_drawdown), bars=len(price_data), status="ok"
+        )
+        analysis = None
+        if monte_carlo_options:
+            try:
+                analysis = monte_carlo(equity_curve, periods_per_year=periods_per_year(job["interval"]), **monte_carlo_options)
+                summary = analysis["summary"]
+                result.update(
+                    mc_final_value_low=float(summary.at["final_value", "lower"]), mc_final_value_high=float(summary.at["final_value", "upper"]),
+                    mc_sharpe_low=_number(summary.at["sharpe_ratio", "lower"]), mc_sharpe_high=_number(summary.at["sharpe_ratio", "upper"]),
+                    mc_max_drawdown_low=float(summary.at["max_drawdown", "lower"]), mc_max_drawdown_high=float(summary.at["max_drawdown", "upper"]),
+                    mc_loss_probability=analysis["loss_probability"]
+                )
+            except ValueError as e:
+                result["status"] = f"monte carlo failed: {e}"
+        if trades_dir:
+            try:
+                os.makedirs(trades_dir, exist_ok=True)
+                export_trades(trades, os.path.join(trades_dir, f"{file_stem(result, strategy)}_trades.{trades_format}"))
+            except (ImportError, OSError) as e:
+                result["status"] = f"trades export failed: {e}"
+        if report_dir:
+            try:
+                write_report(result, equity_curve, price_data, report_dir, execution, strategy, analysis, trades)
+            except Exception as e:
+                result["status"] = f"report failed: {e}"
+    return result
+
+def file_stem(result, strategy):
+    return f"{result['ticker']}_{result['start_date']}_{result['end_date']}_{result['interval']}_{strategy.tag}"
+
+# PDF report for one job; reportlab and matplotlib are only imported when reports are requested
+def write_report(result, equity_curve, price_data, report_dir, execution, strategy, analysis=None, trades=None):
+    from tradewhiz_report import build_report
+
+    os.makedirs(report_dir, exist_ok=True)
+    build_report(os.path.join(report_dir, f"{file_stem(result, strategy)}.pdf"), {
+        "parameters": [
+            ("Stock Ticker", result["ticker"]),
+            ("Start Date", result["start_date"]),
+            ("End Date", result["end_date"]),
+            ("Interval", result["interval"]),
+            ("Strategy", strategy.describe()),
+            ("Starting Cash ($)", f"${result['starting_cash']:,.2f}"),
+            ("Engine", result["engine"]),
+            ("Execution", execution.describe()),
+        ],
+        "results": [
+            (name, "N/A" if result[key] is None else fmt.format(result[key]))
+            for name, key, fmt in [
+                ("Portfolio Value ($)", "portfolio_value", "${:,.2f}"),
+                ("Sharpe Ratio", "sharpe_ratio", "{:.2f}"),
+                ("Sortino Ratio", "sortino_ratio", "{:.2f}"),
+                ("Calmar Ratio", "calmar_ratio", "{:.2f}"),
+                ("Max Drawdown", "max_drawdown", "{:.2%}"),
+            ]
+        ],
+        "equity_curve": equity_curve,
+        "price_data": price_data,
+        "monte_carlo": analysis,
+        "trades": trades,
+    })
+
+def write_results(results, output, fields=RESULT_FIELDS):
+    if output and output.lower().endswith(".csv"):
+        with open(output, "w", newline="") as f:
+            extra = [field for field in MONTE_CARLO_FIELDS if any(field in result for result in results)]
+            writer = csv.DictWriter(f, fieldnames=fields + extra)
+            writer.writeheader()
+            writer.writerows(results)
+    elif output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=4)
+    else:
+        json.dump(results, sys.stdout, indent=4)
+        sys.stdout.write("\n")
+
+# Download the tickers of the jobs into the price cache, one prefetch per date range and
+# interval; returns a status row per ticker and range (PREFETCH_FIELDS)
+def prefetch_jobs(jobs, args):
+    groups = {}
+    for job in jobs:
+        groups.setdefault(download_key(job, args)[1:], []).append(job["ticker"])
+    rows = []
+    for (start_date, end_date, interval), tickers in groups.items():
+        prefetcher = Prefetcher(
+            make_source(args.source), interval, batch_size=args.batch_size, max_workers=args.download_workers,
+            retries=args.retries
+        )
+        status = prefetcher.prefetch(tickers, start_date, end_date)
+        print(f"Prefetched {interval} bars from {start_date} to {end_date}: {describe_prefetch(status)}", file=sys.stderr)
+        rows += [dict(row, start_date=start_date, end_date=end_date, interval=interval) for row in status.to_dict("records")]
+    return rows
+
+# The price data a job reads: ticker, date range and the interval downloaded
+def download_key(job, args):
+    return job["ticker"], job["start_date"], job["end_date"], args.base_interval or job["interval"]
+
+# Screen all tickers at once (tradewhiz_screener); the missing bars are prefetched first
+def run_screen(args, defaults):
+    prefetcher = None if args.offline else Prefetcher(
+        make_source(args.source), args.base_interval or args.interval, batch_size=args.batch_size,
+        max_workers=args.download_workers, retries=args.retries
+    )
+    result = screen_universe(
+        args.tickers, defaults["start_date"], defaults["end_date"], args.short_sma, args.long_sma, args.lookback, args.interval,
+        args.base_interval, args.offline, prefetcher
+    )
+    if args.sort_by:
+        result = result.sort_values(args.sort_by, ascending=not args.descending, kind="stable")
+    return result
+
+# Run all tickers as one portfolio; the last row holds the aggregate metrics.
+# defaults: the normalized job of the portfolio; weights: {ticker: weight} from parse_weights
+def run_portfolio(args, stock_symbols, defaults, weights, execution):
+    # Tickers that fail to download fail in the summary, reading the cache
+    if not args.offline:
+        prefetch_jobs([dict(defaults, ticker=symbol) for symbol in stock_symbols], args)
+    summary, portfolio_equity = portfolio_backtest(
+        stock_symbols, defaults["start_date"], defaults["end_date"], defaults["short_sma"] or 0, defaults["long_sma"] or 0,
+        defaults["starting_cash"], weights, defaults["engine"], True,
+        args.workers if args.workers > 1 else None, args.interval, args.base_interval, execution,
+        parse_strategy(defaults["strategy"])
+    )
+    if args.equity and not portfolio_equity.empty:
+        portfolio_equity.rename("portfolio_value").to_csv(args.equity, index_label="date")
+
+    results = []
+    defaults = dict(defaults, execution=execution.key())
+    for row in summary.itertuples(index=False):
+        results.append(dict(
+            defaults, ticker=row.ticker, starting_cash=row.allocation,
+            portfolio_value=_number(row.portfolio_value), sharpe_ratio=_number(row.sharpe_ratio),
+            max_drawdown=_number(row.max_drawdown),
+            bars=None, status=row.status
+        ))
+
+    equity_curve = portfolio_equity.to_numpy()
+    ok = len(equity_curve) > 0
+    periods = periods_per_year(args.interval)
+    results.append(dict(
+        defaults, ticker="PORTFOLIO",
+        portfolio_value=float(equity_curve[-1]) if ok else None,
+        sharpe_ratio=_number(calculate_sharpe_ratio(equity_curve, periods_per_year=periods)) if ok else None,
+        sortino_ratio=_number(sortino_ratio(equity_curve, periods)) if ok else None,
+        calmar_ratio=_number(calmar_ratio(equity_curve, periods)) if ok else None,
+        max_drawdown=float(calculate_max_drawdown(equity_curve)) if ok else None,
+        bars=len(equity_curve), status="ok" if ok else "failed"
+    ))
+    return results
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.universe:
+        try:
+            args.tickers += read_universe(args.universe)
+        except OSError as e:
+            print(f"Cannot read the universe: {e}", file=sys.stderr)
+            return 2
+    defaults = {
+        "start_date": args.start,
+        "end_date": args.end or datetime.date.today().isoformat(),
+        "interval": args.interval,
+        "short_sma": args.short_sma,
+        "long_sma": args.long_sma,
+        "starting_cash": args.cash,
+        "engine": args.engine,
+    }
+
+    if args.list_runs:
+        if not args.store:
+            print("--list-runs needs --store.", file=sys.stderr)
+            return 2
+        store = ResultStore(args.store)
+        runs = store.runs()
+        if args.tickers:
+            runs = runs[runs["ticker"].isin([ticker.strip().upper() for ticker in args.tickers])]
+        runs = runs.astype(object).where(runs.notna(), None)
+        json.dump(runs.to_dict("records"), sys.stdout, indent=4)
+        sys.stdout.write("\n")
+        return 0
+
+    if args.screen:
+        if not args.tickers:
+            print("--screen needs tickers or --universe.", file=sys.stderr)
+            return 2
+        if args.short_sma < 1 or args.long_sma < 1 or args.lookback < 1:
+            print("--short-sma, --long-sma and --lookback must be at least 1.", file=sys.stderr)
+            return 2
+        try:
+            result = run_screen(args, defaults)
+        except ValueError as e:
+            print(f"Invalid screen: {e}", file=sys.stderr)
+            return 2
+        write_results(to_records(result), args.output, SCREEN_COLUMNS)
+        return 0 if (result["status"] == "ok").any() else 1
+
+    try:
+        execution = execution_model(args)
+    except ValueError as e:
+        print(f"Invalid execution settings: {e}", file=sys.stderr)
+        return 2
+
+    if args.portfolio:
+        if not args.tickers:
+            print("--portfolio needs one or more tickers.", file=sys.stderr)
+            return 2
+        stock_symbols = list(dict.fromkeys(ticker.strip().upper() for ticker in args.tickers))
+        try:
+            portfolio = normalize_job(dict(defaults, ticker="PORTFOLIO", strategy=(args.strategy or [""])[0]))
+            weights = parse_weights(stock_symbols, args.weights)
+        except ValueError as e:
+            print(f"Invalid portfolio: {e}", file=sys.stderr)
+            return 2
+        results = run_portfolio(args, stock_symbols, portfolio, weights, execution)
+        write_results(results, args.output)
+        return 0 if all(result["status"] == "ok" for result in results) else 1
+
+    try:
+        jobs = load_jobs(args.jobs, defaults) if args.jobs else []
+        # Each ticker runs every strategy; runs of one ticker share its indicators
+        jobs += [
+            normalize_job(dict(defaults, ticker=ticker, strategy=strategy))
+            for ticker in args.tickers for strategy in args.strategy or [""]
+        ]
+    except ValueError as e:
+        print(f"Invalid job: {e}", file=sys.stderr)
+        return 2
+    if not jobs:
+        print("No tickers or job file given.", file=sys.stderr)
+        return 2
+
+    if args.prefetch:
+        rows = prefetch_jobs(jobs, args)
+        write_results(rows, args.output, PREFETCH_FIELDS)
+        return 0 if all(row["status"] != "failed" for row in rows) else 1
+    # Download what the jobs need in batches first, then run them on the cache. Jobs
+    # whose ticker failed to download fail with the download error.
+    failed = {}
+    if not args.offline:
+        failed = {
+            (row["symbol"], row["start_date"], row["end_date"], row["interval"]): row["error"]
+            for row in prefetch_jobs(jobs, args) if row["status"] == "failed"
+        }
+
+    if args.monte_carlo and (args.monte_carlo < 100 or args.block_size < 1):
+        print("--monte-carlo needs at least 100 paths and --block-size at least 1 bar.", file=sys.stderr)
+        return 2
+    # With several job workers, each job's simulation runs in its own worker
+    monte_carlo_options = dict(
+        paths=args.monte_carlo, method=args.mc_method, block_size=args.block_size, max_workers=1 if args.workers > 1 else None
+    ) if args.monte_carlo else None
+
+    runnable = [job for job in jobs if download_key(job, args) not in failed]
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(
+                run_job, runnable, [True] * len(runnable), [args.report_dir] * len(runnable), [args.store] * len(runnable),
+                [args.base_interval] * len(runnable), [execution] * len(runnable), [monte_carlo_options] * len(runnable),
+                [args.trades_dir] * len(runnable), [args.trades_format] * len(runnable)
+            ))
+    else:
+        results = [
+            run_job(job, True, args.report_dir, args.store, args.base_interval, execution, monte_carlo_options,
+                    args.trades_dir, args.trades_format)
+            for job in runnable
+        ]
+    finished = iter(results)
+    results = []
+    for job in jobs:
+        if download_key(job, args) in failed:
+            results.append(dict(
+                job, execution=execution.key(), cached=False, portfolio_value=None, sharpe_ratio=None, max_drawdown=None, bars=0,
+                status=f"failed: download failed: {failed[download_key(job, args)]}"
+            ))
+        else:
+            results.append(next(finished))
+
+    write_results(results, args.output)
+    return 0 if all(result["status"] == "ok" for result in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,702 @@
+import pandas as pd
+import numpy as np
+import functools
+import importlib
+import json
+import os
+import shutil
+import sys
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import tradewhiz_metrics
+from tradewhiz_execution import COMMISSION, STAKE, ExecutionModel
+from tradewhiz_profile import stage
+from tradewhiz_sources import DownloadError, YahooSource, fetch_yahoo, with_retries
+from tradewhiz_strategies import IndicatorCache, SMACrossover, shared_indicator_cache, state_orders
+
+# Backtest pipeline, data cache and optimizer without any PyQt5 dependency.
+# Used by the TradeWhiz GUI and by tradewhiz_cli.py.
+#
+# yfinance and Backtrader are slow to import, so they are only imported by the
+# functions that need them (the Backtrader strategy lives in tradewhiz_cerebro).
+# warm_imports() loads them ahead of time, e.g. from a background thread.
+
+
+# Supported bar intervals (yfinance names) and their length in seconds
+INTERVALS = {"1m": 60, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600, "1d": 86400}
+ 
+# Rolling SMA over a NumPy array, identical to the pandas columns used by backtest
+def rolling_sma(close, period):
+    return pd.Series(close).rolling(window=period).mean().to_numpy()
+
+# SMA arrays for one close series, computed once per period and shared by every
+# strategy instance (or optimizer task) that runs on that series. A view on the SMAs
+# of an IndicatorCache, so they are shared with the strategies of tradewhiz_strategies.
+class SMACache:
+    def __init__(self, close, indicators=None):
+        self.indicators = indicators if indicators is not None else IndicatorCache(close)
+        self.close = self.indicators.close
+
+    def add(self, period, values):
+        self.indicators.add(values, "sma", period)
+
+    def get(self, period):
+        return self.indicators.get("sma", period)
+
+# The Backtrader classes are still importable from here, loaded on first access
+def __getattr__(name):
+    if name in ("PrecomputedSMA", "SignalStrategy", "SMAStrategy", "make_data_feed"):
+        import tradewhiz_cerebro
+        return getattr(tradewhiz_cerebro, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def warm_imports():
+    for module in ("yfinance", "tradewhiz_cerebro"):
+        importlib.import_module(module)
+
+# Function to calculate Sharpe Ratio (annualized, on the per-bar returns of the equity curve)
+def calculate_sharpe_ratio(equity_curve, risk_free_rate=0, periods_per_year=tradewhiz_metrics.TRADING_DAYS):
+    return tradewhiz_metrics.sharpe_ratio(equity_curve, periods_per_year, risk_free_rate)
+
+# Function to calculate Max Drawdown
+def calculate_max_drawdown(equity_curve):
+    return tradewhiz_metrics.max_drawdown(equity_curve)
+
+# Per-ticker OHLCV cache on disk, one per bar interval. Each ticker is stored column by column, one .npy
+# file per column, plus a small JSON file with the column names and the date range
+# that has been requested from the source, so weekends and holidays at the edges are
+# not fetched again. Only the missing head and tail of a requested range are fetched.
+# Any callable with the signature of fetch_yahoo can be used as the source, e.g. a
+# tradewhiz_sources.CSVSource for offline testing; tradewhiz_prefetch fills the cache
+# for many tickers at once.
+#
+# The columns are memory-mapped when loaded: the DataFrame returned by get() is a
+# read-only view on the files, so a history of millions of minute bars is paged in
+# by the OS as the engine, metrics and charts read it instead of being copied into
+# memory. Each write goes to a new version folder and the JSON file is switched
+# over last, so a crash never leaves a half-written cache and readers that still
+# map the previous version are not affected.
+class PriceCache:
+    def __init__(self, cache_dir=None, source=fetch_yahoo, offline=False, interval="1d"):
+        self.cache_dir = cache_dir or os.path.join(os.getcwd(), "price_cache")
+        self.source = source
+        self.offline = offline
+        self.interval = interval
+
+    # Daily bars keep the plain ticker name, so caches from before intervals still load
+    def _paths(self, stock_symbol):
+        name = stock_symbol.upper() if self.interval == "1d" else f"{stock_symbol.upper()}_{self.interval}"
+        return os.path.join(self.cache_dir, name), os.path.join(self.cache_dir, f"{name}.json")
+
+    def load(self, stock_symbol, convert=True):
+        data_dir, range_path = self._paths(stock_symbol)
+        try:
+            with open(range_path, "r") as f:
+                covered = json.load(f)
+            if "version" not in covered and convert:
+                # Cache written before the columnar format: convert it once
+                try:
+                    legacy_path = data_dir + ".parquet"
+                    self.store(stock_symbol, pd.read_parquet(legacy_path), pd.Timestamp(covered["start"]), pd.Timestamp(covered["end"]))
+                    os.remove(legacy_path)
+                except FileNotFoundError:
+                    pass  # Converted by another process in the meantime
+                return self.load(stock_symbol, convert=False)
+            data = read_columns(os.path.join(data_dir, covered["version"]), covered)
+        except (FileNotFoundError, ValueError, KeyError):
+            return None, None, None
+        return data, pd.Timestamp(covered["start"]), pd.Timestamp(covered["end"])
+
+    # One cached column as arrays, without building a DataFrame, e.g. to read the closes
+    # of thousands of tickers: (timestamps as UTC datetime64[ns], values, time zone or
+    # None), or None if the ticker or column is not cached
+    def load_column(self, stock_symbol, column):
+        data_dir, range_path = self._paths(stock_symbol)
+        try:
+            with open(range_path, "r") as f:
+                meta = json.load(f)
+            if "version" not in meta:
+                # Cache written before the columnar format: convert it, then read again
+                if self.load(stock_symbol)[0] is None:
+                    return None
+                return self.load_column(stock_symbol, column)
+            directory = os.path.join(data_dir, meta["version"])
+            index = np.load(os.path.join(directory, "index.npy"))
+            values = np.load(os.path.join(directory, f"{meta['columns'].index(column)}.npy"))
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+        if len(index) != meta["rows"] or len(values) != meta["rows"]:
+            return None
+        return index, values, meta["tz"]
+
+    def store(self, stock_symbol, data, covered_start, covered_end):
+        data_dir, range_path = self._paths(stock_symbol)
+        previous = None
+        try:
+            with open(range_path, "r") as f:
+                previous = json.load(f).get("version")
+        except (FileNotFoundError, ValueError):
+            pass
+
+        version = uuid.uuid4().hex[:12]
+        meta = write_columns(os.path.join(data_dir, version), data)
+        meta.update(start=covered_start.strftime("%Y-%m-%d"), end=covered_end.strftime("%Y-%m-%d"), version=version)
+        with open(range_path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(range_path + ".tmp", range_path)
+        if previous:
+            # Fails on Windows while the old version is still mapped; it is then left behind
+            shutil.rmtree(os.path.join(data_dir, previous), ignore_errors=True)
+
+    # Ranges of a request missing from the cache, and the covered range once they are
+    # fetched; covered_start and covered_end are None when nothing is cached
+    def missing_ranges(self, start, end, covered_start, covered_end):
+        # Today's bar is still forming, so the covered range never extends past today
+        fetch_end = min(end, pd.Timestamp.today().normalize())
+        if covered_start is None:
+            return [(start, end)], start, fetch_end
+        # Keep the covered range contiguous by filling any gap up to the request
+        missing = []
+        if start < covered_start:
+            missing.append((start, covered_start))
+        if end > covered_end:
+            missing.append((covered_end, end))
+        return missing, min(start, covered_start), max(fetch_end, covered_end)
+
+    # Merge fetched frames into the cached data (None if nothing is cached) and store
+    # the result with its new covered range; returns the merged data
+    def merge(self, stock_symbol, data, fetched, covered_start, covered_end):
+        frames = [frame for frame in [data, *fetched] if frame is not None and len(frame)]
+        if not frames:
+            return data
+        data = pd.concat(frames)
+        data = data[~data.index.duplicated(keep="last")].sort_index()
+        self.store(stock_symbol, data, covered_start, covered_end)
+        return data
+
+    def get(self, stock_symbol, start_date, end_date):
+        start = pd.Timestamp(start_date)
+        end = pd.Timestamp(end_date)
+        data, covered_start, covered_end = self.load(stock_symbol)
+
+        if not self.offline:
+            missing, covered_start, covered_end = self.missing_ranges(start, end, covered_start, covered_end)
+            if missing:
+                try:
+                    fetched = [
+                        self.source(stock_symbol, fetch_start.strftime("%Y-%m-%d"), fetch_stop.strftime("%Y-%m-%d"))
+                        for fetch_start, fetch_stop in missing
+                    ]
+                except Exception as e:
+                    if data is None:
+                        raise
+                    # Serve the cached bars; the missing ranges are fetched again next time
+                    print(f"Failed to update {stock_symbol}, using the cached data: {e}", file=sys.stderr)
+                else:
+                    data = self.merge(stock_symbol, data, fetched, covered_start, covered_end)
+
+        if data is None:
+            return pd.DataFrame(columns=["open", "high", "low", "close", "volume"])
+
+        # Serve the requested range; yfinance treats the end date as exclusive. The index
+        # is sorted, so the range is a slice and the memory-mapped columns are not copied.
+        if data.index.tz is not None:
+            start = start.tz_localize(data.index.tz)
+            end = end.tz_localize(data.index.tz)
+        return data.iloc[data.index.searchsorted(start):data.index.searchsorted(end)]
+
+# Write the numeric columns of data as one .npy file each, with the index as UTC
+# nanoseconds; returns the metadata read_columns needs
+def write_columns(directory, data):
+    os.makedirs(directory, exist_ok=True)
+    index = pd.DatetimeIndex(data.index)
+    tz = str(index.tz) if index.tz is not None else None
+    if tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    np.save(os.path.join(directory, "index.npy"), index.as_unit("ns").to_numpy())
+    columns = [column for column in data.columns if np.issubdtype(data[column].dtype, np.number)]
+    # Files are numbered, since column names such as "Close" and "close" may only differ in case
+    for number, column in enumerate(columns):
+        np.save(os.path.join(directory, f"{number}.npy"), np.ascontiguousarray(data[column].to_numpy()))
+    return {"columns": [str(column) for column in columns], "rows": len(data), "tz": tz, "index_name": data.index.name}
+
+# Memory-mapped DataFrame over the files of write_columns
+def read_columns(directory, meta):
+    index = np.load(os.path.join(directory, "index.npy"), mmap_mode="r")
+    columns = {
+        column: np.load(os.path.join(directory, f"{number}.npy"), mmap_mode="r")
+        for number, column in enumerate(meta["columns"])
+    }
+    if any(len(values) != meta["rows"] for values in [index, *columns.values()]):
+        raise ValueError(f"Incomplete price cache in {directory}")
+    index = pd.DatetimeIndex(index, name=meta["index_name"], copy=False)
+    if meta["tz"] is not None:
+        index = index.tz_localize("UTC").tz_convert(meta["tz"])
+    return pd.DataFrame(columns, index=index, copy=False)
+
+# Bars from the cache, with the missing ranges downloaded from Yahoo Finance (retried
+# with backoff); raises DownloadError if there are none, instead of an empty DataFrame
+def download_data(stock_symbol, start_date, end_date, offline=False, interval="1d"):
+    source = with_retries(functools.partial(YahooSource(), interval=interval))
+    data = PriceCache(source=source, offline=offline, interval=interval).get(stock_symbol, start_date, end_date)
+    if len(data) == 0:
+        where = " in the cache" if offline else ""
+        raise DownloadError(f"No {interval} price data for {stock_symbol} from {start_date} to {end_date}{where}")
+    return data
+
+# Build bars of a longer interval from shorter ones: first open, highest high, lowest
+# low, summed volume and last close (any other column also takes its last value).
+# Intraday bars are grouped by clock time (computed on UTC nanoseconds, so daylight
+# saving changes need no special case) and labelled with the start of their period;
+# daily bars are grouped by exchange-local date and get a plain date index, like
+# downloaded daily bars. Periods without any bar are left out. Every column is
+# aggregated with one ufunc.reduceat pass over its array, which keeps this fast on
+# millions of minute bars.
+RESAMPLE_FIRST = ("open",)
+RESAMPLE_REDUCE = {"high": np.fmax, "low": np.fmin, "volume": np.add}
+
+def resample_bars(data, interval):
+    if len(data) == 0:
+        return data
+    index = pd.DatetimeIndex(data.index)
+    daily = INTERVALS[interval] >= INTERVALS["1d"]
+    if daily:
+        dates = (index.tz_localize(None) if index.tz is not None else index).normalize()
+        keys = dates.as_unit("ns").asi8
+    else:
+        step = INTERVALS[interval] * 10 ** 9
+        keys = index.as_unit("ns").asi8 // step * step
+
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    ends = np.append(starts[1:], len(keys)) - 1
+    columns = {}
+    for column in data.columns:
+        values = data[column].to_numpy()
+        if column in RESAMPLE_REDUCE:
+            if column == "volume":
+                values = np.nan_to_num(values)
+            columns[column] = RESAMPLE_REDUCE[column].reduceat(values, starts)
+        elif column in RESAMPLE_FIRST:
+            columns[column] = values[starts]
+        else:
+            columns[column] = values[ends]
+
+    if daily:
+        labels = pd.DatetimeIndex(dates[starts], name=index.name)
+    else:
+        labels = pd.DatetimeIndex(keys[starts].view("datetime64[ns]"), name=index.name)
+        if index.tz is not None:
+            labels = labels.tz_localize("UTC").tz_convert(index.tz)
+    return pd.DataFrame(columns, index=labels)
+
+# Bars of the given interval: downloaded (or read from the cache) directly, or, with
+# base_interval, resampled from the cache of a shorter interval
+def load_bars(stock_symbol, start_date, end_date, offline=False, interval="1d", base_interval=None, profile=None):
+    if base_interval in (None, interval):
+        with stage(profile, "download"):
+            return download_data(stock_symbol, start_date, end_date, offline, interval)
+    if INTERVALS[interval] <= INTERVALS[base_interval] or INTERVALS[interval] % INTERVALS[base_interval]:
+        raise ValueError(f"Cannot build {interval} bars from {base_interval} bars.")
+    with stage(profile, "download"):
+        data = download_data(stock_symbol, start_date, end_date, offline, base_interval)
+    with stage(profile, "resample"):
+        return resample_bars(data, interval)
+
+# Fast engine: the same SMA crossover as SMAStrategy, computed over whole arrays.
+# Orders are decided on a bar's close and filled at the next bar's open, exactly as
+# Cerebro does with market orders, so the equity curve starts at the first bar where
+# both SMAs are defined. A buy the cash does not cover is not placed, see equity_from_orders.
+def fast_sma_equity(open_, close, short_sma, long_sma, start, starting_cash, commission=COMMISSION, stake=STAKE):
+    return equity_from_orders(open_, close, sma_orders(short_sma, long_sma, start), start, starting_cash, commission, stake)
+
+# Orders per bar: +1 to buy, -1 to sell, 0 otherwise
+def sma_orders(short_sma, long_sma, start):
+    # Desired state per bar: 1 = long, 0 = flat, carried forward while the SMAs are equal
+    signal = np.where(short_sma > long_sma, 1.0, np.where(short_sma < long_sma, 0.0, np.nan))
+    return state_orders(signal, start)
+
+def equity_from_orders(open_, close, orders, start, starting_cash, commission=COMMISSION, stake=STAKE):
+    n = len(close)
+
+    # Order on bar t fills at open of bar t + 1; an order on the last bar never fills
+    fills = np.zeros(n)
+    fills[1:] = orders[:-1] * stake
+    position = np.cumsum(fills)
+    cash = starting_cash + np.cumsum(-fills * open_ - np.abs(fills) * open_ * commission)
+
+    # The broker rejects a buy that costs more than the cash, at the signal close or at
+    # the fill; then the fills depend on the cash of each trade, see ExecutionModel.fills
+    buys = np.flatnonzero(fills > 0)
+    cost = stake * np.maximum(open_[buys], close[buys - 1]) * (1.0 + commission)
+    if np.any(cost > cash[buys - 1]):
+        execution = ExecutionModel(stake=stake, commission=commission)
+        return execution.equity_curve(orders, start, starting_cash, open_, close, close, close)
+
+    return (cash + position * close)[start:]
+
+# execution: optional tradewhiz_execution.ExecutionModel; without one (or with the
+# default model) the fixed stake and commission are applied
+def run_fast_sma(data, short_sma_period, long_sma_period, starting_cash, commission=COMMISSION, stake=STAKE, profile=None,
+                 execution=None, periods_per_year=tradewhiz_metrics.TRADING_DAYS):
+    start = max(short_sma_period, long_sma_period) - 1
+    orders = sma_orders(data["short_sma"].to_numpy(dtype=float), data["long_sma"].to_numpy(dtype=float), start)
+    return run_fast_orders(data, orders, start, starting_cash, commission, stake, profile, execution, periods_per_year)
+
+# Fast engine for any tradewhiz_strategies strategy, on the indicators of the data's close
+def run_fast_strategy(data, strategy, indicators, starting_cash, profile=None, execution=None,
+                      periods_per_year=tradewhiz_metrics.TRADING_DAYS, ledger=None):
+    orders = strategy.orders(indicators)
+    return run_fast_orders(data, orders, strategy.start, starting_cash, profile=profile, execution=execution,
+                           periods_per_year=periods_per_year, ledger=ledger)
+
+# ledger: optional tradewhiz_ledger.TradeLedger, filled with the fills of the orders
+def run_fast_orders(data, orders, start, starting_cash, commission=COMMISSION, stake=STAKE, profile=None, execution=None,
+                    periods_per_year=tradewhiz_metrics.TRADING_DAYS, ledger=None):
+    if execution is None or execution.is_default:
+        equity_curve = equity_from_orders(
+            data["open"].to_numpy(dtype=float), data["close"].to_numpy(dtype=float), orders, start, starting_cash, commission, stake
+        )
+    else:
+        equity_curve = execution.equity_curve(orders, start, starting_cash, *bar_arrays(data), periods_per_year)
+    if ledger is not None:
+        model = execution or ExecutionModel(stake=stake, commission=commission)
+        ledger.extend(*model.fills(orders, starting_cash, *bar_arrays(data), periods_per_year))
+    if profile is not None:
+        profile.count("orders", np.count_nonzero(orders))
+    portfolio_value = equity_curve[-1] if len(equity_curve) else starting_cash
+    return portfolio_value, equity_curve
+
+# open, high, low, close and volume as float arrays; missing high/low fall back to the
+# close (no slippage cap) and a missing volume to None
+def bar_arrays(data):
+    close = data["close"].to_numpy(dtype=float)
+    column = lambda name: data[name].to_numpy(dtype=float) if name in data.columns else None
+    high, low = column("high"), column("low")
+    return (column("open"), high if high is not None else close, low if low is not None else close, close, column("volume"))
+
+# Grid optimizer: every worker process receives the price arrays (and the execution
+# model, if any) once through the pool initializer and then evaluates all long periods
+# for one short period per task. The Sharpe ratio and volatility sizing are annualized
+# for the bar interval.
+_optimizer_prices = {}
+
+def _init_optimizer_worker(bars, execution=None, periods_per_year=tradewhiz_metrics.TRADING_DAYS):
+    _optimizer_prices["bars"] = bars
+    _optimizer_prices["execution"] = execution
+    _optimizer_prices["periods_per_year"] = periods_per_year
+    _optimizer_prices["sma"] = SMACache(bars[3])
+
+def _evaluate_short_period(short_sma_period, long_sma_periods, starting_cash):
+    bars = _optimizer_prices["bars"]
+    open_, close = bars[0], bars[3]
+    execution = _optimizer_prices["execution"]
+    periods = _optimizer_prices["periods_per_year"]
+    sma_cache = _optimizer_prices["sma"]
+    rows = []
+    for long_sma_period in long_sma_periods:
+        short_sma, long_sma, start = sma_cache.get(short_sma_period), sma_cache.get(long_sma_period), long_sma_period - 1
+        if execution is None or execution.is_default:
+            equity_curve = fast_sma_equity(open_, close, short_sma, long_sma, start, starting_cash)
+        else:
+            equity_curve = execution.equity_curve(sma_orders(short_sma, long_sma, start), start, starting_cash, *bars, periods)
+        rows.append((
+            short_sma_period, long_sma_period, equity_curve[-1],
+            calculate_sharpe_ratio(equity_curve, periods_per_year=periods), calculate_max_drawdown(equity_curve)
+        ))
+    return rows
+
+# interval: bar interval of the data, for the annualization
+def optimize_sma_grid(data, short_sma_periods, long_sma_periods, starting_cash, max_workers=None, execution=None, interval="1d"):
+    bars = bar_arrays(data)
+    close = bars[3]
+    long_sma_periods = [p for p in long_sma_periods if p <= len(close)]
+    tasks = [
+        (short_sma_period, [p for p in long_sma_periods if p > short_sma_period])
+        for short_sma_period in short_sma_periods
+    ]
+    tasks = [task for task in tasks if task[1]]
+
+    rows = []
+    initargs = (bars, execution, tradewhiz_metrics.periods_per_year(interval))
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_optimizer_worker, initargs=initargs) as pool:
+        futures = [pool.submit(_evaluate_short_period, short, longs, starting_cash) for short, longs in tasks]
+        for future in futures:
+            rows.extend(future.result())
+
+    results = pd.DataFrame(rows, columns=["short_sma", "long_sma", "portfolio_value", "sharpe_ratio", "max_drawdown"])
+    return results.sort_values("portfolio_value", ascending=False, ignore_index=True)
+
+# Same grid through Backtrader's optstrategy. All runs share one SMACache, so each
+# period is computed once for the whole grid. optstrategy always runs the full
+# product, so pairs with short >= long are run but left out of the results.
+def cerebro_sma_grid(data, short_sma_periods, long_sma_periods, starting_cash, interval="1d"):
+    import backtrader as bt
+    from tradewhiz_cerebro import SMAStrategy, make_data_feed
+
+    sma_cache = SMACache(data["close"])
+    periods = tradewhiz_metrics.periods_per_year(interval)
+
+    cerebro = bt.Cerebro(optreturn=False, maxcpus=1)
+    cerebro.adddata(make_data_feed(data, interval))
+    cerebro.optstrategy(SMAStrategy, short_period=short_sma_periods, long_period=long_sma_periods, sma_cache=[sma_cache])
+    cerebro.broker.set_cash(starting_cash)
+    cerebro.broker.setcommission(commission=COMMISSION)
+    cerebro.addsizer(bt.sizers.FixedSize, stake=STAKE)
+
+    rows = []
+    for run in cerebro.run():
+        strategy = run[0]
+        if strategy.p.long_period <= strategy.p.short_period or not strategy.equity_curve:
+            continue
+        equity_curve = strategy.equity_curve
+        rows.append((
+            strategy.p.short_period, strategy.p.long_period, equity_curve[-1],
+            calculate_sharpe_ratio(equity_curve, periods_per_year=periods), calculate_max_drawdown(equity_curve)
+        ))
+
+    results = pd.DataFrame(rows, columns=["short_sma", "long_sma", "portfolio_value", "sharpe_ratio", "max_drawdown"])
+    return results.sort_values("portfolio_value", ascending=False, ignore_index=True)
+
+# Parse "start, stop, step" into an inclusive list of periods
+def parse_period_range(text):
+    parts = [int(part) for part in text.replace(":", ",").split(",") if part.strip()]
+    if len(parts) == 1:
+        parts = [parts[0], parts[0], 1]
+    elif len(parts) == 2:
+        parts.append(1)
+    start, stop, step = parts
+    if start < 1 or step < 1 or stop < start:
+        raise ValueError(f"Invalid period range: {text}")
+    return list(range(start, stop + 1, step))
+
+# Full backtest pipeline shared by the GUI and the headless runner
+# profile: optional tradewhiz_profile.RunProfile that records the stage timings and counters
+# progress: optional callable taking the fraction done (0..1); it may raise to cancel the run
+# interval: bar interval; base_interval: build the bars from the cache of this shorter interval
+# execution: optional tradewhiz_execution.ExecutionModel, the fixed stake and commission by default
+# strategy: optional tradewhiz_strategies strategy, the SMA crossover of the two periods by default
+# ledger: optional tradewhiz_ledger.TradeLedger that records the run's fills
+def backtest(stock_symbol, start_date, end_date, short_sma_period, long_sma_period, starting_cash, engine="cerebro", offline=False,
+             profile=None, progress=None, interval="1d", base_interval=None, execution=None, strategy=None, ledger=None):
+    # Download data from Yahoo Finance, served from the local cache where possible
+    data = load_bars(stock_symbol, start_date, end_date, offline, interval, base_interval, profile)
+    report_progress(progress, 0.05)
+    return backtest_data(
+        data, short_sma_period, long_sma_period, starting_cash, engine, profile, progress, interval, execution, strategy,
+        indicator_cache(stock_symbol, interval, data), ledger
+    )
+
+# Indicator cache shared by the runs on the same bars in this process
+def indicator_cache(stock_symbol, interval, data):
+    series_key = (stock_symbol.upper(), interval) + ((data.index[0], data.index[-1]) if len(data) else ())
+    return shared_indicator_cache(series_key, data["close"].to_numpy(dtype=float))
+
+def report_progress(progress, fraction):
+    if progress is not None:
+        progress(fraction)
+
+# Data with the short_sma and long_sma columns added; the price columns are shared,
+# not copied, so memory-mapped prices stay on disk
+def add_sma_columns(data, short_sma_period, long_sma_period):
+    data = data.copy(deep=False)
+    data["short_sma"] = data["close"].rolling(window=short_sma_period).mean()
+    data["long_sma"] = data["close"].rolling(window=long_sma_period).mean()
+    return data
+
+# Close price and SMA columns shown in the price chart
+def sma_price_data(data, short_sma_period, long_sma_period):
+    return strategy_price_data(data, SMACrossover(short_sma_period, long_sma_period))
+
+# Close price and the strategy's overlays (by label) shown in the price chart
+def strategy_price_data(data, strategy, indicators=None):
+    indicators = indicators if indicators is not None else IndicatorCache(data["close"])
+    columns = {"close": indicators.close}
+    columns.update(strategy.overlays(indicators))
+    return pd.DataFrame(columns, index=data.index)
+
+# Backtrader run on data with SMA columns; returns (portfolio_value, equity_curve)
+# progress, if given, is called with the fraction of bars processed
+def run_cerebro_sma(data, short_sma_period, long_sma_period, starting_cash, profile=None, progress=None, interval="1d",
+                    execution=None):
+    # Hand the SMA columns computed above to the strategy instead of recomputing them
+    indicators = IndicatorCache(data["close"])
+    indicators.add(data["short_sma"], "sma", short_sma_period)
+    indicators.add(data["long_sma"], "sma", long_sma_period)
+    return run_cerebro_strategy(
+        data, SMACrossover(short_sma_period, long_sma_period), indicators, starting_cash, profile, progress, interval, execution
+    )
+
+# Backtrader run of any tradewhiz_strategies strategy on the indicators of the data's close.
+# The SMA crossover runs as SMAStrategy on the cached SMAs, every other strategy as a
+# SignalStrategy replaying its target states.
+def run_cerebro_strategy(data, strategy, indicators, starting_cash, profile=None, progress=None, interval="1d", execution=None,
+                         ledger=None):
+    import backtrader as bt
+    from tradewhiz_cerebro import SignalStrategy, SMAStrategy, configure_broker, make_data_feed
+
+    # Prepare data feed for Backtrader
+    data_feed = make_data_feed(data, interval)
+
+    # Initialize Cerebro
+    cerebro = bt.Cerebro()
+    cerebro.adddata(data_feed)
+    n_bars = len(data)
+    options = dict(
+        progress=(lambda bars: progress(bars / n_bars)) if progress is not None else None,
+        progress_every=max(n_bars // 200, 1), ledger=ledger
+    )
+    if isinstance(strategy, SMACrossover):
+        cerebro.addstrategy(
+            SMAStrategy, short_period=strategy["short"], long_period=strategy["long"],
+            sma_cache=SMACache(data["close"], indicators), **options
+        )
+    else:
+        cerebro.addstrategy(SignalStrategy, states=strategy.states(indicators), start=strategy.start, **options)
+    cerebro.addobserver(bt.observers.Value)  # Track portfolio value
+
+    # Broker settings
+    cerebro.broker.set_cash(starting_cash)
+    if execution is None or execution.is_default:
+        cerebro.broker.setcommission(commission=COMMISSION)
+        cerebro.addsizer(bt.sizers.FixedSize, stake=STAKE)
+    else:
+        configure_broker(cerebro, execution, bar_arrays(data), tradewhiz_metrics.periods_per_year(interval))
+
+    # Run backtest
+    results = cerebro.run()
+
+    # Get portfolio value and equity curve
+    strategy = results[0]  # Access the strategy instance
+    if profile is not None:
+        profile.count("orders", strategy.orders_issued)
+    return cerebro.broker.getvalue(), np.frombuffer(strategy.equity_curve)
+
+# Backtest on already downloaded data; the periods count bars of the given interval,
+# and the Sharpe ratio is annualized for it
+# indicators: optional IndicatorCache of the data's close, shared with other runs on the same data
+def backtest_data(data, short_sma_period, long_sma_period, starting_cash, engine="cerebro", profile=None, progress=None,
+                  interval="1d", execution=None, strategy=None, indicators=None, ledger=None):
+    strategy = strategy or SMACrossover(short_sma_period, long_sma_period)
+    if len(data) <= strategy.start:
+        return None, None, None, None, None
+    if profile is not None:
+        profile.count("bars", len(data))
+
+    # Calculate the indicators, unless another run on this data already did
+    with stage(profile, "indicators"):
+        indicators = indicators if indicators is not None else IndicatorCache(data["close"])
+        computed = indicators.computed
+        strategy.prepare(indicators)
+        price_data = strategy_price_data(data, strategy, indicators)
+    if profile is not None:
+        profile.count("indicators_computed", indicators.computed - computed)
+    report_progress(progress, 0.1)
+
+    with stage(profile, engine):
+        if engine == "fast":
+            # Vectorized engine reuses the indicators computed above
+            portfolio_value, equity_curve = run_fast_strategy(
+                data, strategy, indicators, starting_cash, profile=profile, execution=execution,
+                periods_per_year=tradewhiz_metrics.periods_per_year(interval), ledger=ledger
+            )
+        else:
+            engine_progress = (lambda fraction: progress(0.1 + 0.85 * fraction)) if progress is not None else None
+            portfolio_value, equity_curve = run_cerebro_strategy(
+                data, strategy, indicators, starting_cash, profile, engine_progress, interval, execution, ledger
+            )
+    with stage(profile, "metrics"):
+        sharpe_ratio = calculate_sharpe_ratio(equity_curve, periods_per_year=tradewhiz_metrics.periods_per_year(interval))
+        max_drawdown = calculate_max_drawdown(equity_curve)
+
+    report_progress(progress, 1.0)
+
+    return portfolio_value, sharpe_ratio, max_drawdown, equity_curve, price_data
+
+# Bars of several tickers: the missing ones are prefetched in batched, retried requests
+# (tradewhiz_prefetch), then all are read from the cache
+def download_many(stock_symbols, start_date, end_date, offline=False, max_workers=8, interval="1d", base_interval=None):
+    failed = {}
+    if not offline:
+        from tradewhiz_prefetch import Prefetcher
+
+        status = Prefetcher(interval=base_interval or interval, max_workers=max_workers).prefetch(stock_symbols, start_date, end_date)
+        failed = {row.symbol: row.error for row in status.itertuples() if row.status == "failed"}
+    # Cached bars are memory-mapped, so reading them is quick
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            symbol: pool.submit(load_bars, symbol, start_date, end_date, True, interval, base_interval)
+            for symbol in stock_symbols if symbol.upper() not in failed
+        }
+    datas = {}
+    for symbol in stock_symbols:
+        try:
+            if symbol.upper() in failed:
+                raise DownloadError(failed[symbol.upper()])
+            datas[symbol] = futures[symbol].result()
+        except Exception as e:
+            print(f"Failed to download {symbol}: {e}", file=sys.stderr)
+            datas[symbol] = None
+    return datas
+
+# Parse "AAPL:2, MSFT:1" into a weight per ticker; tickers without a weight get 1
+def parse_weights(stock_symbols, text=""):
+    weights = {symbol: 1.0 for symbol in stock_symbols}
+    for part in text.split(","):
+        if ":" in part:
+            symbol, weight = part.split(":", 1)
+            weights[symbol.strip().upper()] = float(weight)
+    return {symbol: weights[symbol] for symbol in stock_symbols}
+
+def _portfolio_worker(symbol, data, short_sma_period, long_sma_period, cash, engine, interval="1d", execution=None, strategy=None):
+    if data is None:
+        return symbol, None, None, None, None
+    portfolio_value, sharpe_ratio, max_drawdown, equity_curve, price_data = backtest_data(
+        data, short_sma_period, long_sma_period, cash, engine, interval=interval, execution=execution, strategy=strategy
+    )
+    if portfolio_value is None:
+        return symbol, None, None, None, None
+    # Both engines end their equity curve on the last bar
+    equity = pd.Series(np.asarray(equity_curve, dtype=float), index=price_data.index[-len(equity_curve):])
+    return symbol, portfolio_value, sharpe_ratio, max_drawdown, equity
+
+# Portfolio backtest: the starting cash is split over the tickers by weight (equal by
+# default) and every ticker runs the strategy (by default the SMA crossover) on its own share in a worker process.
+# Cash of a ticker that fails or has not started trading yet stays idle in the portfolio.
+def portfolio_backtest(stock_symbols, start_date, end_date, short_sma_period, long_sma_period, starting_cash,
+                       weights=None, engine="fast", offline=False, max_workers=None, interval="1d", base_interval=None,
+                       execution=None, strategy=None):
+    weights = weights or {symbol: 1.0 for symbol in stock_symbols}
+    total_weight = sum(weights[symbol] for symbol in stock_symbols)
+    allocations = {symbol: starting_cash * weights[symbol] / total_weight for symbol in stock_symbols}
+
+    datas = download_many(stock_symbols, start_date, end_date, offline, interval=interval, base_interval=base_interval)
+
+    rows = []
+    curves = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(
+                _portfolio_worker, symbol, datas[symbol], short_sma_period, long_sma_period, allocations[symbol], engine, interval,
+                execution, strategy
+            )
+            for symbol in stock_symbols
+        ]
+        for future in futures:
+            symbol, portfolio_value, sharpe_ratio, max_drawdown, equity = future.result()
+            status = "ok" if portfolio_value is not None else "failed"
+            rows.append((symbol, allocations[symbol], portfolio_value, sharpe_ratio, max_drawdown, status))
+            if equity is not None:
+                curves[symbol] = equity
+
+    summary = pd.DataFrame(rows, columns=["ticker", "allocation", "portfolio_value", "sharpe_ratio", "max_drawdown", "status"])
+
+    # Aggregate equity: align all tickers on the union of their dates
+    if curves:
+        equity = pd.DataFrame(curves).sort_index().ffill()
+        for symbol in stock_symbols:
+            if symbol not in equity.columns:
+                equity[symbol] = allocations[symbol]
+        portfolio_equity = equity.fillna(allocations).sum(axis=1)
+    else:
+        portfolio_equity = pd.Series(dtype=float)
+    return summary, portfolio_equity
@@ -0,0 +1,253 @@
+import numpy as np
+import pandas as pd
+
+# Execution model: how orders become fills. Position sizing (a fixed number of
+# shares, a percentage of equity or a volatility target), commissions (a flat rate
+# or a schedule of rates by order value), slippage (a fixed fraction of the price or
+# one that grows with the order's share of the bar volume) and the fill price (the
+# next bar's open or the signal bar's close).
+#
+# The fast engine applies the model with NumPy over whole arrays: prices, slippage,
+# commissions and the equity curve are vectorized over the bars. Sizing with a
+# percentage of equity or a volatility target depends on the cash left by the
+# previous trade, so the share counts are computed in a loop over the trades, never
+# over the bars. Those share counts are capped at what the cash pays for, commission
+# and slippage included, as a broker would reject a larger order; a fixed stake the
+# cash does not cover is not placed at all. tradewhiz_cerebro
+# maps the same model onto a Backtrader sizer, commission scheme and broker settings.
+
+# Broker settings of the default model, shared by both engines
+COMMISSION = 0.001
+STAKE = 10
+
+SIZINGS = ["fixed", "percent", "volatility"]
+SLIPPAGES = ["none", "fixed", "volume"]
+FILLS = ["next_open", "close"]
+
+# Parse a commission: a flat rate ("0.001") or a schedule of order values and the
+# rate from that value on ("0:0.001, 10000:0.0008, 100000:0.0005")
+def parse_commission(text):
+    text = str(text).strip()
+    if ":" not in text:
+        return float(text)
+    tiers = []
+    for part in text.split(","):
+        value, rate = part.split(":", 1)
+        tiers.append((float(value), float(rate)))
+    return sorted(tiers)
+
+class ExecutionModel:
+    def __init__(self, sizing="fixed", stake=STAKE, percent=95.0, target_volatility=0.15, volatility_window=20,
+                 max_leverage=1.0, commission=COMMISSION, slippage="none", slippage_value=0.0, fill="next_open"):
+        if sizing not in SIZINGS or slippage not in SLIPPAGES or fill not in FILLS:
+            raise ValueError(f"Unknown execution settings: {sizing}, {slippage}, {fill}")
+        self.sizing = sizing
+        self.stake = int(stake)
+        self.percent = float(percent)  # Percent of equity per position
+        self.target_volatility = float(target_volatility)  # Annualized
+        self.volatility_window = int(volatility_window)  # Bars of returns for the realized volatility
+        self.max_leverage = float(max_leverage)
+        self.commission = parse_commission(commission) if isinstance(commission, str) else commission
+        self.slippage = slippage
+        # Fraction of the price for fixed slippage; for volume slippage, the fraction
+        # per unit of the order's share of the bar volume
+        self.slippage_value = float(slippage_value)
+        self.fill = fill
+
+    @property
+    def is_default(self):
+        return self.key() == DEFAULT_KEY
+
+    # Commission rate of each order value
+    def commission_rate(self, values):
+        if not isinstance(self.commission, list):
+            return np.full(np.shape(values), float(self.commission))
+        thresholds = np.array([value for value, _ in self.commission])
+        rates = np.array([rate for _, rate in self.commission])
+        return rates[np.maximum(np.searchsorted(thresholds, values, side="right") - 1, 0)]
+
+    def commission_text(self):
+        if not isinstance(self.commission, list):
+            return f"{self.commission:g}"
+        return ",".join(f"{value:g}:{rate:g}" for value, rate in self.commission)
+
+    # Canonical text of the settings that change results, used as part of the result store key
+    def key(self):
+        sizing = {"fixed": f"{self.stake}", "percent": f"{self.percent:g}",
+                  "volatility": f"{self.target_volatility:g}/{self.volatility_window}/{self.max_leverage:g}"}[self.sizing]
+        slippage = "" if self.slippage == "none" else f":{self.slippage_value:g}"
+        return f"{self.sizing}:{sizing}|commission:{self.commission_text()}|slippage:{self.slippage}{slippage}|fill:{self.fill}"
+
+    def describe(self):
+        sizing = {
+            "fixed": f"{self.stake} shares",
+            "percent": f"{self.percent:g}% of equity",
+            "volatility": f"{self.target_volatility:.0%} volatility target ({self.volatility_window} bars, max {self.max_leverage:g}x)",
+        }[self.sizing]
+        slippage = {
+            "none": "no slippage",
+            "fixed": f"{self.slippage_value:.2%} slippage",
+            "volume": f"slippage {self.slippage_value:g} x volume share",
+        }[self.slippage]
+        fill = "next open" if self.fill == "next_open" else "signal close"
+        return f"{sizing}, commission {self.commission_text()}, {slippage}, fill at {fill}"
+
+    # Fraction of equity to invest at each bar for volatility targeting: the target over
+    # the annualized volatility of the last volatility_window returns, capped at
+    # max_leverage; 0 until the window is full
+    def volatility_factors(self, close, periods_per_year=252):
+        returns = pd.Series(np.asarray(close, dtype=float)).pct_change()
+        volatility = returns.rolling(window=self.volatility_window).std().to_numpy() * np.sqrt(periods_per_year)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            factors = np.minimum(self.target_volatility / volatility, self.max_leverage)
+        return np.nan_to_num(factors, nan=0.0, posinf=self.max_leverage)
+
+    # Fill prices with slippage, capped at the high and low of the bar the order executes
+    # in (as Backtrader does); sides are +1 for buys and -1 for sells
+    def fill_prices(self, prices, sides, shares, high, low, volume):
+        if self.slippage == "none":
+            return prices
+        if self.slippage == "fixed":
+            slip = np.full(len(prices), self.slippage_value)
+        else:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                slip = np.nan_to_num(self.slippage_value * shares / volume, nan=0.0, posinf=0.0)
+        slipped = prices * (1.0 + sides * slip)
+        return np.where(sides > 0, np.minimum(slipped, high), np.maximum(slipped, low))
+
+    # Most shares of a buy at each price that the cash pays for, commission included
+    def affordable_shares(self, cash, prices):
+        prices = np.atleast_1d(np.asarray(prices, dtype=float))
+        if not isinstance(self.commission, list):
+            shares = np.floor(cash / (prices * (1.0 + float(self.commission))))
+        else:
+            # Most shares within the order values of each tier of the schedule, at its rate
+            thresholds = np.array([value for value, _ in self.commission])
+            rates = np.array([rate for _, rate in self.commission])
+            lower = np.append(-np.inf, thresholds[1:])
+            upper = np.append(thresholds[1:], np.inf)
+            shares = np.floor(cash / (prices[:, None] * (1.0 + rates)))
+            shares = np.minimum(shares, np.ceil(upper / prices[:, None]) - 1.0)
+            shares = np.where(shares * prices[:, None] >= lower, shares, 0.0).max(axis=1)
+        # Rounding can leave the cost a fraction of a cent above the cash
+        shares = np.maximum(shares, 0.0)
+        over = cash - shares * prices - self.commissions(prices, shares) < 0.0
+        return np.where(over, np.maximum(shares - 1.0, 0.0), shares)
+
+    # Shares of a buy signalled on each of the signal bars. Percent and volatility sized
+    # buys are factor times the cash in shares at the signal close, capped at what the
+    # cash pays for at the signal close (where a broker checks an order on submission)
+    # and at the fill price with slippage (where it checks it again), commission
+    # included. A fixed stake is not cut down: it is 0 (the broker rejects the order)
+    # unless the cash covers all of it at both prices.
+    def buy_shares(self, cash, signals, open_, high, low, close, volume=None, factors=None):
+        signals = np.atleast_1d(np.asarray(signals))
+        if self.sizing == "fixed":
+            shares = np.full(len(signals), float(self.stake))
+        else:
+            shares = np.floor(cash * np.asarray(factors)[signals] / close[signals])
+        # An order on the last bar never fills, so only the signal close is checked
+        inside = signals + 1 < len(close)
+        booked = np.where(inside, signals + 1, signals)
+        prices = open_[booked] if self.fill == "next_open" else close[signals]
+        prices = self.fill_prices(
+            prices.astype(float), np.ones(len(signals)), shares, high[booked], low[booked],
+            volume[booked] if volume is not None else np.full(len(signals), np.nan)
+        )
+        prices = np.where(inside, prices, close[signals])
+        affordable = np.minimum(self.affordable_shares(cash, close[signals]), self.affordable_shares(cash, prices))
+        if self.sizing == "fixed":
+            return np.where(shares <= affordable, shares, 0.0)
+        return np.minimum(shares, affordable)
+
+    def commissions(self, prices, shares):
+        values = shares * prices
+        return values * self.commission_rate(values)
+
+    # Cash change of each fill: the traded value plus the commission
+    def cash_flows(self, prices, sides, shares):
+        return -sides * shares * prices - self.commissions(prices, shares)
+
+    # Fills of the orders of a long/flat strategy (+1 buy, -1 sell per bar, as from
+    # tradewhiz_core.sma_orders): (bars, sides, shares, prices, commissions), one entry
+    # per fill. An order on bar t is booked on bar t + 1, at that bar's open or at the
+    # close of bar t; an order on the last bar never fills. A buy of no shares (see
+    # buy_shares) is not placed and, as a strategy that is still flat on the next bar
+    # buys again, moves on to the next bar until the sell signal; a buy that never
+    # fills drops its sell too.
+    def fills(self, orders, starting_cash, open_, high, low, close, volume=None, periods_per_year=252):
+        n = len(close)
+        signal_bars = np.flatnonzero(orders)
+        signal_bars = signal_bars[signal_bars + 1 < n]
+        sides = orders[signal_bars]
+        bars = (open_, high, low, close, volume)
+
+        if self.sizing == "fixed":
+            # Vectorized over all trades, kept if the cash covers every buy
+            fills = self._priced_fills(signal_bars, sides, np.full(len(signal_bars), float(self.stake)), bars)
+            cash_flows = self.cash_flows(fills[3], sides, fills[2])
+            cash = starting_cash + np.cumsum(cash_flows) - cash_flows
+            buys = sides > 0
+            if np.all(self.buy_shares(cash[buys], signal_bars[buys], *bars) > 0):
+                return fills
+            factors = None
+        else:
+            factors = (
+                np.full(n, self.percent / 100.0) if self.sizing == "percent"
+                else self.volatility_factors(close, periods_per_year)
+            )
+
+        # Orders alternate buy, sell; each sell closes the shares of the buy before it
+        buys, sells = signal_bars[sides > 0], signal_bars[sides < 0]
+        trades = []
+        cash = starting_cash
+        for k, buy in enumerate(buys):
+            sell = sells[k] if k < len(sells) else n - 1
+            entry, shares = self._entry(cash, buy, sell, bars, factors)
+            if entry is None:
+                continue
+            trade_bars = np.array([entry, sell] if sell < n - 1 else [entry])
+            trade_sides = np.array([1.0, -1.0])[:len(trade_bars)]
+            trades.append(self._priced_fills(trade_bars, trade_sides, np.full(len(trade_bars), shares), bars))
+            cash += self.cash_flows(trades[-1][3], trade_sides, trades[-1][2]).sum()
+        if not trades:
+            return self._priced_fills(np.zeros(0, dtype=int), np.zeros(0), np.zeros(0), bars)
+        return tuple(np.concatenate(column) for column in zip(*trades))
+
+    # First bar from signal up to (not including) end on which a buy gets shares, and
+    # its shares; (None, 0) if there is none
+    def _entry(self, cash, signal, end, bars, factors):
+        shares = self.buy_shares(cash, signal, *bars, factors=factors)[0]
+        if shares > 0 or signal + 1 >= end:
+            return (signal, shares) if shares > 0 else (None, 0.0)
+        candidates = np.arange(signal + 1, end)
+        shares = self.buy_shares(cash, candidates, *bars, factors=factors)
+        placed = np.flatnonzero(shares > 0)
+        return (candidates[placed[0]], shares[placed[0]]) if len(placed) else (None, 0.0)
+
+    # (bars, sides, shares, prices, commissions) of orders signalled on signal_bars
+    def _priced_fills(self, signal_bars, sides, shares, bars):
+        open_, high, low, close, volume = bars
+        booked = signal_bars + 1
+        prices = (open_[booked] if self.fill == "next_open" else close[signal_bars]).astype(float)
+        prices = self.fill_prices(
+            prices, sides, shares, high[booked], low[booked],
+            volume[booked] if volume is not None else np.full(len(booked), np.nan)
+        )
+        return booked, sides, shares, prices, self.commissions(prices, shares)
+
+    # Equity curve of the orders from bar start on, see fills()
+    def equity_curve(self, orders, start, starting_cash, open_, high, low, close, volume=None, periods_per_year=252):
+        n = len(close)
+        booked, sides, shares, prices, commissions = self.fills(
+            orders, starting_cash, open_, high, low, close, volume, periods_per_year
+        )
+        fills = np.zeros(n)
+        cash_flows = np.zeros(n)
+        fills[booked] = sides * shares
+        cash_flows[booked] = -sides * shares * prices - commissions
+        position = np.cumsum(fills)
+        cash = starting_cash + np.cumsum(cash_flows)
+        return (cash + position * close)[start:]
+
+DEFAULT_KEY = ExecutionModel().key()
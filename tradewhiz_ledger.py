@@ -0,0 +1,144 @@
+from array import array
+
+import numpy as np
+import pandas as pd
+
+# Trade ledger of a backtest. Every fill is appended to typed arrays (33 bytes per
+# fill, no Python object per fill), by Cerebro's order notifications or in bulk by
+# the fast engine, so recording costs nothing per bar. Trades, their PnL and holding
+# periods are paired from the fills when asked for. Long/flat strategies only: every
+# buy opens a trade and the next sell closes all of it.
+
+FILL_DTYPE = np.dtype([("bar", "<i8"), ("side", "i1"), ("shares", "<f8"), ("price", "<f8"), ("commission", "<f8")])
+
+class TradeLedger:
+    __slots__ = ("bar", "side", "shares", "price", "commission")
+
+    def __init__(self):
+        self.bar = array("q")  # Bar the fill was booked on
+        self.side = array("b")  # +1 buy, -1 sell
+        self.shares = array("d")
+        self.price = array("d")
+        self.commission = array("d")
+
+    def __len__(self):
+        return len(self.bar)
+
+    # Pickled (e.g. back from a worker process) in the compact form
+    def __getstate__(self):
+        return self.to_bytes()
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.extend_bytes(state)
+
+    # One fill, e.g. from Backtrader's notify_order
+    def record(self, bar, side, shares, price, commission):
+        self.bar.append(bar)
+        self.side.append(side)
+        self.shares.append(shares)
+        self.price.append(price)
+        self.commission.append(commission)
+
+    # Many fills at once, e.g. from tradewhiz_execution.ExecutionModel.fills
+    def extend(self, bars, sides, shares, prices, commissions):
+        for column, values in zip((self.bar, self.side, self.shares, self.price, self.commission),
+                                  (bars, sides, shares, prices, commissions)):
+            column.frombytes(np.ascontiguousarray(values, dtype=column.typecode).tobytes())
+
+    # Fills in the compact form of to_bytes()
+    def extend_bytes(self, data):
+        fills = np.frombuffer(data, dtype=FILL_DTYPE)
+        self.extend(*(fills[name] for name in FILL_DTYPE.names))
+
+    # The fills as a structured array; to_bytes() is the compact form kept in the result store
+    def to_array(self):
+        fills = np.empty(len(self), dtype=FILL_DTYPE)
+        for name in FILL_DTYPE.names:
+            fills[name] = np.frombuffer(getattr(self, name), dtype=FILL_DTYPE[name]) if len(self) else []
+        return fills
+
+    def to_bytes(self):
+        return self.to_array().tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        ledger = cls()
+        ledger.extend_bytes(data)
+        return ledger
+
+    # One row per fill; index: optional bar dates of the backtest data
+    def fills(self, index=None):
+        fills = self.to_array()
+        frame = pd.DataFrame({
+            "bar": fills["bar"], "side": np.where(fills["side"] > 0, "buy", "sell"), "shares": fills["shares"],
+            "price": fills["price"], "value": fills["shares"] * fills["price"], "commission": fills["commission"],
+        })
+        if index is not None:
+            frame.insert(1, "date", np.asarray(index)[fills["bar"]])
+        return frame
+
+    # One row per trade: entry and exit, shares, commissions, net PnL, return on the
+    # entry cost and bars held. close is the backtest data's close; a trade still open
+    # at the end is valued at the last close, on the last bar, and has status "open".
+    def trades(self, close, index=None):
+        fills = self.to_array()
+        buys, sells = np.flatnonzero(fills["side"] > 0), np.flatnonzero(fills["side"] < 0)
+        closed = min(len(buys), len(sells))
+        entries = fills[buys]
+        exits = np.zeros(len(buys), dtype=FILL_DTYPE)
+        exits[:closed] = fills[sells[:closed]]
+        is_open = np.arange(len(buys)) >= closed
+
+        close = np.asarray(close, dtype=float)
+        exit_bar = np.where(is_open, len(close) - 1, exits["bar"])
+        exit_price = np.where(is_open, close[-1] if len(close) else np.nan, exits["price"])
+        commission = entries["commission"] + exits["commission"]
+        pnl = (exit_price - entries["price"]) * entries["shares"] - commission
+        cost = entries["shares"] * entries["price"] + entries["commission"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            trade_return = np.where(cost > 0, pnl / cost, np.nan)
+        frame = pd.DataFrame({
+            "entry_bar": entries["bar"], "exit_bar": exit_bar, "shares": entries["shares"], "entry_price": entries["price"],
+            "exit_price": exit_price, "commission": commission, "pnl": pnl, "trade_return": trade_return,
+            "bars_held": exit_bar - entries["bar"], "status": np.where(is_open, "open", "closed"),
+        })
+        if index is not None:
+            dates = np.asarray(index)
+            frame.insert(0, "entry_date", dates[entries["bar"]])
+            frame.insert(1, "exit_date", dates[exit_bar])
+        return frame
+
+# Summary statistics of a trades DataFrame from TradeLedger.trades
+def trade_summary(trades):
+    closed = trades[trades["status"] == "closed"]
+    wins, losses = closed["pnl"][closed["pnl"] > 0], closed["pnl"][closed["pnl"] <= 0]
+    return {
+        "trades": len(trades),
+        "closed_trades": len(closed),
+        "win_rate": len(wins) / len(closed) if len(closed) else np.nan,
+        "average_pnl": float(closed["pnl"].mean()) if len(closed) else np.nan,
+        "average_return": float(closed["trade_return"].mean()) if len(closed) else np.nan,
+        "profit_factor": float(wins.sum() / -losses.sum()) if losses.sum() < 0 else np.nan,
+        "average_bars_held": float(closed["bars_held"].mean()) if len(closed) else np.nan,
+        "total_commission": float(trades["commission"].sum()),
+    }
+
+# Table rows (with a header row) of a trade summary, formatted for display
+def summary_rows(summary):
+    rows = [["Statistic", "Value"], ["Trades", f"{summary['trades']:,} ({summary['closed_trades']:,} closed)"]]
+    for label, key, fmt in [
+        ("Win Rate", "win_rate", "{:.1%}"), ("Average PnL ($)", "average_pnl", "${:,.2f}"),
+        ("Average Return", "average_return", "{:.2%}"), ("Profit Factor", "profit_factor", "{:.2f}"),
+        ("Average Bars Held", "average_bars_held", "{:.1f}"), ("Total Commission ($)", "total_commission", "${:,.2f}"),
+    ]:
+        rows.append([label, "N/A" if np.isnan(summary[key]) else fmt.format(summary[key])])
+    return rows
+
+# Write trades (or fills) to CSV or Parquet, by the file extension; Parquet needs pyarrow or fastparquet
+def export_trades(frame, path):
+    if path.lower().endswith(".parquet"):
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_csv(path, index=False)
+    return path
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+# Risk and performance metrics on an equity curve, vectorized with NumPy/pandas so
+# they stay O(n) on million-point intraday curves and cheap inside optimizer loops.
+# Every function takes the equity curve (portfolio value per bar) as an array-like.
+
+TRADING_DAYS = 252
+
+# Bars per year of each bar interval, for US equities with 6.5 trading hours a day.
+# Hourly bars start on the hour or half hour, so a day has 7 of them.
+PERIODS_PER_YEAR = {
+    "1m": TRADING_DAYS * 390,
+    "5m": TRADING_DAYS * 78,
+    "15m": TRADING_DAYS * 26,
+    "30m": TRADING_DAYS * 13,
+    "1h": TRADING_DAYS * 7,
+    "1d": TRADING_DAYS,
+}
+
+def periods_per_year(interval="1d"):
+    return PERIODS_PER_YEAR[interval]
+
+def returns_from_equity(equity_curve):
+    equity = np.asarray(equity_curve, dtype=float)
+    if len(equity) < 2:
+        return np.empty(0)
+    return equity[1:] / equity[:-1] - 1.0
+
+# Annualized Sharpe ratio of the per-bar returns; risk_free_rate is annual
+def sharpe_ratio(equity_curve, periods_per_year=TRADING_DAYS, risk_free_rate=0.0):
+    returns = returns_from_equity(equity_curve)
+    if len(returns) == 0:
+        return np.nan
+    excess = returns - risk_free_rate / periods_per_year
+    std = excess.std()
+    return excess.mean() / std * np.sqrt(periods_per_year) if std != 0 else np.nan
+
+# Annualized Sortino ratio: like Sharpe, but only downside deviation counts as risk
+def sortino_ratio(equity_curve, periods_per_year=TRADING_DAYS, risk_free_rate=0.0):
+    returns = returns_from_equity(equity_curve)
+    if len(returns) == 0:
+        return np.nan
+    excess = returns - risk_free_rate / periods_per_year
+    downside = np.sqrt(np.mean(np.minimum(excess, 0.0) ** 2))
+    return excess.mean() / downside * np.sqrt(periods_per_year) if downside != 0 else np.nan
+
+# Compound annual growth rate
+def cagr(equity_curve, periods_per_year=TRADING_DAYS):
+    equity = np.asarray(equity_curve, dtype=float)
+    if len(equity) < 2 or equity[0] <= 0 or equity[-1] <= 0:
+        return np.nan
+    years = (len(equity) - 1) / periods_per_year
+    return (equity[-1] / equity[0]) ** (1.0 / years) - 1.0
+
+def drawdown_curve(equity_curve):
+    equity = np.asarray(equity_curve, dtype=float)
+    if len(equity) == 0:
+        return np.empty(0)
+    return 1.0 - equity / np.maximum.accumulate(equity)
+
+def max_drawdown(equity_curve):
+    drawdowns = drawdown_curve(equity_curve)
+    return drawdowns.max() if len(drawdowns) else 0.0
+
+# Calmar ratio: CAGR divided by the maximum drawdown
+def calmar_ratio(equity_curve, periods_per_year=TRADING_DAYS):
+    drawdown = max_drawdown(equity_curve)
+    return cagr(equity_curve, periods_per_year) / drawdown if drawdown > 0 else np.nan
+
+# Maximum drawdown with its peak, trough and recovery. Positions are bar numbers, or
+# labels from index (e.g. dates) when given. recovery is None if the curve never got
+# back to the peak; the duration then runs to the last bar. longest_drawdown_bars is
+# the longest stretch below a previous high, which need not be the deepest one.
+def drawdown_details(equity_curve, index=None):
+    equity = np.asarray(equity_curve, dtype=float)
+    n = len(equity)
+    if n == 0:
+        return {"max_drawdown": 0.0, "peak": None, "trough": None, "recovery": None,
+                "duration_bars": 0, "longest_drawdown_bars": 0}
+
+    running_peak = np.maximum.accumulate(equity)
+    drawdowns = 1.0 - equity / running_peak
+    trough = int(drawdowns.argmax())
+    peak_value = running_peak[trough]
+
+    # The drawdown starts at the last bar before the trough that was at the peak
+    peak = trough - int(np.argmax(equity[trough::-1] >= peak_value))
+    recovered = np.flatnonzero(equity[trough:] >= peak_value)
+    recovery = trough + int(recovered[0]) if len(recovered) and drawdowns[trough] > 0 else None
+    duration = (recovery if recovery is not None else n - 1) - peak if drawdowns[trough] > 0 else 0
+
+    # Longest gap between consecutive new highs (a gap of one bar is no drawdown),
+    # including the open drawdown from the last high to the last bar
+    highs = np.flatnonzero(equity >= running_peak)
+    gaps = np.diff(highs)
+    longest = int(max(gaps[gaps > 1].max(initial=0), n - 1 - highs[-1]))
+
+    label = (lambda position: position) if index is None else (lambda position: index[position])
+    return {
+        "max_drawdown": float(drawdowns[trough]),
+        "peak": label(peak),
+        "trough": label(trough),
+        "recovery": label(recovery) if recovery is not None else None,
+        "duration_bars": int(duration),
+        "longest_drawdown_bars": longest,
+    }
+
+# Annualized Sharpe over a sliding window of bars; NaN until the window is full
+def rolling_sharpe(equity_curve, window, periods_per_year=TRADING_DAYS):
+    returns = pd.Series(returns_from_equity(equity_curve))
+    rolling = returns.rolling(window=window)
+    std = rolling.std(ddof=0).to_numpy()
+    mean = rolling.mean().to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, mean / std * np.sqrt(periods_per_year), np.nan)
+    # Align with the equity curve: the first bar has no return
+    return np.concatenate(([np.nan], sharpe))
+
+# Drawdown from the highest value within the last window bars
+def rolling_drawdown(equity_curve, window):
+    equity = pd.Series(np.asarray(equity_curve, dtype=float))
+    return (1.0 - equity / equity.rolling(window=window, min_periods=1).max()).to_numpy()
+
+def performance_summary(equity_curve, periods_per_year=TRADING_DAYS, index=None, risk_free_rate=0.0):
+    equity = np.asarray(equity_curve, dtype=float)
+    summary = {
+        "final_value": float(equity[-1]) if len(equity) else np.nan,
+        "total_return": float(equity[-1] / equity[0] - 1.0) if len(equity) else np.nan,
+        "cagr": cagr(equity, periods_per_year),
+        "sharpe_ratio": sharpe_ratio(equity, periods_per_year, risk_free_rate),
+        "sortino_ratio": sortino_ratio(equity, periods_per_year, risk_free_rate),
+        "calmar_ratio": calmar_ratio(equity, periods_per_year),
+    }
+    summary.update(drawdown_details(equity, index))
+    return summary
@@ -0,0 +1,174 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from tradewhiz_metrics import TRADING_DAYS, returns_from_equity
+
+# Monte Carlo robustness analysis of a backtest's equity curve. Thousands of
+# alternative paths are drawn from the strategy's own per-bar returns, either by a
+# circular block bootstrap (blocks of consecutive bars keep short-term dependence,
+# such as volatility clusters) or by resampling whole trades, and the spread of the
+# final value, Sharpe ratio and max drawdown over the paths gives confidence
+# intervals for the single backtested path.
+#
+# Paths are simulated with NumPy a batch at a time (one index matrix, one cumprod per
+# batch) and the batches are split over worker processes. Only the metrics and the
+# equity at a few hundred points per path (for the fan chart) are kept, so memory
+# stays at about one batch of paths, whatever the number of paths.
+
+METHODS = {"block": "Block bootstrap of bar returns", "trades": "Resampled trades"}
+FAN_POINTS = 200  # Points along the curve kept per path for the fan chart
+FAN_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+BATCH_PATHS = 1000  # Paths simulated at once
+PARALLEL_BARS = 5_000_000  # Paths x bars from which the simulation is split over processes
+
+# Units for trade resampling: every run of non-zero returns (a trade; the strategy's
+# cash earns nothing while it is flat) together with the flat bars that follow it.
+# Returns (start, length) of each unit.
+def trade_units(returns):
+    active = returns != 0
+    starts = np.flatnonzero(active & ~np.concatenate(([False], active[:-1])))
+    if len(starts) == 0 or starts[0] != 0:
+        starts = np.concatenate(([0], starts))
+    return starts, np.diff(np.append(starts, len(returns)))
+
+# Return indices of circular block bootstrap paths, shape (paths, bars)
+def block_indices(rng, paths, bars, block_size):
+    blocks = -(-bars // block_size)
+    starts = rng.integers(0, bars, size=(paths, blocks))
+    return ((starts[:, :, None] + np.arange(block_size)) % bars).reshape(paths, -1)[:, :bars]
+
+# Return indices of paths made of units drawn with replacement until every path is
+# at least bars long, shape (paths, bars)
+def trade_indices(rng, paths, bars, starts, lengths):
+    draws = int(np.ceil(1.5 * bars / lengths.mean())) + 1
+    units = rng.integers(0, len(starts), size=(paths, draws))
+    ends = np.cumsum(lengths[units], axis=1)
+    while ends[:, -1].min() < bars:
+        more = rng.integers(0, len(starts), size=(paths, draws))
+        units = np.concatenate((units, more), axis=1)
+        ends = np.concatenate((ends, ends[:, -1:] + np.cumsum(lengths[more], axis=1)), axis=1)
+    # Unit under every bar of every path: one searchsorted over all rows, each row
+    # shifted past the end of the previous one
+    rows = np.arange(paths)[:, None]
+    shift = rows * (int(ends[:, -1].max()) + 1)
+    positions = np.arange(bars)
+    slots = np.searchsorted((ends + shift).ravel(), (positions + shift).ravel(), side="right").reshape(paths, bars)
+    slots -= rows * ends.shape[1]
+    unit = units[rows, slots]
+    return starts[unit] + positions - (ends[rows, slots] - lengths[unit])
+
+# Simulate paths in batches; returns the final values, Sharpe ratios, max drawdowns
+# and the equity at the fan chart points of every path. seed: a seed, or a list of
+# one SeedSequence per batch
+def simulate(returns, starting_value, paths, method="block", block_size=20, seed=None, periods_per_year=TRADING_DAYS,
+             fan_points=None):
+    batches = range(0, paths, BATCH_PATHS)
+    seeds = seed if isinstance(seed, list) else np.random.SeedSequence(seed).spawn(len(batches))
+    bars = len(returns)
+    if method == "trades":
+        starts, lengths = trade_units(returns)
+    fan_points = np.arange(bars) if fan_points is None else fan_points
+
+    final_values, sharpe_ratios, max_drawdowns, fans = [], [], [], []
+    for batch, batch_seed in zip(batches, seeds):
+        rng = np.random.default_rng(batch_seed)
+        size = min(BATCH_PATHS, paths - batch)
+        if method == "trades":
+            indices = trade_indices(rng, size, bars, starts, lengths)
+        else:
+            indices = block_indices(rng, size, bars, block_size)
+        path_returns = returns[indices]
+        equity = starting_value * np.cumprod(1.0 + path_returns, axis=1)
+        peaks = np.maximum(np.maximum.accumulate(equity, axis=1), starting_value)
+        std = path_returns.std(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe_ratios.append(np.where(std > 0, path_returns.mean(axis=1) / std * np.sqrt(periods_per_year), np.nan))
+        final_values.append(equity[:, -1])
+        max_drawdowns.append((1.0 - equity / peaks).max(axis=1))
+        fans.append(equity[:, fan_points])
+    return np.concatenate(final_values), np.concatenate(sharpe_ratios), np.concatenate(max_drawdowns), np.concatenate(fans)
+
+# Monte Carlo analysis of an equity curve. Returns a dict with:
+#   summary: DataFrame of the observed value, mean and confidence interval of the
+#            final value, Sharpe ratio and max drawdown over the paths
+#   fan: DataFrame of the equity quantiles over the paths (one column per quantile,
+#        plus the observed equity) at up to FAN_POINTS bars of the curve
+#   loss_probability: share of the paths ending below the starting value
+# max_workers: worker processes (all cores by default); small simulations run in-process
+def monte_carlo(equity_curve, paths=10000, method="block", block_size=20, confidence=0.9, periods_per_year=TRADING_DAYS,
+                seed=None, max_workers=None):
+    if method not in METHODS:
+        raise ValueError(f"Unknown Monte Carlo method: {method}")
+    equity = np.asarray(equity_curve, dtype=float)
+    returns = returns_from_equity(equity)
+    if len(returns) < 2:
+        raise ValueError("The equity curve is too short for a Monte Carlo analysis.")
+    if method == "trades" and len(trade_units(returns)[0]) < 2:
+        raise ValueError("Resampling trades needs at least two trades.")
+    block_size = max(1, min(int(block_size), len(returns)))
+    fan_points = np.unique(np.linspace(0, len(returns) - 1, min(FAN_POINTS, len(returns))).round().astype(int))
+
+    workers = max_workers or os.cpu_count() or 1
+    if paths * len(returns) < PARALLEL_BARS:
+        workers = 1
+    # Every batch of paths has its own seed and the workers get whole batches, so the
+    # paths of a seed are the same however many workers simulate them
+    batch_seeds = np.random.SeedSequence(seed).spawn(-(-paths // BATCH_PATHS))
+    chunks = [chunk for chunk in np.array_split(np.arange(len(batch_seeds)), workers) if len(chunk)]
+    arguments = [
+        (returns, equity[0], min(paths, (chunk[-1] + 1) * BATCH_PATHS) - chunk[0] * BATCH_PATHS, method, block_size,
+         [batch_seeds[batch] for batch in chunk], periods_per_year, fan_points)
+        for chunk in chunks
+    ]
+    if len(arguments) == 1:
+        results = [simulate(*arguments[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=len(arguments)) as pool:
+            results = list(pool.map(simulate, *zip(*arguments)))
+    final_values, sharpe_ratios, max_drawdowns, fans = (np.concatenate(parts) for parts in zip(*results))
+
+    lower, upper = (1.0 - confidence) / 2.0, (1.0 + confidence) / 2.0
+    observed = observed_metrics(equity, periods_per_year)
+    summary = pd.DataFrame(
+        [
+            [observed[name], np.nanmean(values), *np.nanquantile(values, [lower, 0.5, upper])]
+            for name, values in [("final_value", final_values), ("sharpe_ratio", sharpe_ratios), ("max_drawdown", max_drawdowns)]
+        ],
+        index=["final_value", "sharpe_ratio", "max_drawdown"], columns=["observed", "mean", "lower", "median", "upper"]
+    )
+    fan = pd.DataFrame(np.quantile(fans, FAN_QUANTILES, axis=0).T, index=fan_points + 1, columns=list(FAN_QUANTILES))
+    fan["observed"] = equity[fan_points + 1]
+    return {
+        "method": method, "paths": int(paths), "block_size": block_size, "confidence": confidence,
+        "summary": summary, "fan": fan, "loss_probability": float(np.mean(final_values < equity[0])),
+    }
+
+# Metrics of the backtested path, computed the same way as for the simulated paths
+def observed_metrics(equity, periods_per_year):
+    returns = returns_from_equity(equity)
+    std = returns.std()
+    return {
+        "final_value": equity[-1],
+        "sharpe_ratio": returns.mean() / std * np.sqrt(periods_per_year) if std > 0 else np.nan,
+        "max_drawdown": float((1.0 - equity / np.maximum.accumulate(equity)).max()),
+    }
+
+# Table rows (with a header row) of a monte_carlo() result, formatted for display
+def summary_rows(result):
+    level = f"{result['confidence']:.0%}"
+    formats = {"final_value": ("Final Value ($)", "${:,.2f}"), "sharpe_ratio": ("Sharpe Ratio", "{:.2f}"),
+               "max_drawdown": ("Max Drawdown", "{:.2%}")}
+    rows = [["Metric", "Backtest", "Median", f"{level} Interval"]]
+    for name, row in result["summary"].iterrows():
+        label, fmt = formats[name]
+        rows.append([label, fmt.format(row["observed"]), fmt.format(row["median"]),
+                     f"{fmt.format(row['lower'])} to {fmt.format(row['upper'])}"])
+    rows.append(["Probability of Loss", "", f"{result['loss_probability']:.1%}", ""])
+    return rows
+
+def describe(result):
+    method = METHODS[result["method"]] + (f" ({result['block_size']}-bar blocks)" if result["method"] == "block" else "")
+    return f"{result['paths']:,} paths, {method}"
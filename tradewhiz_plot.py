@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+import matplotlib.dates as mdates
+
+# Level-of-detail line plotting for long series. Only the minimum and maximum of each
+# pixel column are drawn, which looks the same as the full line (peaks and troughs
+# are kept) at a fraction of the drawing cost. When the x-axis limits change (zoom
+# or pan), the visible range is decimated again at full resolution.
+
+# Indices of the min and max of every bin, in their original order
+def minmax_indices(y, bins):
+    n = len(y)
+    if n <= 2 * bins:
+        return np.arange(n)
+
+    size = -(-n // bins)  # Ceiling division
+    full = (n // size) * size
+    # NaNs (e.g. the first bars of an SMA) never win a min or max unless the whole bin is NaN
+    low = np.where(np.isnan(y), np.inf, y)
+    high = np.where(np.isnan(y), -np.inf, y)
+    offsets = np.arange(0, full, size)
+    pairs = [
+        low[:full].reshape(-1, size).argmin(axis=1) + offsets,
+        high[:full].reshape(-1, size).argmax(axis=1) + offsets,
+    ]
+    if full < n:
+        pairs[0] = np.append(pairs[0], full + low[full:].argmin())
+        pairs[1] = np.append(pairs[1], full + high[full:].argmax())
+    indices = np.sort(np.stack(pairs, axis=1), axis=1).ravel()
+    return np.unique(np.concatenate(([0], indices, [n - 1])))
+
+def minmax_decimate(x, y, bins):
+    indices = minmax_indices(np.asarray(y, dtype=float), bins)
+    return np.asarray(x)[indices], np.asarray(y)[indices]
+
+class DecimatedLine:
+    def __init__(self, ax, x, y, **kwargs):
+        self.ax = ax
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.line, = ax.plot(*self.visible_data(None), **kwargs)
+        self.callback = ax.callbacks.connect("xlim_changed", self.refine)
+
+    # Replace the data, keeping the line and its style
+    def set_data(self, x, y):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.line.set_data(*self.visible_data(None))
+
+    def remove(self):
+        self.ax.callbacks.disconnect(self.callback)
+        self.line.remove()
+
+    def pixels(self):
+        return max(int(self.ax.bbox.width), 100)
+
+    def visible_data(self, xlim):
+        lo, hi = 0, len(self.x)
+        if xlim is not None:
+            # One extra point on each side so the line runs to the edges of the view
+            lo = max(int(np.searchsorted(self.x, xlim[0])) - 1, 0)
+            hi = min(int(np.searchsorted(self.x, xlim[1], side="right")) + 1, len(self.x))
+        indices = minmax_indices(self.y[lo:hi], self.pixels()) + lo
+        return self.x[indices], self.y[indices]
+
+    def refine(self, ax):
+        self.line.set_data(*self.visible_data(ax.get_xlim()))
+
+# Plot y against x (numbers or a DatetimeIndex) with level-of-detail decimation.
+# Keep the returned object alive as long as the plot is shown: Matplotlib only holds
+# weak references to its callbacks.
+def plot_decimated(ax, x, y, **kwargs):
+    if pd.api.types.is_datetime64_any_dtype(x):
+        line = DecimatedLine(ax, mdates.date2num(x), y, **kwargs)
+        ax.xaxis_date()
+        return line
+    return DecimatedLine(ax, x, y, **kwargs)
+
+# Labelled decimated lines on one axis, updated in place: update() only touches the
+# lines whose data changed, adds new ones and removes the ones no longer given, so a
+# re-run that changed one indicator redraws one line instead of the whole figure.
+class LineSet:
+    def __init__(self, ax):
+        self.ax = ax
+        self.lines = {}  # Label -> DecimatedLine
+
+    # series: {label: y} against x, styles: optional {label: plot keyword arguments};
+    # returns the number of lines replotted
+    def update(self, x, series, styles=None):
+        dates = pd.api.types.is_datetime64_any_dtype(x)
+        x = np.asarray(mdates.date2num(x) if dates else x, dtype=float)
+        changed = 0
+        for label in [label for label in self.lines if label not in series]:
+            self.lines.pop(label).remove()
+            changed += 1
+        for label, y in series.items():
+            y = np.asarray(y, dtype=float)
+            line = self.lines.get(label)
+            if line is None:
+                self.lines[label] = DecimatedLine(self.ax, x, y, label=label, **(styles or {}).get(label, {}))
+            elif np.array_equal(line.x, x) and np.array_equal(line.y, y, equal_nan=True):
+                continue
+            else:
+                line.set_data(x, y)
+            changed += 1
+        if dates:
+            self.ax.xaxis_date()
+        if changed:
+            self.ax.relim()
+            self.ax.autoscale_view()
+        return changed
+
+# Fan chart of a Monte Carlo result's fan DataFrame (equity quantiles by bar, plus
+# the observed equity): the outer and inner quantile bands, the median and the backtest
+def plot_fan(ax, fan):
+    x = fan.index.to_numpy()
+    quantiles = [column for column in fan.columns if column != "observed"]
+    outer, inner, median = (quantiles[0], quantiles[-1]), (quantiles[1], quantiles[-2]), quantiles[len(quantiles) // 2]
+    ax.fill_between(x, fan[outer[0]], fan[outer[1]], color="tab:blue", alpha=0.15, linewidth=0,
+                    label=f"{outer[0]:.0%} to {outer[1]:.0%}")
+    ax.fill_between(x, fan[inner[0]], fan[inner[1]], color="tab:blue", alpha=0.3, linewidth=0,
+                    label=f"{inner[0]:.0%} to {inner[1]:.0%}")
+    ax.plot(x, fan[median], color="tab:blue", label="Median Path")
+    ax.plot(x, fan["observed"], color="black", linewidth=1, label="Backtest")
@@ -0,0 +1,180 @@
+import itertools
+import multiprocessing
+import queue
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+
+from tradewhiz_ledger import TradeLedger
+from tradewhiz_profile import RunProfile
+from tradewhiz_store import ResultStore, memoized_backtest
+from tradewhiz_strategies import SMACrossover
+
+# Persistent backtest worker pool. Jobs are queued on a process pool, so CPU-heavy
+# Cerebro runs escape the GIL and several configurations run side by side. Workers
+# report progress through a multiprocessing queue and check a shared set of
+# cancelled job ids at every progress report; a queued job is cancelled before it
+# starts, a running one stops at its next report (every 0.5% of the bars).
+# The owner calls poll() regularly (the GUI from a QTimer) to collect progress and
+# finished jobs. The metrics, the equity curve, the fills and the close and indicator
+# columns for the chart all travel back from the worker; the executor unpickles them on
+# its own thread, so poll() never reads bars or computes indicators on the owner's
+# (GUI) thread.
+
+class JobCancelled(Exception):
+    pass
+
+_job_ids = itertools.count(1)
+
+class BacktestJob:
+    STATUSES = ("queued", "running", "done", "failed", "cancelled")
+
+    def __init__(self, stock_symbol, start_date, end_date, short_sma_period, long_sma_period, starting_cash,
+                 engine="cerebro", offline=False, use_cprofile=False, interval="1d", base_interval=None, execution=None,
+                 strategy=None):
+        self.job_id = next(_job_ids)
+        self.stock_symbol = stock_symbol
+        self.start_date = start_date
+        self.end_date = end_date
+        self.short_sma_period = short_sma_period
+        self.long_sma_period = long_sma_period
+        self.starting_cash = starting_cash
+        self.engine = engine
+        self.offline = offline
+        self.interval = interval
+        self.base_interval = base_interval
+        self.execution = execution
+        self.strategy = strategy or SMACrossover(short_sma_period, long_sma_period)
+        self.status = "queued"
+        self.progress = 0.0
+        self.cached = False
+        self.error = None
+        self.ledger = None  # TradeLedger of the finished run
+        self.profile = RunProfile(f"{stock_symbol} {start_date}..{end_date} {interval} {self.strategy.tag} {engine}", use_cprofile)
+
+    @property
+    def description(self):
+        return f"{self.stock_symbol} {self.interval} {self.strategy.tag} {self.engine}"
+
+# Worker side: the progress queue and the cancelled set arrive once through the pool initializer
+_worker = {}
+
+def _init_worker(progress_queue, cancelled):
+    _worker["queue"] = progress_queue
+    _worker["cancelled"] = cancelled
+
+class _ProgressReporter:
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.last = -1.0
+
+    def __call__(self, fraction):
+        # Only every whole percent goes through the queue and the cancel check
+        if fraction - self.last < 0.01 and fraction < 1.0:
+            return
+        self.last = fraction
+        if self.job_id in _worker["cancelled"]:
+            raise JobCancelled()
+        _worker["queue"].put((self.job_id, fraction))
+
+def _run_job(job, store_path):
+    reporter = _ProgressReporter(job.job_id)
+    reporter(0.0)  # Also reports the job as running
+    job.profile.start_cprofile()
+    job.ledger = TradeLedger()
+    try:
+        result, job.cached = memoized_backtest(
+            ResultStore(store_path), job.stock_symbol, job.start_date, job.end_date, job.short_sma_period,
+            job.long_sma_period, job.starting_cash, job.engine, job.offline, job.profile, reporter, job.interval, job.base_interval,
+            job.execution, job.strategy, job.ledger
+        )
+    finally:
+        job.profile.stop_cprofile()
+    return job, result
+
+class BacktestPool:
+    def __init__(self, max_workers=None, store_path=None):
+        self.max_workers = max_workers or max(multiprocessing.cpu_count() - 1, 1)
+        self.store_path = store_path
+        self.executor = None
+        self.jobs = {}  # job_id -> (job, future) for unfinished jobs
+
+    # The processes (and the manager holding the cancelled set) start with the first job
+    def _start(self):
+        self.manager = multiprocessing.Manager()
+        self.cancelled = self.manager.dict()
+        self.progress_queue = self.manager.Queue()
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.max_workers, initializer=_init_worker, initargs=(self.progress_queue, self.cancelled)
+        )
+
+    def submit(self, job):
+        if self.executor is None:
+            self._start()
+        self.jobs[job.job_id] = (job, self.executor.submit(_run_job, job, self.store_path))
+        return job
+
+    def cancel(self, job_id):
+        if job_id not in self.jobs:
+            return
+        job, future = self.jobs[job_id]
+        if not future.cancel():
+            self.cancelled[job_id] = True  # Already running: stop at the next progress report
+
+    # Whether a running job was asked to stop and has not finished yet. Cerebro stops
+    # within a moment; the fast engine runs in one vectorized pass without progress
+    # reports, so a fast job only stops between its stages and usually finishes first.
+    def cancelling(self, job_id):
+        return job_id in self.jobs and job_id in self.cancelled
+
+    def cancel_all(self):
+        for job_id in list(self.jobs):
+            self.cancel(job_id)
+
+    @property
+    def pending(self):
+        return len(self.jobs)
+
+    # Collect progress and finished jobs: returns (updated jobs, [(job, result) of finished jobs])
+    def poll(self):
+        updated = {}
+        if self.executor is None:
+            return [], []
+        while True:
+            try:
+                job_id, fraction = self.progress_queue.get_nowait()
+            except queue.Empty:
+                break
+            if job_id in self.jobs:
+                job = self.jobs[job_id][0]
+                job.status = "running"
+                job.progress = fraction
+                updated[job_id] = job
+
+        finished = []
+        for job_id, (job, future) in list(self.jobs.items()):
+            if not future.done():
+                continue
+            del self.jobs[job_id]
+            self.cancelled.pop(job_id, None)
+            result = None
+            try:
+                worker_job, result = future.result()
+                job.cached = worker_job.cached
+                job.profile = worker_job.profile
+                job.ledger = worker_job.ledger
+                job.progress = 1.0
+                job.status = "done"
+            except (CancelledError, JobCancelled):
+                job.status = "cancelled"
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+            updated.pop(job_id, None)
+            finished.append((job, result))
+        return list(updated.values()), finished
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.cancel_all()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.manager.shutdown()
+            self.executor = None
@@ -0,0 +1,149 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from tradewhiz_core import PriceCache
+from tradewhiz_sources import YahooSource, backoff_delay
+
+# Prefetch of a universe of tickers into the price cache, e.g. overnight. Symbols
+# missing the same date range are fetched together, batch_size per request, with
+# max_workers requests in flight. Symbols a request failed for are retried, in
+# smaller and smaller requests, with exponential backoff; a symbol is only written
+# to the cache once all its missing ranges arrived, so a failure never leaves a gap
+# in the covered range. Every symbol ends with a status row:
+#   cached: nothing new was missing, downloaded: the missing bars were added,
+#   no data: the source has no bars for the symbol in the range,
+#   failed: the source failed for the symbol (see error), cancelled: not fetched
+
+STATUS_COLUMNS = ["symbol", "status", "bars", "attempts", "error"]
+
+class Prefetcher:
+    # source: a tradewhiz_sources.PriceSource, Yahoo Finance by default
+    # batch_size: symbols per request, the source's default when None
+    # retries: extra attempts for the symbols of a request that failed; backoff: seconds before the first retry
+    def __init__(self, source=None, interval="1d", cache_dir=None, batch_size=None, max_workers=4, retries=3, backoff=1.0):
+        self.source = source or YahooSource()
+        self.interval = interval
+        self.cache = PriceCache(cache_dir, source=self.source, interval=interval)
+        self.batch_size = max(1, batch_size or self.source.batch_size)
+        self.max_workers = max(1, max_workers)
+        self.retries = retries
+        self.backoff = backoff
+
+    # Fetch the symbols of one batch for one range. Returns ({symbol: DataFrame},
+    # {symbol: error} and {symbol: attempts})
+    def fetch_batch(self, symbols, start_date, end_date, cancelled=None):
+        fetched, errors, attempts = {}, {}, {}
+        pending = list(symbols)
+        for attempt in range(1, self.retries + 2):
+            if attempt > 1:
+                time.sleep(backoff_delay(attempt - 1, self.backoff))
+            if cancelled is not None and cancelled():
+                errors.update((symbol, "cancelled") for symbol in pending)
+                break
+            # Retries go out in halved requests, so one bad symbol fails fewer others
+            size = max(1, -(-len(pending) // 2 ** (attempt - 1)))
+            retry = []
+            for i in range(0, len(pending), size):
+                chunk = pending[i:i + size]
+                try:
+                    results, error = self.source.fetch(chunk, start_date, end_date, self.interval), "no data returned"
+                except Exception as e:
+                    results, error = {}, str(e) or type(e).__name__
+                for symbol in chunk:
+                    attempts[symbol] = attempt
+                    result = results.get(symbol)
+                    if result is None:
+                        errors[symbol] = error
+                        retry.append(symbol)
+                    elif isinstance(result, Exception):
+                        errors[symbol] = str(result)  # Permanent, e.g. an unknown ticker
+                    else:
+                        errors.pop(symbol, None)
+                        fetched[symbol] = result
+            pending = retry
+            if not pending:
+                break
+        return fetched, errors, attempts
+
+    # Bring the cache of every symbol up to [start_date, end_date). progress, if given,
+    # is called with each symbol's status row as it is final; cancelled, if given, is
+    # polled before every request. Returns the status rows as a DataFrame, in the
+    # order of symbols.
+    def prefetch(self, symbols, start_date, end_date, progress=None, cancelled=None):
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in symbols if symbol.strip()))
+        rows = {}
+
+        def finish(symbol, status, data, attempts=0, error=""):
+            rows[symbol] = dict(symbol=symbol, status=status, bars=bars_in_range(data, start, end), attempts=attempts, error=error)
+            if progress is not None:
+                progress(rows[symbol])
+
+        # What each symbol misses, grouped by range
+        plans, groups = {}, {}
+        for symbol in symbols:
+            data, covered_start, covered_end = self.cache.load(symbol)
+            missing, covered_start, covered_end = self.cache.missing_ranges(start, end, covered_start, covered_end)
+            if not missing:
+                finish(symbol, "cached", data)
+                continue
+            plans[symbol] = dict(data=data, covered_start=covered_start, covered_end=covered_end, ranges=len(missing),
+                                 fetched=[], attempts=0, error="", request=(start, end))
+            for fetch_range in missing:
+                groups.setdefault(fetch_range, []).append(symbol)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {}
+            for (fetch_start, fetch_stop), group in groups.items():
+                for i in range(0, len(group), self.batch_size):
+                    batch = group[i:i + self.batch_size]
+                    future = pool.submit(
+                        self.fetch_batch, batch, fetch_start.strftime("%Y-%m-%d"), fetch_stop.strftime("%Y-%m-%d"), cancelled
+                    )
+                    futures[future] = batch
+            # The cache is written from this thread only, as each symbol completes
+            for future in as_completed(futures):
+                fetched, errors, attempts = future.result()
+                for symbol in futures[future]:
+                    plan = plans[symbol]
+                    plan["attempts"] = max(plan["attempts"], attempts.get(symbol, 0))
+                    if symbol in errors:
+                        plan["error"] = plan["error"] or errors[symbol]
+                    else:
+                        plan["fetched"].append(fetched[symbol])
+                    plan["ranges"] -= 1
+                    if plan["ranges"] == 0:
+                        self._complete(symbol, plan, finish)
+        return pd.DataFrame([rows[symbol] for symbol in symbols], columns=STATUS_COLUMNS)
+
+    def _complete(self, symbol, plan, finish):
+        data = plan["data"]
+        if plan["error"]:
+            status = "cancelled" if plan["error"] == "cancelled" else "failed"
+            finish(symbol, status, data, plan["attempts"], plan["error"])
+            return
+        try:
+            data = self.cache.merge(symbol, data, plan["fetched"], plan["covered_start"], plan["covered_end"])
+        except OSError as e:
+            finish(symbol, "failed", data, plan["attempts"], f"Cache write failed: {e}")
+            return
+        if any(len(frame) for frame in plan["fetched"]):
+            status = "downloaded"
+        else:
+            status = "cached" if bars_in_range(data, *plan["request"]) else "no data"
+        finish(symbol, status, data, plan["attempts"])
+
+# Bars of data (None if nothing is cached) in [start, end)
+def bars_in_range(data, start, end):
+    if data is None or len(data) == 0:
+        return 0
+    if data.index.tz is not None:
+        start, end = start.tz_localize(data.index.tz), end.tz_localize(data.index.tz)
+    return int(data.index.searchsorted(end) - data.index.searchsorted(start))
+
+# One-line summary of a status DataFrame, e.g. "480 downloaded, 15 cached, 5 failed"
+def describe(status):
+    counts = status["status"].value_counts()
+    return ", ".join(f"{count} {name}" for name, count in counts.items()) or "no tickers"
@@ -0,0 +1,86 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+from contextlib import contextmanager
+
+# Run instrumentation: wall-clock time per pipeline stage, counters (bars processed,
+# orders issued, ...) and an optional cProfile capture of the whole run. One
+# RunProfile is passed down the pipeline; every function that takes profile=None
+# skips the bookkeeping when none is given.
+
+PERFORMANCE_LOG = "performance_log.jsonl"
+
+class RunProfile:
+    def __init__(self, label="", use_cprofile=False):
+        self.label = label
+        self.stages = {}  # Stage name -> seconds, in the order the stages ran
+        self.counters = {}
+        self.use_cprofile = use_cprofile
+        self.profiler = None
+        self.profile_text = ""
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + int(amount)
+
+    # cProfile covers the calling thread only, so start and stop it on the thread (or worker
+    # process) that runs the backtest. The profiler is dropped once stopped, which keeps
+    # the RunProfile picklable.
+    def start_cprofile(self):
+        if self.use_cprofile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop_cprofile(self, top=25):
+        if self.profiler is None:
+            return
+        self.profiler.disable()
+        stream = io.StringIO()
+        pstats.Stats(self.profiler, stream=stream).sort_stats("cumulative").print_stats(top)
+        self.profile_text = stream.getvalue()
+        self.profiler = None
+
+    @property
+    def total_seconds(self):
+        return sum(self.stages.values())
+
+    def summary(self):
+        stages = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.stages.items())
+        counters = ", ".join(f"{name} {value:,}" for name, value in self.counters.items())
+        return f"Total {self.total_seconds:.3f}s ({stages})" + (f"\nCounters: {counters}" if counters else "")
+
+    def to_dict(self):
+        return {
+            "label": self.label,
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "total_seconds": self.total_seconds,
+            "stages": dict(self.stages),
+            "counters": dict(self.counters),
+            "cprofile": self.profile_text or None,
+        }
+
+    # Append one JSON line per run, so the log can be read line by line or with pandas.read_json(lines=True)
+    def write_log(self, path=None):
+        path = path or os.path.join(os.getcwd(), PERFORMANCE_LOG)
+        with open(path, "a") as f:
+            f.write(json.dumps(self.to_dict()) + "\n")
+        return path
+
+# Context manager for optional profiles: times the stage when a profile is given, does nothing otherwise
+@contextmanager
+def stage(profile, name):
+    if profile is None:
+        yield
+    else:
+        with profile.stage(name):
+            yield
@@ -0,0 +1,229 @@
+import io
+import os
+
+import numpy as np
+from matplotlib.figure import Figure
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Preformatted, Spacer, Table, TableStyle, Image, PageBreak
+
+from tradewhiz_ledger import summary_rows as trade_summary_rows, trade_summary
+from tradewhiz_montecarlo import describe as describe_monte_carlo, summary_rows as monte_carlo_rows
+from tradewhiz_plot import plot_decimated, plot_fan
+
+# PDF report generation without the GUI. Charts are drawn on standalone Agg figures
+# and rendered into in-memory PNG buffers, so reports can be built on a worker
+# thread or process and in batches, without temporary files.
+
+MAX_IMAGE_WIDTH = 500  # Max width for the image
+MAX_IMAGE_HEIGHT = 690  # Max height for the image
+MAX_TRADE_ROWS = 500  # Trades listed in the report; the full ledger is exported to CSV or Parquet
+
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+# Render a figure to PNG bytes; high DPI for sharp text
+def figure_to_png(figure, dpi=300):
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png", dpi=dpi, bbox_inches='tight')
+    buffer.seek(0)
+    return buffer
+
+def render_equity_chart(equity_curve, dpi=300):
+    figure = Figure(dpi=dpi)
+    ax = figure.add_subplot(111)
+    plot_decimated(ax, np.arange(len(equity_curve)), equity_curve, label="Equity Curve")
+    ax.set_title("Equity Curve")
+    ax.set_xlabel("Time")
+    ax.set_ylabel("Portfolio Value")
+    ax.legend()
+    return figure_to_png(figure, dpi)
+
+def render_price_chart(price_data, dpi=300):
+    figure = Figure(dpi=dpi)
+    ax = figure.add_subplot(111)
+    plot_decimated(ax, price_data.index, price_data["close"].to_numpy(), label="Close Price", alpha=0.8)
+    overlays = [column for column in price_data.columns if column != "close"]
+    for column in overlays:
+        plot_decimated(ax, price_data.index, price_data[column].to_numpy(), label=column, linestyle="--")
+    ax.set_title("Price with " + ", ".join(overlays) if overlays else "Price")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Price")
+    ax.legend()
+    return figure_to_png(figure, dpi)
+
+def render_fan_chart(monte_carlo, dpi=300):
+    figure = Figure(dpi=dpi)
+    ax = figure.add_subplot(111)
+    plot_fan(ax, monte_carlo["fan"])
+    ax.set_title(f"Monte Carlo Equity Paths ({describe_monte_carlo(monte_carlo)})")
+    ax.set_xlabel("Time")
+    ax.set_ylabel("Portfolio Value")
+    ax.legend(loc="upper left")
+    return figure_to_png(figure, dpi)
+
+# Resize the image proportionally to fit within the page (max size)
+def fit_image(buffer):
+    image = Image(buffer)
+    aspect_ratio = image.imageWidth / image.imageHeight
+    if image.imageWidth > MAX_IMAGE_WIDTH:
+        image.drawWidth = MAX_IMAGE_WIDTH
+        image.drawHeight = MAX_IMAGE_WIDTH / aspect_ratio
+    else:
+        image.drawHeight = min(image.imageHeight, MAX_IMAGE_HEIGHT)
+        image.drawWidth = image.drawHeight * aspect_ratio
+    return image
+
+def make_table(rows, repeat_rows=0):
+    table = Table(rows, hAlign="LEFT", repeatRows=repeat_rows)
+    table.setStyle(TABLE_STYLE)
+    return table
+
+def _format_date(value):
+    return str(value.date()) if value == value.normalize() else str(value)
+
+# Table rows (with a header row) of the first MAX_TRADE_ROWS trades
+def trade_rows(trades):
+    dated = "entry_date" in trades.columns
+    rows = [["Entry", "Exit", "Shares", "Entry Price", "Exit Price", "PnL ($)", "Return", "Bars Held", "Status"]]
+    for trade in trades.head(MAX_TRADE_ROWS).itertuples(index=False):
+        rows.append([
+            _format_date(trade.entry_date) if dated else str(trade.entry_bar),
+            _format_date(trade.exit_date) if dated else str(trade.exit_bar),
+            f"{trade.shares:,.0f}", f"{trade.entry_price:,.2f}", f"{trade.exit_price:,.2f}", f"{trade.pnl:,.2f}",
+            f"{trade.trade_return:.2%}", str(trade.bars_held), trade.status,
+        ])
+    return rows
+
+# Build one backtest report. report is a dict with:
+#   parameters: list of (name, value) rows, results: list of (name, value) rows,
+#   equity_curve: sequence of portfolio values, price_data: DataFrame with the close and the
+#   strategy's chart overlays (column names are the labels),
+#   performance (optional): RunProfile.to_dict() of the run,
+#   monte_carlo (optional): tradewhiz_montecarlo.monte_carlo() result of the run,
+#   trades (optional): TradeLedger.trades() DataFrame of the run
+# progress, if given, is called as progress(percent, message).
+def build_report(file_path, report, progress=None, dpi=300):
+    progress = progress or (lambda percent, message: None)
+
+    progress(10, "Rendering equity curve...")
+    equity_png = render_equity_chart(report["equity_curve"], dpi)
+    progress(40, "Rendering price chart...")
+    price_png = render_price_chart(report["price_data"], dpi)
+    monte_carlo = report.get("monte_carlo")
+    if monte_carlo:
+        progress(55, "Rendering Monte Carlo fan chart...")
+        fan_png = render_fan_chart(monte_carlo, dpi)
+    progress(70, "Building PDF...")
+
+    # Create a PDF document
+    pdf = SimpleDocTemplate(
+        file_path, pagesize=letter, rightMargin=40, leftMargin=40, topMargin=60, bottomMargin=30
+    )
+
+    # Styles
+    styles = getSampleStyleSheet()
+    title_style = styles['Title']
+    heading_style = styles['Heading2']
+    normal_style = styles['BodyText']
+
+    # Title Page
+    elements = []
+
+    logo_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logo.png")
+    if os.path.exists(logo_path):
+        elements.append(Image(logo_path, width=100, height=50))
+        elements.append(Spacer(1, 12))
+    elements.append(Paragraph("TradeWhiz 9.11 Backtest Report", title_style))
+    elements.append(Spacer(1, 12))
+    elements.append(Paragraph("© SIG Labs 2024 | by peterdeceuster.uk", normal_style))
+    elements.append(Spacer(1, 24))
+
+    # Backtest Parameters
+    elements.append(Paragraph("Backtest Parameters", heading_style))
+    elements.append(make_table([["Parameter", "Value"]] + [list(row) for row in report["parameters"]]))
+    elements.append(Spacer(1, 24))
+
+    # Backtest Results
+    if report.get("results"):
+        elements.append(Paragraph("Backtest Results", heading_style))
+        elements.append(make_table([["Metric", "Value"]] + [list(row) for row in report["results"]]))
+        elements.append(Spacer(1, 24))
+
+    # Stage timings and counters of the run, with the cProfile output if it was captured
+    performance = report.get("performance")
+    if performance:
+        elements.append(Paragraph("Performance", heading_style))
+        rows = [["Stage", "Seconds"]] + [[name, f"{seconds:.4f}"] for name, seconds in performance["stages"].items()]
+        rows.append(["Total", f"{performance['total_seconds']:.4f}"])
+        elements.append(make_table(rows))
+        if performance["counters"]:
+            elements.append(Spacer(1, 12))
+            elements.append(make_table([["Counter", "Value"]] + [[name, f"{value:,}"] for name, value in performance["counters"].items()]))
+        if performance.get("cprofile"):
+            elements.append(Spacer(1, 12))
+            code_style = ParagraphStyle("Profile", parent=styles["Code"], fontSize=5, leading=6)
+            elements.append(Preformatted(performance["cprofile"].strip(), code_style, maxLineLength=160))
+        elements.append(Spacer(1, 24))
+
+    # Add Graphs - One per page
+    elements.append(Paragraph("Equity Curve", heading_style))
+    elements.append(fit_image(equity_png))
+    elements.append(Spacer(1, 12))
+    elements.append(PageBreak())
+
+    elements.append(Paragraph("Price and Indicators", heading_style))
+    elements.append(fit_image(price_png))
+
+    # Trade statistics, then the trade list
+    trades = report.get("trades")
+    if trades is not None:
+        elements.append(PageBreak())
+        elements.append(Paragraph("Trades", heading_style))
+        elements.append(make_table(trade_summary_rows(trade_summary(trades))))
+        if len(trades):
+            elements.append(Spacer(1, 12))
+            if len(trades) > MAX_TRADE_ROWS:
+                elements.append(Paragraph(f"The first {MAX_TRADE_ROWS:,} of {len(trades):,} trades:", normal_style))
+            table = make_table(trade_rows(trades), repeat_rows=1)
+            table.setStyle(TableStyle([("FONTSIZE", (0, 0), (-1, -1), 7)]))  # Intraday dates are long
+            elements.append(table)
+
+    # Confidence intervals over the resampled paths, then their fan chart
+    if monte_carlo:
+        elements.append(PageBreak())
+        elements.append(Paragraph("Monte Carlo Robustness", heading_style))
+        elements.append(Paragraph(describe_monte_carlo(monte_carlo), normal_style))
+        elements.append(Spacer(1, 12))
+        elements.append(make_table(monte_carlo_rows(monte_carlo)))
+        elements.append(Spacer(1, 12))
+        elements.append(fit_image(fan_png))
+
+    # Build PDF
+    pdf.build(elements)
+    progress(100, f"Report saved to {file_path}")
+    return file_path
+
+# Build a report per finished run into directory; returns (file_path, error) per run
+def build_reports(directory, reports, progress=None, dpi=300):
+    progress = progress or (lambda percent, message: None)
+    os.makedirs(directory, exist_ok=True)
+    results = []
+    for i, report in enumerate(reports):
+        file_path = os.path.join(directory, report.get("file_name") or f"report_{i + 1}.pdf")
+        progress(int(100 * i / len(reports)), f"Building report {i + 1} of {len(reports)}: {os.path.basename(file_path)}")
+        try:
+            build_report(file_path, report, dpi=dpi)
+            results.append((file_path, None))
+        except Exception as e:
+            results.append((file_path, str(e)))
+    progress(100, f"{sum(error is None for _, error in results)} of {len(reports)} reports saved to {directory}")
+    return results
@@ -0,0 +1,230 @@
+import csv
+import sys
+
+import numpy as np
+import pandas as pd
+
+import tradewhiz_metrics
+from tradewhiz_core import INTERVALS, PriceCache, resample_bars
+from tradewhiz_profile import stage
+
+# Cross-sectional screener: the SMA crossover state of a whole universe of tickers at
+# once. The closes of all tickers are read from the price cache into one dates x
+# tickers matrix, and every statistic is computed over the whole matrix in one pass:
+# the short and long SMAs, the current state (long while the short SMA is above the
+# long SMA), the bars since the last crossover, and the metrics of the strategy over
+# the last lookback bars. The trailing backtest is signal only: it holds the state of
+# each close over the next bar, close to close and without commissions, whereas the
+# engines fill at the next open and charge them. Its return is therefore reported as
+# signal_return, not as the result of a backtest; backtest a ticker for that.
+
+SCREEN_COLUMNS = [
+    "symbol", "state", "bars_since_cross", "last_cross", "close", "short_sma", "long_sma", "sma_spread", "signal_return",
+    "buy_hold_return", "sharpe_ratio", "max_drawdown", "trades", "exposure", "bars", "status"
+]
+
+# Tickers of a universe file: one per line (or comma separated), or a CSV file with a
+# ticker or symbol column
+def read_universe(path):
+    with open(path, "r", newline="") as f:
+        text = f.read()
+    header = text.splitlines()[0].lower().split(",") if text.strip() else []
+    column = next((name for name in ("ticker", "symbol") if name in (field.strip() for field in header)), None)
+    if column is not None:
+        rows = csv.DictReader(text.splitlines())
+        rows.fieldnames = [field.strip().lower() for field in rows.fieldnames]
+        tickers = [row[column] or "" for row in rows]
+    else:
+        tickers = text.replace(",", " ").split()
+    return list(dict.fromkeys(ticker.strip().upper() for ticker in tickers if ticker.strip()))
+
+# Closes of the tickers from the price cache as a dates x tickers DataFrame, one column
+# per ticker in the given order, on the union of their dates; tickers without cached
+# bars are all-NaN columns. With base_interval, the closes are resampled from the cache
+# of that shorter interval.
+def close_matrix(stock_symbols, start_date, end_date, interval="1d", base_interval=None, cache_dir=None):
+    resample = base_interval not in (None, interval)
+    if resample and (INTERVALS[interval] <= INTERVALS[base_interval] or INTERVALS[interval] % INTERVALS[base_interval]):
+        raise ValueError(f"Cannot build {interval} bars from {base_interval} bars.")
+    cache = PriceCache(cache_dir, offline=True, interval=base_interval or interval)
+
+    # Only the close column of each ticker is read, as plain arrays: building a
+    # DataFrame per ticker would take longer than the screen itself
+    closes, tz = {}, None
+    for symbol in stock_symbols:
+        loaded = cache.load_column(symbol, "close")
+        if loaded is None:
+            continue
+        stamps, values, symbol_tz = loaded
+        rows = slice(*stamps.searchsorted([_utc(start_date, symbol_tz), _utc(end_date, symbol_tz)]))
+        stamps, values = stamps[rows], values[rows]
+        if resample:
+            index = pd.DatetimeIndex(stamps)
+            index = index.tz_localize("UTC").tz_convert(symbol_tz) if symbol_tz is not None else index
+            close = resample_bars(pd.DataFrame({"close": values}, index=index), interval)["close"]
+            # Daily bars get a plain date index
+            symbol_tz = close.index.tz
+            index = close.index.tz_convert("UTC").tz_localize(None) if symbol_tz is not None else close.index
+            stamps, values = index.as_unit("ns").to_numpy(), close.to_numpy()
+        if len(stamps):
+            closes[symbol] = (stamps, values)
+            tz = tz or symbol_tz
+
+    # Scatter each ticker's closes into its rows of the union of the dates
+    union = np.unique(np.concatenate([stamps for stamps, _ in closes.values()])) if closes else np.empty(0, dtype="datetime64[ns]")
+    matrix = np.full((len(union), len(stock_symbols)), np.nan)
+    for column, symbol in enumerate(stock_symbols):
+        if symbol in closes:
+            stamps, values = closes[symbol]
+            matrix[union.searchsorted(stamps), column] = values
+    index = pd.DatetimeIndex(union)
+    if tz is not None:
+        index = index.tz_localize("UTC").tz_convert(tz)
+    return pd.DataFrame(matrix, index=index, columns=list(stock_symbols))
+
+# A date as UTC datetime64[ns], for the timestamps of PriceCache.load_column
+def _utc(date, tz):
+    timestamp = pd.Timestamp(date)
+    if tz is not None:
+        timestamp = timestamp.tz_localize(tz).tz_convert("UTC").tz_localize(None)
+    return timestamp.as_unit("ns").to_datetime64()
+
+# Rolling means of every period over all columns of a 2-D array at once, NaN until
+# period values are in the window (like pandas' rolling mean, which loops over the
+# columns). Computed from shared cumulative sums, so they equal the backtests' SMAs up
+# to rounding. Returns one array per period.
+def rolling_means(values, *periods):
+    n = len(values)
+    valid = ~np.isnan(values)
+    sums = np.zeros((n + 1, values.shape[1]))
+    np.cumsum(np.where(valid, values, 0.0), axis=0, out=sums[1:])
+    counts = np.zeros((n + 1, values.shape[1]), dtype=np.int64)
+    np.cumsum(valid, axis=0, out=counts[1:])
+    results = []
+    for period in periods:
+        means = np.full(values.shape, np.nan)
+        if n >= period:
+            full = counts[period:] - counts[:-period] == period
+            means[period - 1:] = np.where(full, (sums[period:] - sums[:-period]) / period, np.nan)
+        results.append(means)
+    return results
+
+# Screen a close matrix from close_matrix(). lookback: bars of the trailing backtest.
+# Returns one row per ticker (SCREEN_COLUMNS), in the order of the matrix columns.
+def screen(closes, short_sma_period, long_sma_period, lookback=252, periods_per_year=tradewhiz_metrics.TRADING_DAYS):
+    bars = closes.notna().sum().to_numpy()
+    # Tickers missing a day of the common calendar (e.g. a halt) keep their last close;
+    # after a ticker's last bar (e.g. delisted) there are no prices
+    prices = closes.ffill().where(closes.bfill().notna())
+    close = prices.to_numpy()
+    n = len(close)
+    short_sma, long_sma = rolling_means(close, short_sma_period, long_sma_period)
+
+    # State per bar and ticker: 1 = long, 0 = flat, carried forward while the SMAs are equal
+    with np.errstate(invalid="ignore"):
+        signal = np.where(short_sma > long_sma, 1.0, np.where(short_sma < long_sma, 0.0, np.nan))
+    state = pd.DataFrame(signal).ffill().to_numpy()
+
+    # Last bar the state changed on
+    crossed = np.zeros(state.shape, dtype=bool)
+    crossed[1:] = (state[1:] != state[:-1]) & ~np.isnan(state[1:]) & ~np.isnan(state[:-1])
+    has_cross = crossed.any(axis=0)
+    last_cross = n - 1 - crossed[::-1].argmax(axis=0) if n else np.zeros(close.shape[1], dtype=int)
+
+    trailing = _trailing_backtest(close, state, lookback, periods_per_year)
+
+    last = (lambda values: values[-1]) if n else (lambda values: np.full(close.shape[1], np.nan))
+    current = last(state)
+    stale = (bars > 0) & np.isnan(last(close))
+    ok = ~np.isnan(last(long_sma)) & ~np.isnan(current)
+    result = pd.DataFrame({
+        "symbol": closes.columns,
+        "state": np.where(current == 1.0, "long", np.where(current == 0.0, "flat", "")),
+        "bars_since_cross": np.where(has_cross, n - 1 - last_cross, np.nan),
+        "last_cross": closes.index[last_cross].where(has_cross) if n else pd.NaT,
+        "close": last(close),
+        "short_sma": last(short_sma),
+        "long_sma": last(long_sma),
+        "sma_spread": last(short_sma) / last(long_sma) - 1.0 if n else np.nan,
+        **trailing,
+        "bars": bars,
+        "status": np.where(ok, "ok", np.where(stale, "stale", np.where(bars > 0, "insufficient data", "no data"))),
+    }, columns=SCREEN_COLUMNS)
+    # Metrics of tickers without a state are meaningless
+    metrics = ["bars_since_cross", "close", "short_sma", "long_sma", "sma_spread", "signal_return", "buy_hold_return",
+               "sharpe_ratio", "max_drawdown", "trades", "exposure"]
+    result.loc[~ok, metrics] = np.nan
+    result.loc[~ok, "last_cross"] = pd.NaT
+    result.loc[~ok, "state"] = ""
+    return result
+
+# Signal-only metrics of the strategy over the last lookback bars of every ticker
+# (columns of close and state): the state of each close is held over the next bar,
+# close to close, without commissions
+def _trailing_backtest(close, state, lookback, periods_per_year):
+    n, tickers = close.shape
+    window = min(lookback, n - 1)
+    if window < 1:
+        return {name: np.full(tickers, np.nan) for name in
+                ("signal_return", "buy_hold_return", "sharpe_ratio", "max_drawdown", "trades", "exposure")}
+    recent = close[n - window - 1:]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = np.nan_to_num(recent[1:] / recent[:-1] - 1.0)
+    position = np.nan_to_num(state[n - window - 1:n - 1])
+    strategy_returns = position * returns
+    equity = np.vstack([np.ones((1, tickers)), np.cumprod(1.0 + strategy_returns, axis=0)])
+    mean, std = strategy_returns.mean(axis=0), strategy_returns.std(axis=0)
+    # Tickers listed within the window are held from their first close
+    first = pd.DataFrame(recent).bfill().to_numpy()[0]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "signal_return": equity[-1] - 1.0,
+            "buy_hold_return": recent[-1] / first - 1.0,
+            "sharpe_ratio": np.where(std > 0, mean / std * np.sqrt(periods_per_year), np.nan),
+            "max_drawdown": (1.0 - equity / np.maximum.accumulate(equity, axis=0)).max(axis=0),
+            "trades": (np.diff(position, axis=0, prepend=0.0) > 0).sum(axis=0),
+            "exposure": position.mean(axis=0),
+        }
+
+# Screen a universe: prefetch the missing bars (unless offline), read the closes from
+# the cache and screen them. prefetcher: a tradewhiz_prefetch.Prefetcher for the
+# interval that is read, one with the defaults (Yahoo Finance) when None; progress and
+# cancelled are passed to its prefetch(). Tickers that failed to download and have no
+# cached bars get the download error as their status. profile: optional RunProfile
+# for the stage timings.
+def screen_universe(stock_symbols, start_date, end_date, short_sma_period, long_sma_period, lookback=252, interval="1d",
+                    base_interval=None, offline=False, prefetcher=None, profile=None, progress=None, cancelled=None):
+    stock_symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in stock_symbols if symbol.strip()))
+    failed = {}
+    if not offline:
+        from tradewhiz_prefetch import Prefetcher, describe
+
+        prefetcher = prefetcher or Prefetcher(interval=base_interval or interval)
+        with stage(profile, "download"):
+            status = prefetcher.prefetch(stock_symbols, start_date, end_date, progress, cancelled)
+        print(f"Prefetched {len(stock_symbols)} tickers: {describe(status)}", file=sys.stderr)
+        failed = {row.symbol: row.error for row in status.itertuples() if row.status == "failed"}
+    with stage(profile, "load"):
+        closes = close_matrix(
+            stock_symbols, start_date, end_date, interval, base_interval, prefetcher.cache.cache_dir if prefetcher else None
+        )
+    with stage(profile, "screen"):
+        result = screen(closes, short_sma_period, long_sma_period, lookback, tradewhiz_metrics.periods_per_year(interval))
+    for row in result.index[(result["status"] == "no data") & result["symbol"].isin(list(failed))]:
+        result.at[row, "status"] = f"download failed: {failed[result.at[row, 'symbol']]}"
+    if profile is not None:
+        profile.count("tickers", len(stock_symbols))
+        profile.count("bars", int(result["bars"].sum()))
+    return result
+
+# Screen rows as plain dicts (NaN as None, dates as text), e.g. for JSON output
+def to_records(result):
+    result = result.astype(object).where(result.notna(), None)
+    records = result.to_dict("records")
+    for record in records:
+        if record["last_cross"] is not None:
+            record["last_cross"] = str(record["last_cross"].date()) if record["last_cross"] == record["last_cross"].normalize() else str(record["last_cross"])
+        for key in ("bars_since_cross", "trades", "bars"):
+            if record[key] is not None:
+                record[key] = int(record[key])
+    return records
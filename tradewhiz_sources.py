@@ -0,0 +1,183 @@
+import io
+import os
+import random
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import pandas as pd
+
+# Price sources behind the price cache and the prefetcher. A source fetches the bars
+# of several symbols per request; Yahoo Finance is the default, and a directory of
+# CSV files or a local HTTP fixture server can stand in for it when testing or
+# working offline. Every source returns the same normalized columns (open, high,
+# low, close = adjusted close, volume).
+
+class DownloadError(Exception):
+    pass
+
+# Flatten and rename the yfinance columns to open/high/low/close/volume
+def normalize_yahoo(data):
+    # If the DataFrame has a MultiIndex, flatten it
+    if isinstance(data.columns, pd.MultiIndex):
+        # Flatten the MultiIndex and use the first level of the index (e.g., 'Adj Close', 'Close', etc.)
+        data.columns = [col[0] for col in data.columns]
+
+    # Rename columns to standardize them
+    data = data.rename(columns={
+        'Adj Close': 'close',
+        'Open': 'open',
+        'High': 'high',
+        'Low': 'low',
+        'Volume': 'volume'
+    })
+
+    # Ensure "close" column exists
+    if len(data) and "close" not in data.columns:
+        raise KeyError("The 'close' column is missing from the downloaded data. Verify the data source.")
+    return data
+
+# A source fetches symbols in batches of up to batch_size per request.
+# fetch() returns {symbol: DataFrame} for the symbols the request succeeded for (an
+# empty DataFrame when the symbol has no bars in the range). A symbol left out failed
+# and may be retried; a symbol mapped to an exception failed for good (e.g. an
+# unknown ticker) and is not retried. A failed request as a whole raises.
+class PriceSource:
+    name = ""
+    batch_size = 1
+
+    def fetch(self, symbols, start_date, end_date, interval="1d"):
+        raise NotImplementedError
+
+    # Bars of one symbol, with the signature PriceCache expects of its source
+    def __call__(self, stock_symbol, start_date, end_date, interval="1d"):
+        result = self.fetch([stock_symbol], start_date, end_date, interval).get(stock_symbol)
+        if result is None:
+            raise DownloadError(f"No data returned for {stock_symbol}")
+        if isinstance(result, Exception):
+            raise DownloadError(f"{stock_symbol}: {result}")
+        return result
+
+# Yahoo Finance through yfinance, many symbols per request. Yahoo only serves the
+# last 7 days of 1m bars and the last 60 days of 5m to 30m bars.
+class YahooSource(PriceSource):
+    name = "yahoo"
+
+    def __init__(self, batch_size=50, timeout=30):
+        self.batch_size = batch_size
+        self.timeout = timeout
+
+    def fetch(self, symbols, start_date, end_date, interval="1d"):
+        import yfinance as yf
+
+        # Requests run on the prefetcher's threads, so yfinance does not start its own.
+        # Adjusted and raw closes are both kept, as by the single-symbol download.
+        data = yf.download(
+            [symbol.upper() for symbol in symbols], start=start_date, end=end_date, interval=interval, group_by="ticker",
+            auto_adjust=False, threads=False, progress=False, timeout=self.timeout
+        )
+        # Older yfinance versions report failed symbols in a module-level dict; newer
+        # ones only log them and return no bars for them
+        errors = getattr(getattr(yf, "shared", None), "_ERRORS", None) or {}
+        tickers = data.columns.get_level_values(0) if isinstance(data.columns, pd.MultiIndex) else []
+        results = {}
+        for symbol in symbols:
+            if symbol.upper() in errors:
+                continue
+            if isinstance(data.columns, pd.MultiIndex):
+                if symbol.upper() not in tickers:
+                    continue
+                frame = data[symbol.upper()]
+            else:
+                frame = data
+            # Symbols of one request share the index, with empty rows where one has no bar
+            results[symbol] = normalize_yahoo(frame.dropna(how="all").copy())
+        return results
+
+# Daily or intraday bars of one symbol as a normalized DataFrame on [start, end), from CSV text or a file
+def read_csv_bars(source, start_date, end_date):
+    data = pd.read_csv(source, index_col=0, parse_dates=[0])
+    if "close" not in data.columns:
+        data = normalize_yahoo(data)
+    data = data.sort_index()
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    if data.index.tz is not None:
+        start, end = start.tz_localize(data.index.tz), end.tz_localize(data.index.tz)
+    return data.iloc[data.index.searchsorted(start):data.index.searchsorted(end)]
+
+# A directory of <SYMBOL>.csv (daily) or <SYMBOL>_<interval>.csv files with a date
+# index and Yahoo-style or normalized columns
+class CSVSource(PriceSource):
+    name = "csv"
+    batch_size = 100
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def fetch(self, symbols, start_date, end_date, interval="1d"):
+        results = {}
+        for symbol in symbols:
+            name = symbol.upper() if interval == "1d" else f"{symbol.upper()}_{interval}"
+            path = os.path.join(self.directory, f"{name}.csv")
+            try:
+                results[symbol] = read_csv_bars(path, start_date, end_date)
+            except FileNotFoundError as e:
+                results[symbol] = e
+        return results
+
+# CSV files served over HTTP, e.g. by a local fixture server. url is a template with
+# {symbol}, {start}, {end} and {interval}, e.g. http://127.0.0.1:8000/{symbol}.csv;
+# the bars are cut to the requested range whether or not the server does.
+class URLSource(PriceSource):
+    name = "url"
+
+    def __init__(self, url, timeout=30):
+        self.url = url
+        self.timeout = timeout
+
+    def fetch(self, symbols, start_date, end_date, interval="1d"):
+        results = {}
+        for symbol in symbols:
+            url = self.url.format(
+                symbol=urllib.parse.quote(symbol.upper()), start=start_date, end=end_date, interval=interval
+            )
+            try:
+                with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                    text = response.read().decode()
+            except urllib.error.HTTPError as e:
+                if e.code == 404:
+                    results[symbol] = e
+                    continue
+                raise
+            results[symbol] = read_csv_bars(io.StringIO(text), start_date, end_date)
+        return results
+
+# Seconds to wait before retry number attempt (from 1): exponential backoff with
+# jitter, so retries of concurrent requests do not arrive together
+def backoff_delay(attempt, backoff=1.0):
+    return backoff * 2 ** (attempt - 1) * random.uniform(0.75, 1.25)
+
+# Wrap a one-symbol source callable so failed requests are retried with backoff
+def with_retries(source, retries=3, backoff=1.0):
+    def fetch(*args, **kwargs):
+        for attempt in range(retries + 1):
+            try:
+                return source(*args, **kwargs)
+            except Exception as e:
+                if attempt == retries:
+                    raise DownloadError(f"Download failed after {retries + 1} attempts: {e}") from e
+                time.sleep(backoff_delay(attempt + 1, backoff))
+    return fetch
+
+# Source given on the command line or in the GUI: a directory of CSV files, a URL
+# template, or Yahoo Finance when empty
+def make_source(location=None):
+    if not location:
+        return YahooSource()
+    if location.startswith(("http://", "https://")):
+        return URLSource(location)
+    return CSVSource(location)
+
+def fetch_yahoo(stock_symbol, start_date, end_date, interval="1d"):
+    return YahooSource()(stock_symbol, start_date, end_date, interval)
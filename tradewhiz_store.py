@@ -0,0 +1,233 @@
+import hashlib
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from tradewhiz_core import COMMISSION, STAKE, backtest_data, indicator_cache, load_bars, report_progress, strategy_price_data
+from tradewhiz_execution import DEFAULT_KEY, ExecutionModel
+from tradewhiz_metrics import performance_summary, periods_per_year
+from tradewhiz_profile import stage
+from tradewhiz_strategies import SMACrossover
+
+# Result store: every finished backtest is kept in a local SQLite database with its
+# metrics and equity curve. A run is identified by its configuration plus a hash of
+# the price data it ran on, so repeating a configuration returns the stored result
+# without running the engine again, while a changed price history (new bars, a
+# revised adjusted close) never returns a stale one. The run's fills are kept in the
+# compact form of tradewhiz_ledger.TradeLedger.to_bytes().
+
+KEY_FIELDS = ["ticker", "start_date", "end_date", "interval", "strategy", "short_sma", "long_sma", "starting_cash",
+              "commission", "stake", "execution", "engine", "data_hash"]
+METRIC_FIELDS = ["portfolio_value", "sharpe_ratio", "max_drawdown", "equity_bars"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticker TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    interval TEXT NOT NULL DEFAULT '1d',
+    strategy TEXT NOT NULL DEFAULT 'sma_cross',
+    short_sma INTEGER NOT NULL,
+    long_sma INTEGER NOT NULL,
+    starting_cash REAL NOT NULL,
+    commission REAL NOT NULL,
+    stake INTEGER NOT NULL,
+    execution TEXT NOT NULL DEFAULT '{default_execution}',
+    engine TEXT NOT NULL,
+    data_hash TEXT NOT NULL,
+    portfolio_value REAL,
+    sharpe_ratio REAL,
+    max_drawdown REAL,
+    equity_bars INTEGER,
+    created_at TEXT NOT NULL,
+    equity_curve BLOB NOT NULL,
+    trades BLOB,
+    UNIQUE (ticker, start_date, end_date, interval, strategy, short_sma, long_sma, starting_cash, commission, stake, execution, engine, data_hash)
+)
+""".format(default_execution=DEFAULT_KEY)
+
+# Hash of the bars the engines read: dates (in nanoseconds, whatever the index
+# resolution) and the OHLCV columns, as high, low and volume cap and scale the
+# slippage. The arrays are hashed through the buffer protocol, so memory-mapped
+# columns are not copied.
+HASH_COLUMNS = ("open", "high", "low", "close", "volume")
+
+def data_hash(data):
+    digest = hashlib.sha1()
+    dates = data.index.as_unit("ns").asi8 if isinstance(data.index, pd.DatetimeIndex) else np.arange(len(data))
+    digest.update(np.ascontiguousarray(dates))
+    for column in HASH_COLUMNS:
+        if column in data.columns:
+            digest.update(column.encode())
+            digest.update(np.ascontiguousarray(data[column].to_numpy(dtype=float)))
+    return digest.hexdigest()
+
+# One connection per call, so a store can be shared by threads and worker processes
+class ResultStore:
+    def __init__(self, path=None):
+        self.path = path or os.path.join(os.getcwd(), "results.db")
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as connection, connection:
+            connection.execute(SCHEMA)
+            # Stores from before bar intervals hold daily SMA crossover runs only, with the default execution model
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(runs)")]
+            if "interval" not in columns:
+                connection.execute("ALTER TABLE runs ADD COLUMN interval TEXT NOT NULL DEFAULT '1d'")
+            if "execution" not in columns:
+                connection.execute(f"ALTER TABLE runs ADD COLUMN execution TEXT NOT NULL DEFAULT '{DEFAULT_KEY}'")
+            if "strategy" not in columns:
+                connection.execute("ALTER TABLE runs ADD COLUMN strategy TEXT NOT NULL DEFAULT 'sma_cross'")
+            # Runs saved before the trade ledger have no fills
+            if "trades" not in columns:
+                connection.execute("ALTER TABLE runs ADD COLUMN trades BLOB")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # The commission and stake columns hold the flat (or lowest) rate and the fixed stake;
+    # execution holds the full ExecutionModel key. SMA crossover runs keep their periods
+    # in short_sma and long_sma, as before strategies; other strategies store their
+    # parameters in the strategy key, with 0 periods.
+    def key(self, ticker, start_date, end_date, short_sma, long_sma, starting_cash, engine, data,
+            commission=COMMISSION, stake=STAKE, interval="1d", execution=None, strategy=None):
+        execution = execution or ExecutionModel(stake=stake, commission=commission)
+        commission = execution.commission if not isinstance(execution.commission, list) else execution.commission[0][1]
+        strategy = strategy or SMACrossover(short_sma, long_sma)
+        if isinstance(strategy, SMACrossover):
+            strategy_key, short_sma, long_sma = "sma_cross", strategy["short"], strategy["long"]
+        else:
+            strategy_key, short_sma, long_sma = strategy.key(), 0, 0
+        return {
+            "ticker": ticker.upper(), "start_date": str(start_date), "end_date": str(end_date), "interval": interval,
+            "strategy": strategy_key, "short_sma": int(short_sma), "long_sma": int(long_sma), "starting_cash": float(starting_cash),
+            "commission": float(commission), "stake": execution.stake, "execution": execution.key(), "engine": engine,
+            "data_hash": data_hash(data),
+        }
+
+    # Stored run for key as a dict with the metrics, the equity curve and the fills
+    # (TradeLedger bytes, None for runs saved without them), or None
+    def lookup(self, key):
+        where = " AND ".join(f"{field} = ?" for field in KEY_FIELDS)
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                f"SELECT id, {', '.join(METRIC_FIELDS)}, equity_curve, trades FROM runs WHERE {where}",
+                [key[field] for field in KEY_FIELDS]
+            ).fetchone()
+        if row is None:
+            return None
+        run = dict(zip(["id"] + METRIC_FIELDS, row[:-2]))
+        run["equity_curve"] = np.frombuffer(row[-2], dtype=float)
+        run["trades"] = row[-1]
+        return run
+
+    # ledger: optional TradeLedger of the run
+    def save(self, key, portfolio_value, sharpe_ratio, max_drawdown, equity_curve, ledger=None):
+        equity_curve = np.asarray(equity_curve, dtype=float)
+        values = dict(key, portfolio_value=float(portfolio_value), sharpe_ratio=_real(sharpe_ratio),
+                      max_drawdown=float(max_drawdown), equity_bars=len(equity_curve),
+                      created_at=time.strftime("%Y-%m-%d %H:%M:%S"), equity_curve=equity_curve.tobytes(),
+                      trades=ledger.to_bytes() if ledger is not None else None)
+        fields = list(values)
+        with closing(self._connect()) as connection, connection:
+            cursor = connection.execute(
+                f"INSERT OR REPLACE INTO runs ({', '.join(fields)}) VALUES ({', '.join('?' * len(fields))})",
+                [values[field] for field in fields]
+            )
+            return cursor.lastrowid
+
+    # Past runs without their equity curves, newest first; filters match exactly
+    def runs(self, ticker=None, engine=None, limit=None):
+        conditions, parameters = [], []
+        if ticker:
+            conditions.append("ticker = ?")
+            parameters.append(ticker.upper())
+        if engine:
+            conditions.append("engine = ?")
+            parameters.append(engine)
+        query = f"SELECT id, {', '.join(KEY_FIELDS)}, {', '.join(METRIC_FIELDS)}, created_at FROM runs"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id DESC"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        with closing(self._connect()) as connection:
+            return pd.read_sql_query(query, connection, params=parameters)
+
+    def equity_curves(self, run_ids):
+        run_ids = [int(run_id) for run_id in run_ids]
+        if not run_ids:
+            return {}
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                f"SELECT id, equity_curve FROM runs WHERE id IN ({', '.join('?' * len(run_ids))})", run_ids
+            ).fetchall()
+        curves = {run_id: np.frombuffer(blob, dtype=float) for run_id, blob in rows}
+        return {run_id: curves[run_id] for run_id in run_ids if run_id in curves}
+
+    # Side-by-side metrics of several runs, with the risk metrics recomputed from the stored curves
+    def compare(self, run_ids):
+        curves = self.equity_curves(run_ids)
+        runs = self.runs().set_index("id").loc[list(curves)]
+        summaries = pd.DataFrame(
+            [performance_summary(curve, periods_per_year(runs.at[run_id, "interval"])) for run_id, curve in curves.items()],
+            index=runs.index
+        )[["total_return", "cagr", "sortino_ratio", "calmar_ratio", "duration_bars"]]
+        return runs.join(summaries)
+
+    def delete(self, run_ids):
+        run_ids = [int(run_id) for run_id in run_ids]
+        with closing(self._connect()) as connection, connection:
+            connection.execute(f"DELETE FROM runs WHERE id IN ({', '.join('?' * len(run_ids))})", run_ids)
+
+# SQLite stores NaN as NULL
+def _real(value):
+    return None if value is None or np.isnan(value) else float(value)
+
+# backtest() with memoization: returns the usual result tuple and whether it came from the store.
+# The price data is still loaded (from the price cache) to hash it and to rebuild the chart indicators.
+# With a ledger, stored runs without fills are run again.
+def memoized_backtest(store, stock_symbol, start_date, end_date, short_sma_period, long_sma_period, starting_cash,
+                      engine="cerebro", offline=False, profile=None, progress=None, interval="1d", base_interval=None,
+                      execution=None, strategy=None, ledger=None):
+    strategy = strategy or SMACrossover(short_sma_period, long_sma_period)
+    data = load_bars(stock_symbol, start_date, end_date, offline, interval, base_interval, profile)
+    report_progress(progress, 0.05)
+    if len(data) <= strategy.start:
+        return (None, None, None, None, None), False
+    indicators = indicator_cache(stock_symbol, interval, data)
+
+    with stage(profile, "store_lookup"):
+        key = store.key(
+            stock_symbol, start_date, end_date, short_sma_period, long_sma_period, starting_cash, engine, data, interval=interval,
+            execution=execution, strategy=strategy
+        )
+        run = store.lookup(key)
+        if run is not None and ledger is not None and run["trades"] is None:
+            run = None
+    if run is not None:
+        if profile is not None:
+            profile.count("bars", len(data))
+            profile.count("store_hits")
+        with stage(profile, "indicators"):
+            price_data = strategy_price_data(data, strategy, indicators)
+        sharpe_ratio = run["sharpe_ratio"] if run["sharpe_ratio"] is not None else np.nan
+        if ledger is not None:
+            ledger.extend_bytes(run["trades"])
+        report_progress(progress, 1.0)
+        return (run["portfolio_value"], sharpe_ratio, run["max_drawdown"], run["equity_curve"], price_data), True
+
+    result = backtest_data(
+        data, short_sma_period, long_sma_period, starting_cash, engine, profile, progress, interval, execution, strategy, indicators,
+        ledger
+    )
+    portfolio_value, sharpe_ratio, max_drawdown, equity_curve, _ = result
+    if portfolio_value is not None:
+        with stage(profile, "store_save"):
+            store.save(key, portfolio_value, sharpe_ratio, max_drawdown, equity_curve, ledger)
+    return result, False
@@ -0,0 +1,290 @@
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Strategy registry. A strategy declares its parameters, the indicators it depends on
+# and a long/flat signal computed from them; the GUI and the batch runner build their
+# inputs from the declarations, and both engines trade the same signal (the fast
+# engine from the orders, Cerebro by replaying the target states).
+#
+# Indicators are computed through an IndicatorCache, one per price series: each
+# indicator (and each indicator it is built from, e.g. the EMAs under MACD) is
+# computed once and shared by every strategy that runs on that series, so comparing
+# many strategies on one ticker costs about one pass per distinct indicator.
+
+# Indicator functions by name, called with the cache and the indicator arguments
+INDICATORS = {}
+
+def indicator(name):
+    def register_indicator(function):
+        INDICATORS[name] = function
+        return function
+    return register_indicator
+
+@indicator("sma")
+def _sma(cache, period):
+    return pd.Series(cache.close).rolling(window=period).mean().to_numpy()
+
+@indicator("std")
+def _std(cache, period):
+    return pd.Series(cache.close).rolling(window=period).std(ddof=0).to_numpy()
+
+@indicator("ema")
+def _ema(cache, period):
+    return pd.Series(cache.close).ewm(span=period, adjust=False, min_periods=period).mean().to_numpy()
+
+# Wilder's RSI
+@indicator("rsi")
+def _rsi(cache, period):
+    delta = pd.Series(cache.close).diff()
+    gain = delta.clip(lower=0).ewm(alpha=1.0 / period, adjust=False, min_periods=period).mean()
+    loss = (-delta).clip(lower=0).ewm(alpha=1.0 / period, adjust=False, min_periods=period).mean()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (100.0 - 100.0 / (1.0 + gain / loss)).to_numpy()
+
+@indicator("bollinger_upper")
+def _bollinger_upper(cache, period, width):
+    return cache.get("sma", period) + width * cache.get("std", period)
+
+@indicator("bollinger_lower")
+def _bollinger_lower(cache, period, width):
+    return cache.get("sma", period) - width * cache.get("std", period)
+
+@indicator("macd")
+def _macd(cache, fast, slow):
+    return cache.get("ema", fast) - cache.get("ema", slow)
+
+@indicator("macd_signal")
+def _macd_signal(cache, fast, slow, signal):
+    return pd.Series(cache.get("macd", fast, slow)).ewm(span=signal, adjust=False, min_periods=signal).mean().to_numpy()
+
+# Indicator arrays for one close series, computed on first use
+class IndicatorCache:
+    def __init__(self, close):
+        self.close = np.asarray(close, dtype=float)
+        self.values = {}
+        self.computed = 0  # Indicator passes over the series
+
+    def add(self, values, name, *args):
+        self.values[(name,) + args] = np.asarray(values, dtype=float)
+
+    def get(self, name, *args):
+        key = (name,) + args
+        if key not in self.values:
+            self.values[key] = np.asarray(INDICATORS[name](self, *args), dtype=float)
+            self.computed += 1
+        return self.values[key]
+
+# Indicator caches of the last few price series used in this process, so successive
+# runs on the same series (e.g. several strategies on one ticker) share them. A
+# series is identified by its name, length, first and last dates and close checksum.
+_shared_caches = OrderedDict()
+SHARED_CACHES = 4
+
+def shared_indicator_cache(series_key, close):
+    close = np.asarray(close, dtype=float)
+    key = (series_key, len(close), float(close.sum()) if len(close) else 0.0)
+    if key in _shared_caches:
+        _shared_caches.move_to_end(key)
+        return _shared_caches[key]
+    cache = _shared_caches[key] = IndicatorCache(close)
+    while len(_shared_caches) > SHARED_CACHES:
+        _shared_caches.popitem(last=False)
+    return cache
+
+# Target states of a long/flat strategy from its signal (1 = long, 0 = flat, NaN =
+# keep the previous state): flat before start, then carried forward
+def target_states(signal, start):
+    n = len(signal)
+    signal = np.array(signal, dtype=float)
+    signal[:start] = 0.0
+    valid = np.where(~np.isnan(signal), np.arange(n), 0)
+    return signal[np.maximum.accumulate(valid)]
+
+# Orders per bar: +1 to buy, -1 to sell, 0 otherwise
+def state_orders(signal, start):
+    return np.diff(target_states(signal, start), prepend=0.0)
+
+Param = namedtuple("Param", ["name", "label", "default", "kind"])
+
+STRATEGIES = {}
+
+def register(cls):
+    STRATEGIES[cls.name] = cls
+    return cls
+
+# A strategy class declares name, label, params and the indicators, signal and chart
+# overlays of a parameter set; an instance holds one parameter set
+class Strategy:
+    name = ""
+    label = ""
+    params = ()
+
+    def __init__(self, *args, **values):
+        values.update(zip((param.name for param in self.params), args))
+        unknown = set(values) - {param.name for param in self.params}
+        if unknown:
+            raise ValueError(f"Unknown parameters for {self.name}: {', '.join(sorted(unknown))}")
+        self.values = {param.name: param.kind(values.get(param.name, param.default)) for param in self.params}
+        if any(value <= 0 for value in self.values.values()):
+            raise ValueError(f"The parameters of {self.name} must be positive.")
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+    # (indicator, arguments) pairs the signal is computed from
+    def indicators(self):
+        return []
+
+    # First bar on which the signal is defined
+    @property
+    def start(self):
+        return 0
+
+    # Desired state per bar: 1 = long, 0 = flat, NaN = no change
+    def signal(self, cache):
+        raise NotImplementedError
+
+    # Lines drawn over the price chart, by label
+    def overlays(self, cache):
+        return {}
+
+    def prepare(self, cache):
+        for name, args in self.indicators():
+            cache.get(name, *args)
+
+    def states(self, cache):
+        return target_states(self.signal(cache), self.start)
+
+    def orders(self, cache):
+        return state_orders(self.signal(cache), self.start)
+
+    def key(self):
+        return f"{self.name}:" + ",".join(f"{name}={value:g}" for name, value in self.values.items())
+
+    # Short form for file names and run lists, e.g. sma_cross_50_200
+    @property
+    def tag(self):
+        return "_".join([self.name] + [f"{value:g}" for value in self.values.values()])
+
+    def describe(self):
+        return f"{self.label} (" + ", ".join(f"{param.label} {self.values[param.name]:g}" for param in self.params) + ")"
+
+@register
+class SMACrossover(Strategy):
+    name = "sma_cross"
+    label = "SMA Crossover"
+    params = (Param("short", "Short SMA Period", 50, int), Param("long", "Long SMA Period", 200, int))
+
+    def indicators(self):
+        return [("sma", (self["short"],)), ("sma", (self["long"],))]
+
+    @property
+    def start(self):
+        return max(self["short"], self["long"]) - 1
+
+    def signal(self, cache):
+        short_sma, long_sma = cache.get("sma", self["short"]), cache.get("sma", self["long"])
+        return np.where(short_sma > long_sma, 1.0, np.where(short_sma < long_sma, 0.0, np.nan))
+
+    def overlays(self, cache):
+        return {"Short SMA": cache.get("sma", self["short"]), "Long SMA": cache.get("sma", self["long"])}
+
+@register
+class EMACrossover(Strategy):
+    name = "ema_cross"
+    label = "EMA Crossover"
+    params = (Param("fast", "Fast EMA Period", 12, int), Param("slow", "Slow EMA Period", 26, int))
+
+    def indicators(self):
+        return [("ema", (self["fast"],)), ("ema", (self["slow"],))]
+
+    @property
+    def start(self):
+        return max(self["fast"], self["slow"]) - 1
+
+    def signal(self, cache):
+        fast_ema, slow_ema = cache.get("ema", self["fast"]), cache.get("ema", self["slow"])
+        return np.where(fast_ema > slow_ema, 1.0, np.where(fast_ema < slow_ema, 0.0, np.nan))
+
+    def overlays(self, cache):
+        return {"Fast EMA": cache.get("ema", self["fast"]), "Slow EMA": cache.get("ema", self["slow"])}
+
+# Buys when the RSI falls below the lower level, sells when it rises above the upper one
+@register
+class RSIMeanReversion(Strategy):
+    name = "rsi_reversion"
+    label = "RSI Mean Reversion"
+    params = (Param("period", "RSI Period", 14, int), Param("lower", "Buy Below", 30.0, float), Param("upper", "Sell Above", 70.0, float))
+
+    def indicators(self):
+        return [("rsi", (self["period"],))]
+
+    @property
+    def start(self):
+        return self["period"]
+
+    def signal(self, cache):
+        rsi = cache.get("rsi", self["period"])
+        return np.where(rsi < self["lower"], 1.0, np.where(rsi > self["upper"], 0.0, np.nan))
+
+# Buys when the close breaks above the upper band, sells when it falls back below the middle band
+@register
+class BollingerBreakout(Strategy):
+    name = "bollinger_breakout"
+    label = "Bollinger Breakout"
+    params = (Param("period", "Band Period", 20, int), Param("width", "Band Width (std)", 2.0, float))
+
+    def indicators(self):
+        return [("sma", (self["period"],)), ("bollinger_upper", (self["period"], self["width"]))]
+
+    @property
+    def start(self):
+        return self["period"] - 1
+
+    def signal(self, cache):
+        close = cache.close
+        upper, middle = cache.get("bollinger_upper", self["period"], self["width"]), cache.get("sma", self["period"])
+        return np.where(close > upper, 1.0, np.where(close < middle, 0.0, np.nan))
+
+    def overlays(self, cache):
+        return {
+            "Upper Band": cache.get("bollinger_upper", self["period"], self["width"]),
+            "Middle Band": cache.get("sma", self["period"]),
+            "Lower Band": cache.get("bollinger_lower", self["period"], self["width"]),
+        }
+
+# Long while the MACD line is above its signal line
+@register
+class MACDCrossover(Strategy):
+    name = "macd"
+    label = "MACD"
+    params = (Param("fast", "Fast EMA Period", 12, int), Param("slow", "Slow EMA Period", 26, int), Param("signal", "Signal Period", 9, int))
+
+    def indicators(self):
+        return [("macd", (self["fast"], self["slow"])), ("macd_signal", (self["fast"], self["slow"], self["signal"]))]
+
+    @property
+    def start(self):
+        return max(self["fast"], self["slow"]) + self["signal"] - 2
+
+    def signal(self, cache):
+        macd = cache.get("macd", self["fast"], self["slow"])
+        signal = cache.get("macd_signal", self["fast"], self["slow"], self["signal"])
+        return np.where(macd > signal, 1.0, np.where(macd < signal, 0.0, np.nan))
+
+def make_strategy(name, *args, **values):
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {name} (available: {', '.join(STRATEGIES)})")
+    return STRATEGIES[name](*args, **values)
+
+# Parse a strategy key, "rsi_reversion:period=14,upper=75", or just a name for the defaults
+def parse_strategy(text):
+    name, _, values = str(text).strip().partition(":")
+    params = {}
+    for part in values.split(","):
+        if part.strip():
+            param, value = part.split("=", 1)
+            params[param.strip()] = float(value)
+    return make_strategy(name.strip(), **params)
@@ -0,0 +1,137 @@
+import csv
+import json
+import socket
+import time
+from collections import deque, namedtuple
+
+# Streaming / paper-trading mode. Bars arrive one at a time from a pluggable source
+# (any iterable of Bar), the SMAs are updated in O(1) with running sums, and the
+# same SMA crossover rules as SMAStrategy are applied: an order decided on a bar's
+# close fills at the next bar's open, with the fixed stake and commission. As in
+# Backtrader, a buy whose cost, commission included, is above the cash at the signal
+# close or at the fill is rejected, and the trader tries again on the next bar.
+
+Bar = namedtuple("Bar", ["time", "open", "high", "low", "close", "volume"])
+
+class RunningSMA:
+    def __init__(self, period):
+        self.period = period
+        self.window = deque()
+        self.total = 0.0
+        self.updates = 0
+
+    def update(self, value):
+        self.window.append(value)
+        self.total += value
+        if len(self.window) > self.period:
+            self.total -= self.window.popleft()
+        # Re-sum once per full window so rounding errors from the running sum never build up
+        self.updates += 1
+        if self.updates % self.period == 0:
+            self.total = sum(self.window)
+        return self.value
+
+    @property
+    def value(self):
+        return self.total / self.period if len(self.window) == self.period else None
+
+class StreamingSMATrader:
+    def __init__(self, short_sma_period, long_sma_period, starting_cash, commission=0.001, stake=10):
+        self.short_sma = RunningSMA(short_sma_period)
+        self.long_sma = RunningSMA(long_sma_period)
+        self.commission = commission
+        self.stake = stake
+        self.cash = starting_cash
+        self.position = 0
+        self.pending = 0  # Shares to buy (+) or sell (-) at the next bar's open
+        self.equity_curve = []  # Portfolio value from the first bar with both SMAs, as in SMAStrategy
+
+    def on_bar(self, bar):
+        # Fill the order from the previous bar at this bar's open, unless it is a buy
+        # the cash no longer covers there
+        filled = self.pending
+        if filled > 0 and not self.covers(filled, bar.open):
+            filled = self.pending = 0
+        if filled:
+            self.cash -= filled * bar.open + abs(filled) * bar.open * self.commission
+            self.position += filled
+            self.pending = 0
+
+        short_sma = self.short_sma.update(bar.close)
+        long_sma = self.long_sma.update(bar.close)
+
+        equity = None
+        signal = None
+        if short_sma is not None and long_sma is not None:
+            equity = self.cash + self.position * bar.close
+            self.equity_curve.append(equity)
+
+            # Buy when short SMA crosses above long SMA, sell when it crosses below
+            if short_sma > long_sma and not self.position:
+                if self.covers(self.stake, bar.close):
+                    self.pending = self.stake
+                    signal = "buy"
+            elif short_sma < long_sma and self.position:
+                self.pending = -self.position
+                signal = "sell"
+
+        return {
+            "time": bar.time, "close": bar.close, "short_sma": short_sma, "long_sma": long_sma,
+            "equity": equity, "position": self.position, "filled": filled, "signal": signal,
+        }
+
+    # Whether the cash pays for a buy of shares at price, commission included
+    def covers(self, shares, price):
+        return shares * price * (1.0 + self.commission) <= self.cash
+
+# Replay a price DataFrame (e.g. from PriceCache) as bars; delay is seconds per bar
+def dataframe_bar_source(data, delay=0.0):
+    columns = [data[name].to_numpy(dtype=float) for name in ("open", "high", "low", "close")]
+    volume = data["volume"].to_numpy(dtype=float) if "volume" in data.columns else [0.0] * len(data)
+    for i, timestamp in enumerate(data.index):
+        yield Bar(timestamp, columns[0][i], columns[1][i], columns[2][i], columns[3][i], volume[i])
+        if delay:
+            time.sleep(delay)
+
+# Replay a CSV file with Date/Open/High/Low/Close/Volume columns (any case; 'Adj Close' wins over 'Close')
+def csv_bar_source(path, delay=0.0):
+    with open(path, "r", newline="") as f:
+        reader = csv.DictReader(f)
+        names = {name.strip().lower(): name for name in reader.fieldnames}
+        close_name = names.get("adj close", names.get("close"))
+        time_name = names.get("date", names.get("datetime", names.get("time", reader.fieldnames[0])))
+        for row in reader:
+            yield Bar(
+                row[time_name], float(row[names["open"]]), float(row[names["high"]]), float(row[names["low"]]),
+                float(row[close_name]), float(row[names["volume"]]) if "volume" in names else 0.0
+            )
+            if delay:
+                time.sleep(delay)
+
+# Receive bars from a TCP socket as newline-delimited JSON objects with the Bar fields
+def socket_bar_source(host, port, timeout=None):
+    with socket.create_connection((host, port), timeout=timeout) as connection:
+        for line in connection.makefile("r"):
+            if line.strip():
+                bar = json.loads(line)
+                yield Bar(bar["time"], float(bar["open"]), float(bar["high"]), float(bar["low"]),
+                          float(bar["close"]), float(bar.get("volume", 0.0)))
+
+# Local stand-in for a live feed: serve bars from any source to one client over TCP
+def serve_bars(source, host="127.0.0.1", port=9999):
+    with socket.create_server((host, port)) as server:
+        connection, _ = server.accept()
+        with connection, connection.makefile("w") as stream:
+            for bar in source:
+                stream.write(json.dumps({**bar._asdict(), "time": str(bar.time)}) + "\n")
+                stream.flush()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve a CSV price file as a local TradeWhiz bar stream.")
+    parser.add_argument("csv_file")
+    parser.add_argument("--port", type=int, default=9999)
+    parser.add_argument("--delay", type=float, default=0.1, help="Seconds between bars")
+    args = parser.parse_args()
+    serve_bars(csv_bar_source(args.csv_file, args.delay), port=args.port)
@@ -0,0 +1,115 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import tradewhiz_metrics
+from tradewhiz_core import SMACache, calculate_max_drawdown, calculate_sharpe_ratio, fast_sma_equity
+
+# Walk-forward validation. The price range is split into rolling windows of
+# train_bars followed by test_bars; each window optimizes the SMA periods on its
+# train slice and trades the best pair on the following test slice. The windows
+# run in parallel, and every worker process receives the price arrays once.
+#
+# The SMAs are computed over the whole series: an SMA only looks back, so there is
+# no look-ahead, and test windows start trading on their first bar without warm-up.
+# Every test window starts flat with the starting cash; with the fixed stake the
+# out-of-sample equity is stitched by adding up the profit of each window. Sharpe
+# ratios are annualized for the bar interval of the data.
+
+OBJECTIVES = ["portfolio_value", "sharpe_ratio"]
+
+_prices = {}
+
+def _init_worker(open_, close, periods_per_year=tradewhiz_metrics.TRADING_DAYS):
+    _prices["open"] = open_
+    _prices["close"] = close
+    _prices["periods_per_year"] = periods_per_year
+    _prices["sma"] = SMACache(close)
+
+# Equity curve of one period pair over bars lo..hi, starting at the first bar
+# inside the slice where both SMAs are defined
+def _slice_equity(short_sma_period, long_sma_period, lo, hi, starting_cash):
+    sma_cache = _prices["sma"]
+    start = max(long_sma_period - 1 - lo, 0)
+    if lo + start >= hi:
+        return None
+    return fast_sma_equity(
+        _prices["open"][lo:hi], _prices["close"][lo:hi],
+        sma_cache.get(short_sma_period)[lo:hi], sma_cache.get(long_sma_period)[lo:hi],
+        start, starting_cash
+    )
+
+def _score(equity_curve, objective):
+    if objective == "sharpe_ratio":
+        return calculate_sharpe_ratio(equity_curve, periods_per_year=_prices["periods_per_year"])
+    return equity_curve[-1]
+
+def _run_window(train_lo, test_lo, test_hi, pairs, starting_cash, objective):
+    best = None
+    for short_sma_period, long_sma_period in pairs:
+        equity_curve = _slice_equity(short_sma_period, long_sma_period, train_lo, test_lo, starting_cash)
+        if equity_curve is None or len(equity_curve) < 2:
+            continue
+        score = _score(equity_curve, objective)
+        if not np.isnan(score) and (best is None or score > best[0]):
+            best = (score, short_sma_period, long_sma_period)
+
+    if best is None:
+        return None
+    score, short_sma_period, long_sma_period = best
+    test_equity = _slice_equity(short_sma_period, long_sma_period, test_lo, test_hi, starting_cash)
+    return score, short_sma_period, long_sma_period, test_equity
+
+# Bar ranges (train_lo, test_lo, test_hi) of the rolling windows
+def walk_forward_windows(n_bars, train_bars, test_bars):
+    windows = []
+    test_lo = train_bars
+    while test_lo < n_bars:
+        windows.append((test_lo - train_bars, test_lo, min(test_lo + test_bars, n_bars)))
+        test_lo += test_bars
+    return windows
+
+def walk_forward(data, short_sma_periods, long_sma_periods, train_bars, test_bars, starting_cash,
+                 objective="portfolio_value", max_workers=None, interval="1d"):
+    periods = tradewhiz_metrics.periods_per_year(interval)
+    open_ = data["open"].to_numpy(dtype=float)
+    close = data["close"].to_numpy(dtype=float)
+    pairs = [(s, l) for s in short_sma_periods for l in long_sma_periods if s < l and l <= len(close)]
+    windows = walk_forward_windows(len(close), train_bars, test_bars)
+    if not pairs or not windows:
+        raise ValueError("Not enough data for the chosen periods and window lengths.")
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(open_, close, periods)) as pool:
+        futures = [
+            pool.submit(_run_window, train_lo, test_lo, test_hi, pairs, starting_cash, objective)
+            for train_lo, test_lo, test_hi in windows
+        ]
+        outcomes = [future.result() for future in futures]
+
+    rows = []
+    pieces = []
+    profit = 0.0
+    for (train_lo, test_lo, test_hi), outcome in zip(windows, outcomes):
+        row = {
+            "train_start": data.index[train_lo], "train_end": data.index[test_lo - 1],
+            "test_start": data.index[test_lo], "test_end": data.index[test_hi - 1],
+            "short_sma": None, "long_sma": None, "train_score": np.nan,
+            "test_profit": np.nan, "test_sharpe": np.nan, "test_max_drawdown": np.nan,
+        }
+        if outcome is not None and outcome[3] is not None:
+            score, short_sma_period, long_sma_period, test_equity = outcome
+            row.update(
+                short_sma=short_sma_period, long_sma=long_sma_period, train_score=score,
+                test_profit=test_equity[-1] - starting_cash,
+                test_sharpe=calculate_sharpe_ratio(test_equity, periods_per_year=periods), test_max_drawdown=calculate_max_drawdown(test_equity),
+            )
+            # Stitch: this window's profit is added on top of all previous windows
+            dates = data.index[test_hi - len(test_equity):test_hi]
+            pieces.append(pd.Series(test_equity + profit, index=dates))
+            profit += test_equity[-1] - starting_cash
+        rows.append(row)
+
+    windows_table = pd.DataFrame(rows)
+    oos_equity = pd.concat(pieces) if pieces else pd.Series(dtype=float)
+    return windows_table, oos_equity
@@ -0,0 +1,104 @@
+from collections import OrderedDict
+
+import tradewhiz_metrics
+from tradewhiz_core import (
+    calculate_max_drawdown, calculate_sharpe_ratio, indicator_cache, load_bars, run_cerebro_strategy, run_fast_strategy,
+    strategy_price_data
+)
+from tradewhiz_execution import ExecutionModel
+from tradewhiz_ledger import TradeLedger
+from tradewhiz_profile import stage
+
+# Stage-aware backtest pipeline for interactive what-if re-runs. Every stage keeps its
+# results in memory, keyed by the inputs it depends on, so a re-run only computes the
+# stages whose inputs changed:
+#   download:   ticker, dates, interval, base interval and offline mode
+#   indicators: the series' shared IndicatorCache, which only computes the indicator
+#               columns it does not hold yet (a new SMA period is one new column)
+#   engine and metrics: the bars, strategy, starting cash, engine and execution model
+# Changing the starting cash therefore only re-runs the engine, and going back to an
+# earlier setting is a lookup. The bars are not refreshed from the source while they
+# are held; a new session (or another date range) fetches them again.
+
+BAR_ENTRIES = 4  # Price series held, like the shared indicator caches
+RUN_ENTRIES = 32  # Engine results held (equity curve and fills each)
+
+def _recall(memo, key):
+    if key not in memo:
+        return None
+    memo.move_to_end(key)
+    return memo[key]
+
+def _remember(memo, key, value, size):
+    memo[key] = value
+    memo.move_to_end(key)
+    while len(memo) > size:
+        memo.popitem(last=False)
+    return value
+
+class WhatIfSession:
+    def __init__(self):
+        self.bars = OrderedDict()  # Download key -> bars
+        self.runs = OrderedDict()  # Run key -> (portfolio value, Sharpe ratio, max drawdown, equity curve, fills)
+
+    # Run a tradewhiz_pool.BacktestJob in this process, reusing every stage whose inputs
+    # are unchanged. Returns the usual result tuple (portfolio value, Sharpe ratio, max
+    # drawdown, equity curve, price data) and the names of the stages that were reused;
+    # job.ledger receives the run's fills. progress, if given, is passed to the Cerebro
+    # engine and may raise to cancel the run, which then leaves nothing behind.
+    def run(self, job, progress=None):
+        profile = job.profile
+        reused = []
+
+        bars_key = (job.stock_symbol.upper(), job.start_date, job.end_date, job.interval, job.base_interval, job.offline)
+        data = _recall(self.bars, bars_key)
+        if data is None:
+            data = load_bars(job.stock_symbol, job.start_date, job.end_date, job.offline, job.interval, job.base_interval, profile)
+            _remember(self.bars, bars_key, data, BAR_ENTRIES)
+        else:
+            reused.append("download")
+
+        strategy = job.strategy
+        if len(data) <= strategy.start:
+            return (None, None, None, None, None), reused
+        profile.count("bars", len(data))
+
+        with stage(profile, "indicators"):
+            indicators = indicator_cache(job.stock_symbol, job.interval, data)
+            computed = indicators.computed
+            strategy.prepare(indicators)
+            price_data = strategy_price_data(data, strategy, indicators)
+        profile.count("indicators_computed", indicators.computed - computed)
+        if indicators.computed == computed:
+            reused.append("indicators")
+
+        periods = tradewhiz_metrics.periods_per_year(job.interval)
+        run_key = (bars_key, strategy.key(), job.starting_cash, job.engine, (job.execution or ExecutionModel()).key())
+        run = _recall(self.runs, run_key)
+        if run is None:
+            ledger = TradeLedger()
+            with stage(profile, job.engine):
+                if job.engine == "fast":
+                    portfolio_value, equity_curve = run_fast_strategy(
+                        data, strategy, indicators, job.starting_cash, profile=profile, execution=job.execution,
+                        periods_per_year=periods, ledger=ledger
+                    )
+                else:
+                    portfolio_value, equity_curve = run_cerebro_strategy(
+                        data, strategy, indicators, job.starting_cash, profile, progress, job.interval, job.execution, ledger
+                    )
+            with stage(profile, "metrics"):
+                sharpe_ratio = calculate_sharpe_ratio(equity_curve, periods_per_year=periods)
+                max_drawdown = calculate_max_drawdown(equity_curve)
+            run = (portfolio_value, sharpe_ratio, max_drawdown, equity_curve, ledger.to_bytes())
+            _remember(self.runs, run_key, run, RUN_ENTRIES)
+        else:
+            reused += [job.engine, "metrics"]
+
+        job.ledger = TradeLedger.from_bytes(run[4])
+        profile.count("stages_reused", len(reused))
+        return run[:4] + (price_data,), reused
+
+    def clear(self):
+        self.bars.clear()
+        self.runs.clear()